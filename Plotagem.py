@@ -1,10 +1,11 @@
 import streamlit as st
-import matplotlib.pyplot as plt
 import lasio
 from io import StringIO
+from cabecalho_las import extrair_cabecalho
 from PIL import Image
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from instrumentacao import instrumentado, medir
 
 # Evitar erro de imagem grande
 Image.MAX_IMAGE_PIXELS = None
@@ -54,7 +55,7 @@ def plot_well_logs(df):
         if 'las_file_content' in st.session_state:
             try:
                 las = lasio.read(StringIO(st.session_state['las_file_content']))
-                st.session_state['las_object'] = las
+                st.session_state['las_object'] = extrair_cabecalho(las)
             except Exception as e:
                 st.error("Erro ao tentar reconstruir objeto LAS: " + str(e))
                 return
@@ -83,6 +84,7 @@ def plot_well_logs(df):
     valid_tracks = {k: v for k, v in tracks.items() if v}
     n_tracks = len(valid_tracks)
 
+    import matplotlib.pyplot as plt
     fig, axes = plt.subplots(1, n_tracks, figsize=(min(7 * n_tracks, 70), figura_altura), sharey=True, dpi=100)
     if n_tracks == 1:
         axes = [axes]
@@ -120,83 +122,91 @@ def plot_well_logs(df):
             ax.set_ylabel("Profundidade (m)", fontsize=27)
 
     try:
-        st.pyplot(fig)
+        with medir("serializacao.matplotlib", "figura"):
+            st.pyplot(fig)
     except MemoryError:
         st.error("Erro de memória ao renderizar o gráfico. Reduza a profundidade ou número de curvas.")
     finally:
         plt.close(fig)
 
-def plot_interactive_logs(df, depth_col, selected_curves, depth_range, mode):
-    """Cria visualização interativa com Plotly"""
+@instrumentado("figura_perfis_interativa", "figura")
+def figura_perfis_interativa(df, depth_col, selected_curves, depth_range):
+    """Figura Plotly com uma trilha por curva e a configuração da barra de ferramentas"""
 
     # Filtrar dados por profundidade
     df_filtered = df[(df[depth_col] >= depth_range[0]) & (df[depth_col] <= depth_range[1])]
 
-    if mode == "Plotly Interativo":
-        # Criar subplots
-        n_curves = len(selected_curves)
-        fig = make_subplots(
-            rows=1, cols=n_curves,
-            shared_yaxes=True,
-            subplot_titles=selected_curves,
-            horizontal_spacing=0.05
-        )
-
-        colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f']
-
-        for i, curve in enumerate(selected_curves):
-            if curve in df_filtered.columns:
-                fig.add_trace(
-                    go.Scatter(
-                        x=df_filtered[curve],
-                        y=df_filtered[depth_col],
-                        mode='lines',
-                        name=curve,
-                        line=dict(color=colors[i % len(colors)], width=2),
-                        hovertemplate=f'<b>{curve}</b><br>Valor: %{{x:.2f}}<br>Depth: %{{y:.2f}}<extra></extra>'
-                    ),
-                    row=1, col=i+1
-                )
-
-                # Configurar eixo x
-                fig.update_xaxes(title_text=curve, row=1, col=i+1, showgrid=True, gridwidth=1, gridcolor='LightGray')
-
-        # Configurar layout
-        fig.update_yaxes(title_text="Profundidade (m)", autorange="reversed", row=1, col=1, showgrid=True, gridwidth=1, gridcolor='LightGray')
-
-        fig.update_layout(
-            height=800,
-            showlegend=False,
-            plot_bgcolor='white',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=12),
-            hovermode='y unified',
-            margin=dict(l=50, r=50, t=80, b=50),
-            dragmode='zoom',  # Modo padrão: zoom
-            modebar=dict(
-                bgcolor='rgba(255,255,255,0.7)',
-                color='#02ab21',
-                activecolor='#ff8c00'
+    # Criar subplots
+    n_curves = len(selected_curves)
+    fig = make_subplots(
+        rows=1, cols=n_curves,
+        shared_yaxes=True,
+        subplot_titles=selected_curves,
+        horizontal_spacing=0.05
+    )
+
+    colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f']
+
+    for i, curve in enumerate(selected_curves):
+        if curve in df_filtered.columns:
+            fig.add_trace(
+                go.Scatter(
+                    x=df_filtered[curve],
+                    y=df_filtered[depth_col],
+                    mode='lines',
+                    name=curve,
+                    line=dict(color=colors[i % len(colors)], width=2),
+                    hovertemplate=f'<b>{curve}</b><br>Valor: %{{x:.2f}}<br>Depth: %{{y:.2f}}<extra></extra>'
+                ),
+                row=1, col=i+1
             )
-        )
 
-        # Configuração completa para interatividade
-        config = {
-            'displayModeBar': True,
-            'displaylogo': False,
-            'modeBarButtonsToAdd': ['drawopenpath', 'eraseshape'],
-            'modeBarButtonsToRemove': [],
-            'toImageButtonOptions': {
-                'format': 'png',
-                'filename': 'perfil_geofisico',
-                'height': 1200,
-                'width': 1600,
-                'scale': 2
-            },
-            'scrollZoom': True  # Zoom com scroll do mouse
-        }
-
-        st.plotly_chart(fig, use_container_width=True, config=config)
+            # Configurar eixo x
+            fig.update_xaxes(title_text=curve, row=1, col=i+1, showgrid=True, gridwidth=1, gridcolor='LightGray')
+
+    # Configurar layout
+    fig.update_yaxes(title_text="Profundidade (m)", autorange="reversed", row=1, col=1, showgrid=True, gridwidth=1, gridcolor='LightGray')
+
+    fig.update_layout(
+        height=800,
+        showlegend=False,
+        plot_bgcolor='white',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(size=12),
+        hovermode='y unified',
+        margin=dict(l=50, r=50, t=80, b=50),
+        dragmode='zoom',  # Modo padrão: zoom
+        modebar=dict(
+            bgcolor='rgba(255,255,255,0.7)',
+            color='#02ab21',
+            activecolor='#ff8c00'
+        )
+    )
+
+    # Configuração completa para interatividade
+    config = {
+        'displayModeBar': True,
+        'displaylogo': False,
+        'modeBarButtonsToAdd': ['drawopenpath', 'eraseshape'],
+        'modeBarButtonsToRemove': [],
+        'toImageButtonOptions': {
+            'format': 'png',
+            'filename': 'perfil_geofisico',
+            'height': 1200,
+            'width': 1600,
+            'scale': 2
+        },
+        'scrollZoom': True  # Zoom com scroll do mouse
+    }
+    return fig, config
+
+@instrumentado("plot_interactive_logs", "figura")
+def plot_interactive_logs(df, depth_col, selected_curves, depth_range, mode):
+    """Cria visualização interativa com Plotly"""
+    if mode == "Plotly Interativo":
+        fig, config = figura_perfis_interativa(df, depth_col, selected_curves, depth_range)
+        with medir("serializacao.plotly", "figura", curvas=len(selected_curves)):
+            st.plotly_chart(fig, use_container_width=True, config=config)
 
     else:
         # Modo matplotlib (original)
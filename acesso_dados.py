@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Copy-on-write: fatias e colunas derivadas compartilham memória com o poço da sessão até serem
+# alteradas, e alterações numa página nunca vazam para o DataFrame compartilhado (padrão no pandas 3)
+if int(pd.__version__.split(".")[0]) < 3:
+    try:
+        pd.set_option("mode.copy_on_write", True)
+    except (KeyError, pd.errors.OptionError):
+        pass
+
+def obter_poco(chave="well_data"):
+    """DataFrame do poço carregado, sem cópia; trate-o como somente leitura"""
+    return st.session_state.get(chave)
+
+def compactar_curvas(df, depth_col=None):
+    """Curvas em float32 (metade da memória); a profundidade continua em float64"""
+    curvas = [c for c in df.select_dtypes(include="float64").columns if c != depth_col]
+    return df.astype({c: np.float32 for c in curvas}) if curvas else df
+
+def fatiar_profundidade(df, depth_col, faixa):
+    """Linhas com profundidade dentro de `faixa`, mantendo o índice original.
+
+    Com profundidade crescente o intervalo vira uma fatia por busca binária (sem copiar dados);
+    caso contrário, cai para a máscara booleana.
+    """
+    if not depth_col or faixa is None:
+        return df
+    prof = df[depth_col]
+    if prof.is_monotonic_increasing:
+        valores = prof.to_numpy()
+        inicio = np.searchsorted(valores, faixa[0], side="left")
+        fim = np.searchsorted(valores, faixa[1], side="right")
+        return df.iloc[inicio:fim]
+    return df[(prof >= faixa[0]) & (prof <= faixa[1])]
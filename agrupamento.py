@@ -0,0 +1,231 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from pontuacao import indices_em_blocos, pontuar, silhouette_estratificada
+from tarefas import executar_em_paralelo
+from cache_compartilhado import CACHE
+import cache_disco
+from instrumentacao import instrumentado, medir
+
+# Modelos ajustados ficam no cache do servidor, compartilhados entre reruns e sessões;
+# com `persistir`, centroides e índices também vão para o disco e sobrevivem a reinícios
+def _obter_modelo(chave, persistir=False):
+    resultado = CACHE.obter(('agrupamento',) + chave)
+    if resultado is None and persistir:
+        tabela = cache_disco.ler(('agrupamento',) + chave)
+        if tabela is not None:
+            resultado = CACHE.guardar(('agrupamento',) + chave, _tabela_para_resultado(tabela))
+    return resultado
+
+def _guardar_modelo(chave, resultado, persistir=False):
+    CACHE.guardar(('agrupamento',) + chave, resultado)
+    if persistir:
+        cache_disco.gravar(('agrupamento',) + chave, _resultado_para_tabela(resultado))
+
+def _resultado_para_tabela(resultado):
+    # Uma linha por ajuste; o modelo é guardado só pelos centroides
+    indices = resultado['indices']
+    linha = {
+        'k': resultado['k'],
+        'centroides': [resultado['modelo'].cluster_centers_.ravel().tolist()],
+        'silhouette_simplificada': indices['silhouette_simplificada'],
+        'davies_bouldin': indices['davies_bouldin'],
+        'calinski_harabasz': indices['calinski_harabasz'],
+        'silhouette_amostral': indices['silhouette_amostral'],
+        'ic_inferior': indices['ic_silhouette'][0],
+        'ic_superior': indices['ic_silhouette'][1],
+        'replicas_silhouette': [np.asarray(indices['replicas_silhouette'], dtype=float).tolist()],
+    }
+    linha.update(resultado.get('qualidade', {}))
+    return pd.DataFrame(linha, index=[0])
+
+def _tabela_para_resultado(tabela):
+    from sklearn.cluster import KMeans
+
+    linha = tabela.iloc[0]
+    k = int(linha['k'])
+    centroides = np.asarray(linha['centroides'], dtype=float).reshape(k, -1)
+    # KMeans "ajustado" sobre os próprios centroides: cada um forma seu cluster e nada se move
+    modelo = KMeans(n_clusters=k, init=centroides, n_init=1, max_iter=1).fit(centroides)
+    indices = {nome: float(linha[nome]) for nome in
+               ('silhouette_simplificada', 'davies_bouldin', 'calinski_harabasz', 'silhouette_amostral')}
+    indices.update(ic_silhouette=(float(linha['ic_inferior']), float(linha['ic_superior'])),
+                   replicas_silhouette=np.asarray(linha['replicas_silhouette'], dtype=float))
+    resultado = {'k': k, 'modelo': modelo, 'indices': indices, 'score': indices['silhouette_simplificada']}
+    if 'razao_inercia' in tabela.columns:
+        resultado['qualidade'] = {'razao_inercia': float(linha['razao_inercia']), 'ari': float(linha['ari'])}
+    return resultado
+
+def ajustar_k(X, chave, k, centroides=None):
+    """Ajusta (ou recupera do cache) o KMeans com k clusters para a matriz padronizada X.
+
+    `chave` identifica os dados (hash do poço, curvas, intervalo...). Com `centroides`,
+    o ajuste parte deles (warm start) com uma única inicialização; a origem do warm start entra
+    na chave do cache, para que o modelo não dependa de qual ajuste rodou antes no servidor.
+    """
+    partida = centroides is not None and len(centroides) == k
+    chave_modelo = (chave, k)
+    if partida:
+        centroides = np.ascontiguousarray(centroides, dtype=float)
+        chave_modelo += ('warm', hashlib.blake2b(centroides.tobytes(), digest_size=16).hexdigest())
+    resultado = _obter_modelo(chave_modelo, persistir=True)
+    if resultado is not None:
+        return resultado
+
+    from sklearn.cluster import KMeans
+    if partida:
+        kmeans = KMeans(n_clusters=k, init=centroides, n_init=1, random_state=42)
+    else:
+        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+    with medir("kmeans.fit", "agrupamento", k=k, amostras=len(X)):
+        labels = kmeans.fit_predict(X)
+
+    with medir("pontuar", "agrupamento", k=k):
+        indices = pontuar(X, labels, k)
+    resultado = {'k': k, 'modelo': kmeans, 'indices': indices, 'score': indices['silhouette_simplificada']}
+    _guardar_modelo(chave_modelo, resultado, persistir=True)
+    return resultado
+
+@instrumentado("varredura_k", "agrupamento")
+def varrer_k(X, chave, ks=range(2, 8), centroides=None, progresso=None):
+    """Ajusta todos os k em paralelo sobre a mesma matriz; o tempo fica limitado pelo k mais lento"""
+    centroides = centroides or {}
+    return executar_em_paralelo(lambda k: ajustar_k(X, chave, k, centroides.get(k)), ks, progresso)
+
+def sobreposicao_faixas(faixa_a, faixa_b):
+    # Fração de sobreposição entre dois intervalos de profundidade (interseção / união)
+    inter = min(faixa_a[1], faixa_b[1]) - max(faixa_a[0], faixa_b[0])
+    uniao = max(faixa_a[1], faixa_b[1]) - min(faixa_a[0], faixa_b[0])
+    return max(inter, 0) / uniao if uniao > 0 else 1.0
+
+def _truncar_pca(pca, variancia_alvo):
+    # Mantém só os primeiros componentes que somam a variância alvo
+    acumulada = np.cumsum(pca.explained_variance_ratio_)
+    m = int(min(np.searchsorted(acumulada, variancia_alvo - 1e-12) + 1, len(acumulada)))
+    for atributo in ('components_', 'explained_variance_', 'explained_variance_ratio_', 'singular_values_'):
+        setattr(pca, atributo, getattr(pca, atributo)[:m])
+    pca.n_components_ = m
+    return pca
+
+def reduzir_pca(X, chave, variancia_alvo=0.95, branquear=False):
+    """PCA por SVD randomizado sobre a matriz padronizada, em cache por poço + curvas.
+
+    Retorna o PCA (já truncado para a variância alvo), a matriz projetada e a
+    variância explicada de todos os componentes calculados.
+    """
+    chave_pca = (chave, 'pca', variancia_alvo, branquear)
+    resultado = _obter_modelo(chave_pca)
+    if resultado is not None:
+        return resultado
+
+    from sklearn.decomposition import PCA
+    pca = PCA(n_components=min(X.shape), svd_solver='randomized', whiten=branquear, random_state=42).fit(X)
+    variancia_total = pca.explained_variance_ratio_.copy()
+    pca = _truncar_pca(pca, variancia_alvo)
+
+    resultado = {'pca': pca, 'Z': pca.transform(X), 'variancia': variancia_total}
+    _guardar_modelo(chave_pca, resultado)
+    return resultado
+
+def pca_em_lotes(fonte, escalonador, n_curvas, variancia_alvo=0.95, branquear=False):
+    # IncrementalPCA alimentado pelos mesmos blocos do modo mini-batch
+    from sklearn.decomposition import IncrementalPCA
+    pca = IncrementalPCA(n_components=n_curvas, whiten=branquear)
+    for bloco in fonte():
+        bloco = bloco[~np.isnan(bloco).any(axis=1)]
+        if len(bloco) >= n_curvas:
+            pca.partial_fit(escalonador.transform(bloco))
+    variancia_total = pca.explained_variance_ratio_.copy()
+    return _truncar_pca(pca, variancia_alvo), variancia_total
+
+def iterar_blocos(df, curvas, tamanho_lote=50_000):
+    # Percorre o DataFrame em blocos de linhas, convertendo só o bloco atual para float32
+    for inicio in range(0, len(df), tamanho_lote):
+        yield df[curvas].iloc[inicio:inicio + tamanho_lote].to_numpy(dtype=np.float32)
+
+def escalonar_em_lotes(fonte, passo_amostra=100, tamanho_amostra=20_000):
+    """Estatísticas do StandardScaler acumuladas bloco a bloco (partial_fit).
+
+    `fonte` é uma função sem argumentos que devolve um iterador de blocos (linhas x curvas);
+    linhas com nulos são ignoradas. Guarda também uma amostra sistemática (uma linha a cada
+    `passo_amostra`, no máximo `tamanho_amostra`) para pontuação e controle de qualidade.
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    escalonador = StandardScaler()
+    blocos_amostra = []
+    total = 0
+    for bloco in fonte():
+        bloco = bloco[~np.isnan(bloco).any(axis=1)]
+        if len(bloco) == 0:
+            continue
+        escalonador.partial_fit(bloco)
+        blocos_amostra.append(bloco[::passo_amostra])
+        total += len(bloco)
+
+    amostra = np.vstack(blocos_amostra) if blocos_amostra else np.empty((0, 0), dtype=np.float32)
+    if len(amostra) > tamanho_amostra:
+        amostra = amostra[np.linspace(0, len(amostra) - 1, tamanho_amostra).astype(int)]
+    return escalonador, amostra, total
+
+def ajustar_k_em_lotes(fonte, escalonador, amostra, chave, k, tamanho_lote=50_000, epocas=3):
+    """Mini-batch k-means alimentado por blocos já padronizados, com memória limitada ao bloco.
+
+    A qualidade é comparada a um KMeans completo ajustado sobre a mesma amostra
+    (razão de inércia e índice de Rand ajustado).
+    """
+    chave_k = (chave, k, 'lotes', tamanho_lote)
+    resultado = _obter_modelo(chave_k, persistir=True)
+    if resultado is not None:
+        return resultado
+
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    from sklearn.metrics import adjusted_rand_score
+    modelo = MiniBatchKMeans(n_clusters=k, batch_size=min(tamanho_lote, 4096), random_state=42, n_init=3)
+    with medir("kmeans.lotes", "agrupamento", k=k, epocas=epocas):
+        for _ in range(epocas):
+            for bloco in fonte():
+                bloco = bloco[~np.isnan(bloco).any(axis=1)]
+                if len(bloco) >= k:
+                    modelo.partial_fit(escalonador.transform(bloco))
+
+    amostra_escalada = escalonador.transform(amostra)
+    labels_lote = modelo.predict(amostra_escalada)
+    completo = KMeans(n_clusters=k, random_state=42, n_init=10).fit(amostra_escalada)
+    inercia_lote = float(((amostra_escalada - modelo.cluster_centers_[labels_lote]) ** 2).sum())
+
+    # Índices de centroide sobre todas as amostras (em blocos) e silhouette exata sobre a amostra
+    pares = lambda: ((x, modelo.predict(x)) for x in
+                     (escalonador.transform(b[~np.isnan(b).any(axis=1)]) for b in fonte()) if len(x))
+    indices = indices_em_blocos(pares, k)
+    media, intervalo, replicas = silhouette_estratificada(amostra_escalada, labels_lote)
+    indices.update(silhouette_amostral=media, ic_silhouette=intervalo, replicas_silhouette=replicas)
+
+    resultado = {
+        'k': k,
+        'modelo': modelo,
+        'indices': indices,
+        'score': indices['silhouette_simplificada'],
+        'qualidade': {
+            'razao_inercia': inercia_lote / completo.inertia_ if completo.inertia_ > 0 else 1.0,
+            'ari': float(adjusted_rand_score(completo.labels_, labels_lote)),
+        },
+    }
+    _guardar_modelo(chave_k, resultado, persistir=True)
+    return resultado
+
+@instrumentado("varredura_k", "agrupamento")
+def varrer_k_em_lotes(fonte, escalonador, amostra, chave, ks=range(2, 8), tamanho_lote=50_000, progresso=None):
+    return executar_em_paralelo(
+        lambda k: ajustar_k_em_lotes(fonte, escalonador, amostra, chave, k, tamanho_lote), ks, progresso)
+
+def rotular_em_lotes(fonte, escalonador, modelo, n_linhas):
+    """Rótulos por bloco num vetor pré-alocado; linhas com nulos recebem -1"""
+    labels = np.full(n_linhas, -1, dtype=np.int16)
+    inicio = 0
+    for bloco in fonte():
+        validos = ~np.isnan(bloco).any(axis=1)
+        if validos.any():
+            labels[inicio:inicio + len(bloco)][validos] = modelo.predict(escalonador.transform(bloco[validos]))
+        inicio += len(bloco)
+    return labels
@@ -0,0 +1,245 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from reamostragem import passo_amostragem, reamostrar_matriz
+
+# Ajuste de profundidade entre corridas de perfilagem: o deslocamento de uma curva alvo em relação
+# a uma curva de referência é o atraso de maior correlação cruzada normalizada, calculada por FFT
+# com máscara de nulos (cada atraso só usa as amostras válidas nas duas curvas). Em janelas, todas
+# são calculadas de uma vez (FFT em lote sobre uma matriz janela x amostras).
+MEMORIA_LOTE = 64 * 2**20
+
+def _grade_regular(prof, tolerancia=0.01):
+    # Correlação por atraso em amostras pressupõe passo constante
+    passo = passo_amostragem(prof)
+    diferencas = np.diff(prof)
+    regular = len(diferencas) > 0 and np.all(np.abs(diferencas - passo) <= tolerancia * passo)
+    return passo, regular
+
+def _curvas_em_grade(df, depth_col, referencia, alvo):
+    """Profundidade regular e as duas curvas nela (reamostradas só se a grade do poço for irregular)"""
+    prof = df[depth_col].to_numpy(dtype=float)
+    ref = df[referencia].to_numpy(dtype=float, na_value=np.nan)
+    alv = df[alvo].to_numpy(dtype=float, na_value=np.nan)
+    if len(prof) > 1 and not (np.diff(prof) >= 0).all():
+        # Perfis registrados de baixo para cima: a correlação é sempre feita em profundidade crescente
+        ordem = np.argsort(prof, kind="stable")
+        prof, ref, alv = prof[ordem], ref[ordem], alv[ordem]
+    passo, regular = _grade_regular(prof)
+    if not regular:
+        finitos = prof[np.isfinite(prof)]
+        grade = finitos.min() + passo * np.arange(int((finitos.max() - finitos.min()) / passo) + 1)
+        ref, alv = reamostrar_matriz(prof, np.column_stack([ref, alv]), grade).T
+        prof = grade
+    return prof, passo, ref, alv
+
+def _padronizar(x):
+    # Média zero e variância unitária sobre os válidos: estabilidade numérica das somas por FFT
+    validos = ~np.isnan(x)
+    if validos.sum() < 2:
+        return np.zeros_like(x), validos
+    media, desvio = x[validos].mean(), x[validos].std()
+    return np.where(validos, (x - media) / (desvio if desvio > 0 else 1.0), 0.0), validos
+
+def _correlacao_mascarada(a, ma, b, mb, atrasos, minimo_sobreposicao):
+    """NCC com máscara entre as linhas de `a` e `b` para cada atraso l: Σ a[i]·b[i+l].
+
+    `a` e `b` são matrizes (lote x amostras); as somas por atraso (sobreposição, médias e
+    variâncias locais) saem de seis correlações por FFT. Atrasos com sobreposição válida
+    menor que `minimo_sobreposicao` recebem NaN.
+    """
+    n = a.shape[1] + b.shape[1]
+    nfft = 1 << int(np.ceil(np.log2(n)))
+    fa = np.fft.rfft(np.stack([ma, a, a * a]), nfft, axis=-1)
+    fb = np.fft.rfft(np.stack([mb, b, b * b]), nfft, axis=-1)
+    cc = lambda x, y: np.fft.irfft(np.conj(x) * y, nfft, axis=-1)[..., atrasos % nfft]
+
+    sobreposicao = np.rint(cc(fa[0], fb[0]))
+    soma_a, soma_b = cc(fa[1], fb[0]), cc(fa[0], fb[1])
+    soma_aa, soma_bb = cc(fa[2], fb[0]), cc(fa[0], fb[2])
+    soma_ab = cc(fa[1], fb[1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = soma_ab - soma_a * soma_b / sobreposicao
+        var_a = soma_aa - soma_a ** 2 / sobreposicao
+        var_b = soma_bb - soma_b ** 2 / sobreposicao
+        ncc = cov / np.sqrt(var_a * var_b)
+    valido = (sobreposicao >= minimo_sobreposicao) & (var_a > 1e-9 * sobreposicao) & (var_b > 1e-9 * sobreposicao)
+    return np.where(valido, np.clip(ncc, -1, 1), np.nan)
+
+def _pico(ncc, atrasos):
+    """Atraso do máximo com refinamento subamostral (parábola pelos três pontos em torno do pico)"""
+    preenchido = np.where(np.isnan(ncc), -np.inf, ncc)
+    k = np.argmax(preenchido, axis=-1)
+    linhas = np.arange(ncc.shape[0])
+    maximo = preenchido[linhas, k]
+    atraso = atrasos[k].astype(float)
+    interno = (k > 0) & (k < len(atrasos) - 1)
+    esquerda = preenchido[linhas, np.maximum(k - 1, 0)]
+    direita = preenchido[linhas, np.minimum(k + 1, len(atrasos) - 1)]
+    curvatura = esquerda - 2 * maximo + direita
+    ajustavel = interno & np.isfinite(esquerda) & np.isfinite(direita) & (curvatura < 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fracao = np.where(ajustavel, 0.5 * (esquerda - direita) / curvatura, 0.0)
+    return atraso + fracao, np.where(np.isfinite(maximo), maximo, np.nan)
+
+def deslocamento_global(df, depth_col, referencia, alvo, max_deslocamento=5.0, minimo_sobreposicao=0.5):
+    """Deslocamento único (m) a somar à profundidade do alvo para casá-lo com a referência.
+
+    Retorna dict com 'deslocamento', 'correlacao' (NCC no pico) e a curva NCC por deslocamento
+    ('deslocamentos', 'ncc'). `minimo_sobreposicao` é a fração mínima de amostras válidas em comum.
+    """
+    prof, passo, ref, alv = _curvas_em_grade(df, depth_col, referencia, alvo)
+    a, ma = _padronizar(alv)
+    b, mb = _padronizar(ref)
+    max_atraso = max(1, int(round(max_deslocamento / passo)))
+    atrasos = np.arange(-max_atraso, max_atraso + 1)
+    minimo = minimo_sobreposicao * min(ma.sum(), mb.sum())
+    ncc = _correlacao_mascarada(a[None], ma[None].astype(float), b[None], mb[None].astype(float), atrasos, minimo)
+    atraso, correlacao = _pico(ncc, atrasos)
+    return {
+        'deslocamento': float(atraso[0] * passo),
+        'correlacao': float(correlacao[0]),
+        'deslocamentos': atrasos * passo,
+        'ncc': ncc[0],
+        'passo': passo,
+    }
+
+def deslocamentos_em_janelas(df, depth_col, referencia, alvo, janela=50.0, passo_janela=None,
+                             max_deslocamento=3.0, correlacao_minima=0.5, minimo_sobreposicao=0.5):
+    """Deslocamento (m) por janela móvel do alvo, buscando na referência até ±`max_deslocamento`.
+
+    Janelas de `janela` m a cada `passo_janela` m (padrão: metade da janela). Retorna um DataFrame
+    com o centro de cada janela, o deslocamento, a correlação no pico e se a janela é confiável
+    (correlação ≥ `correlacao_minima`). As janelas são processadas em lotes de memória limitada.
+    """
+    prof, passo, ref, alv = _curvas_em_grade(df, depth_col, referencia, alvo)
+    n = len(prof)
+    largura = max(4, int(round(janela / passo)))
+    avanco = max(1, int(round((passo_janela or janela / 2) / passo)))
+    max_atraso = max(1, int(round(max_deslocamento / passo)))
+    if n < largura:
+        return pd.DataFrame(columns=['profundidade', 'deslocamento', 'correlacao', 'confiavel'])
+
+    a, ma = _padronizar(alv)
+    b, mb = _padronizar(ref)
+    # Referência com margem de max_atraso nas duas pontas: janelas junto às bordas também buscam
+    b = np.pad(b, max_atraso)
+    mb = np.pad(mb, max_atraso).astype(float)
+    ma = ma.astype(float)
+
+    inicios = np.arange(0, n - largura + 1, avanco)
+    atrasos = np.arange(2 * max_atraso + 1)  # atraso l ↔ deslocamento (l - max_atraso) amostras
+    janela_a = np.lib.stride_tricks.sliding_window_view(a, largura)
+    janela_ma = np.lib.stride_tricks.sliding_window_view(ma, largura)
+    janela_b = np.lib.stride_tricks.sliding_window_view(b, largura + 2 * max_atraso)
+    janela_mb = np.lib.stride_tricks.sliding_window_view(mb, largura + 2 * max_atraso)
+
+    nfft = 1 << int(np.ceil(np.log2(2 * largura + 2 * max_atraso)))
+    por_lote = max(1, MEMORIA_LOTE // (nfft * 8 * 16))
+    deslocamento = np.empty(len(inicios))
+    correlacao = np.empty(len(inicios))
+    for i in range(0, len(inicios), por_lote):
+        lote = inicios[i:i + por_lote]
+        ncc = _correlacao_mascarada(janela_a[lote], janela_ma[lote], janela_b[lote], janela_mb[lote],
+                                    atrasos, minimo_sobreposicao * largura)
+        atraso, pico = _pico(ncc, atrasos)
+        deslocamento[i:i + len(lote)] = (atraso - max_atraso) * passo
+        correlacao[i:i + len(lote)] = pico
+
+    return pd.DataFrame({
+        'profundidade': prof[inicios + largura // 2],
+        'deslocamento': deslocamento,
+        'correlacao': correlacao,
+        'confiavel': correlacao >= correlacao_minima,
+    })
+
+def perfil_deslocamento(janelas, profundidade, suavizar=3):
+    """Deslocamento em cada profundidade: mediana móvel das janelas confiáveis, interpolada.
+
+    Janelas não confiáveis são descartadas; fora da primeira/última janela o deslocamento é constante.
+    """
+    confiaveis = janelas[janelas['confiavel']]
+    if confiaveis.empty:
+        return np.zeros(len(profundidade))
+    valores = confiaveis['deslocamento']
+    if suavizar > 1:
+        valores = valores.rolling(suavizar, center=True, min_periods=1).median()
+    return np.interp(profundidade, confiaveis['profundidade'].to_numpy(), valores.to_numpy())
+
+def aplicar_deslocamento(df, depth_col, curvas, deslocamento):
+    """Curvas deslocadas em profundidade; as demais colunas são compartilhadas com `df` (sem cópia).
+
+    `deslocamento` é um valor (m) ou um vetor por amostra: o valor na profundidade z passa a ser
+    o da curva original em z - deslocamento(z), interpolado sem propagar nulos aos vizinhos.
+    """
+    prof = df[depth_col].to_numpy(dtype=float)
+    origem = prof - np.broadcast_to(np.asarray(deslocamento, dtype=float), prof.shape)
+    # Leitura em profundidade crescente (perfis de baixo para cima inclusive); o resultado volta
+    # à ordem original das linhas
+    ordem = np.argsort(prof, kind="stable")
+    origem = origem[ordem]
+    ausente = np.isnan(origem)
+    # Posições de leitura crescentes (deslocamento varia devagar em relação ao passo)
+    origem = np.maximum.accumulate(np.where(ausente, -np.inf, origem))
+    matriz = np.column_stack([df[c].to_numpy(dtype=float, na_value=np.nan) for c in curvas])
+    lidas = reamostrar_matriz(prof, matriz, origem)
+    lidas[ausente] = np.nan
+    deslocadas = np.empty_like(lidas)
+    deslocadas[ordem] = lidas
+    # Copy-on-write: só as curvas deslocadas ocupam memória nova
+    return df.assign(**{c: deslocadas[:, j].astype(df[c].dtype if df[c].dtype == np.float32 else np.float64,
+                                                    copy=False)
+                        for j, c in enumerate(curvas)})
+
+def chave_ajuste(chave_poco, parametros):
+    return hashlib.blake2b(repr((chave_poco, parametros)).encode(), digest_size=16).hexdigest()
+
+def controle_ajuste(df, depth_col, chave_poco, prefixo):
+    """Ajuste de profundidade na sidebar: estima o deslocamento do alvo contra a referência e
+    devolve (df com as curvas do alvo deslocadas, hash derivado)"""
+    import streamlit as st
+    from cache_compartilhado import CACHE
+
+    curvas = [c for c in df.select_dtypes(include="number").columns if c != depth_col]
+    if not depth_col or len(curvas) < 2:
+        return df, chave_poco
+    if not st.checkbox("Ajustar profundidade entre corridas", key=f"{prefixo}_ajuste",
+                       help="Casa curvas de corridas diferentes pela correlação cruzada com uma referência"):
+        return df, chave_poco
+
+    referencia = st.selectbox("Curva de referência", curvas, key=f"{prefixo}_ajuste_ref")
+    opcoes_alvo = [c for c in curvas if c != referencia]
+    alvo = st.selectbox("Curva a casar", opcoes_alvo, key=f"{prefixo}_ajuste_alvo")
+    mover = st.multiselect("Curvas deslocadas junto (mesma corrida)", opcoes_alvo, default=[alvo],
+                           key=f"{prefixo}_ajuste_mover")
+    modo = st.radio("Deslocamento", ["Único", "Por janelas"], horizontal=True, key=f"{prefixo}_ajuste_modo")
+    max_deslocamento = st.number_input("Deslocamento máximo (m)", min_value=0.1, value=3.0, step=0.5,
+                                       key=f"{prefixo}_ajuste_max")
+    janela = None
+    if modo == "Por janelas":
+        janela = st.number_input("Janela (m)", min_value=5.0, value=50.0, step=10.0, key=f"{prefixo}_ajuste_janela")
+    if not mover:
+        return df, chave_poco
+
+    parametros = (referencia, alvo, tuple(mover), modo, float(max_deslocamento), janela)
+    chave = chave_ajuste(chave_poco, parametros)
+
+    def calcular():
+        if modo == "Único":
+            resultado = deslocamento_global(df, depth_col, referencia, alvo, max_deslocamento)
+            deslocamento = resultado['deslocamento'] if np.isfinite(resultado['correlacao']) else 0.0
+            return aplicar_deslocamento(df, depth_col, mover, deslocamento), resultado
+        janelas = deslocamentos_em_janelas(df, depth_col, referencia, alvo, janela, max_deslocamento=max_deslocamento)
+        deslocamento = perfil_deslocamento(janelas, df[depth_col].to_numpy(dtype=float))
+        return aplicar_deslocamento(df, depth_col, mover, deslocamento), janelas
+
+    ajustado, resultado = CACHE.obter_ou_calcular(('ajuste_profundidade', chave), calcular)
+    if modo == "Único":
+        st.caption(f"Deslocamento de {alvo}: {resultado['deslocamento']:+.3f} m "
+                   f"(correlação {resultado['correlacao']:.2f})")
+    else:
+        confiaveis = int(resultado['confiavel'].sum())
+        st.caption(f"{confiaveis}/{len(resultado)} janelas confiáveis; deslocamento mediano "
+                   f"{resultado.loc[resultado['confiavel'], 'deslocamento'].median():+.3f} m")
+        st.line_chart(resultado.set_index('profundidade')['deslocamento'], height=150)
+    return ajustado, chave
@@ -1,24 +1,51 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
-from PIL import Image
 import importlib
+import recursos
+import instrumentacao
+
+# Páginas do menu: rótulo -> (módulo, ícone). Cada módulo é importado uma única vez por processo,
+# na primeira visita, e reaproveitado em todos os reruns e sessões (o próprio Streamlit descarta
+# módulos editados durante o desenvolvimento). Bibliotecas pesadas são importadas dentro das funções.
+PAGINAS = {
+    "Home": (None, "house"),
+    "Importação": ("importacao", "cloud-upload"),
+    "Visualização": ("Plotagem", "eye"),
+    "Estatísticas": ("estatistica", "graph-up"),
+    "Classificação Litológica": ("litofaceis", "bar-chart"),
+    "Cálculo Petrofísico": ("calculopetrofisico", "calculator"),
+    "Correlação de Poços": ("correlacaoestratigrafica", "diagram-3"),
+    "Conversão de Dados": ("conversao", "shuffle"),
+    "Autor do Aplicativo": ("autores", "info-circle"),
+}
+
+def carregar_pagina(nome):
+    return importlib.import_module(PAGINAS[nome][0])
+
+def indice_pagina_pedida():
+    # ?pagina=<módulo ou rótulo> abre o app direto numa página (links e testes automatizados)
+    pedida = st.query_params.get("pagina")
+    for i, (rotulo, (modulo, _)) in enumerate(PAGINAS.items()):
+        if pedida in (rotulo, modulo):
+            return i
+    return 0
+
+# Imagens pré-processadas uma vez por processo (python recursos.py as regera) e servidas como
+# arquivos estáticos: cada rerun envia só as URLs, e o navegador mantém as imagens em cache
+@st.cache_resource(show_spinner=False)
+def preparar_recursos():
+    return recursos.gerar_recursos()
+
+preparar_recursos()
 
 # Configurar página
-st.set_page_config(page_title="PYGEOPLOT", page_icon="Imagem/WhatsApp Image 2024-09-29 at 02.22.00.jpeg", layout="wide")
+st.set_page_config(page_title="PYGEOPLOT", page_icon=recursos.caminho(recursos.ICONE), layout="wide")
 
 # Adicionar imagem de fundo
-import base64
-
-def get_base64_image(image_path):
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode()
-
-img_base64 = get_base64_image("Imagem/02.jpg")
-
 st.markdown(f"""
     <style>
     .stApp {{
-        background-image: url("data:image/jpg;base64,{img_base64}");
+        background-image: url("{recursos.url(recursos.FUNDO)}");
         background-size: cover;
         background-position: center;
         background-repeat: no-repeat;
@@ -29,26 +56,15 @@ st.markdown(f"""
 
 # Logo no sidebar
 with st.sidebar:
-    st.image("Imagem/WhatsApp Image 2024-09-29 at 02.22.00.jpeg")
+    st.markdown(f'<img src="{recursos.url(recursos.LOGO)}" style="width: 100%;">', unsafe_allow_html=True)
 
 # Menu horizontal no header
 escolha = option_menu(
     None,
-    [
-        "Home",
-        "Importação",
-        "Visualização",
-        "Estatísticas",
-        "Classificação Litológica",
-        "Cálculo Petrofísico",
-        "Conversão de Dados",
-        "Autor do Aplicativo"
-    ],
-    icons=[
-        "house", "cloud-upload", "eye", "graph-up", "bar-chart", "calculator", "shuffle", "info-circle"
-    ],
+    list(PAGINAS),
+    icons=[icone for _, icone in PAGINAS.values()],
     menu_icon="cast",
-    default_index=0,
+    default_index=indice_pagina_pedida(),
     orientation="horizontal",
     styles={
         "container": {"padding": "0!important", "background-color": "#fafafa"},
@@ -64,6 +80,9 @@ escolha = option_menu(
     }
 )
 
+# Com o painel de desempenho ligado, os trechos instrumentados deste rerun vão para o registro da sessão
+instrumentacao.iniciar_rerun(escolha)
+
 # Roteamento
 if escolha == "Home":
     # Informações na sidebar
@@ -142,100 +161,23 @@ if escolha == "Home":
     # Exemplo de visualização - Pairplot
     st.markdown("### 📊 Matriz de Correlação - Pairplot")
 
-    # Criar dados de exemplo para diferentes litologias
-    import numpy as np
-    import pandas as pd
-    import seaborn as sns
-
-    np.random.seed(42)
-
-    # Gerar dados sintéticos para diferentes litologias
-    n_samples = 100
-
-    # Arenito
-    arenito = pd.DataFrame({
-        'GR': np.random.normal(45, 10, n_samples),
-        'Densidade': np.random.normal(2.35, 0.08, n_samples),
-        'Neutrão': np.random.normal(0.22, 0.05, n_samples),
-        'Resistividade': np.random.normal(25, 8, n_samples),
-        'Litologia': 'Arenito'
-    })
-
-    # Folhelho
-    folhelho = pd.DataFrame({
-        'GR': np.random.normal(95, 15, n_samples),
-        'Densidade': np.random.normal(2.55, 0.07, n_samples),
-        'Neutrão': np.random.normal(0.35, 0.06, n_samples),
-        'Resistividade': np.random.normal(8, 3, n_samples),
-        'Litologia': 'Folhelho'
-    })
-
-    # Calcário
-    calcario = pd.DataFrame({
-        'GR': np.random.normal(30, 8, n_samples),
-        'Densidade': np.random.normal(2.71, 0.06, n_samples),
-        'Neutrão': np.random.normal(0.08, 0.03, n_samples),
-        'Resistividade': np.random.normal(45, 12, n_samples),
-        'Litologia': 'Calcário'
-    })
-
-    # Combinar todos os dados
-    df_lito = pd.concat([arenito, folhelho, calcario], ignore_index=True)
-
-    # Criar Pairplot
-    colors = {'Arenito': '#FFD700', 'Folhelho': '#8B4513', 'Calcário': '#87CEEB'}
-
-    sns.set_style("whitegrid")
-    pairplot_fig = sns.pairplot(df_lito, hue='Litologia',
-                                palette=colors,
-                                diag_kind='kde',
-                                plot_kws={'alpha': 0.6, 's': 30, 'edgecolor': 'black', 'linewidth': 0.5},
-                                diag_kws={'alpha': 0.7, 'linewidth': 2})
-    pairplot_fig.figure.suptitle('Análise Multivariada de Litologias', y=1.01, fontsize=16, fontweight='bold')
-    st.pyplot(pairplot_fig)
+    # Pré-renderizado por recursos.py (mesmos dados sintéticos, semente fixa)
+    st.markdown(f'<img src="{recursos.url(recursos.PAIRPLOT_DEMO)}" style="width: 100%;">',
+                unsafe_allow_html=True)
 
     # Informações adicionais
     st.markdown("---")
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        st.metric("Total de Amostras", f"{len(df_lito)}")
+        st.metric("Total de Amostras", f"{len(recursos.CORES_DEMO) * recursos.AMOSTRAS_DEMO}")
     with col2:
         st.metric("Litologias Identificadas", "3")
     with col3:
         st.metric("Parâmetros Analisados", "4")
 
-elif escolha == "Importação":
-    import importacao
-    importlib.reload(importacao)
-    importacao.app()
-
-elif escolha == "Visualização":
-    import Plotagem
-    importlib.reload(Plotagem)
-    Plotagem.app()
-
-elif escolha == "Estatísticas":
-    import estatistica
-    importlib.reload(estatistica)
-    estatistica.app()
-
-elif escolha == "Classificação Litológica":
-    import litofaceis
-    importlib.reload(litofaceis)
-    litofaceis.app()
-
-elif escolha == "Cálculo Petrofísico":
-    import calculopetrofisico
-    importlib.reload(calculopetrofisico)
-    calculopetrofisico.app()
-
-elif escolha == "Conversão de Dados":
-    import conversao
-    importlib.reload(conversao)
-    conversao.app()
-
-elif escolha == "Autor do Aplicativo":
-    import autores
-    importlib.reload(autores)
-    autores.app()
+else:
+    with instrumentacao.medir(f"pagina.{PAGINAS[escolha][0]}", "pagina"):
+        carregar_pagina(escolha).app()
+
+instrumentacao.exibir_painel()
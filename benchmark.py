@@ -0,0 +1,289 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+import numpy as np
+
+# Resultados intermediários do benchmark não devem ir para o cache em disco do aplicativo
+os.environ.setdefault("PYGEOPLOT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "pygeoplot_benchmark"))
+
+import sintetico
+from cache_compartilhado import CACHE
+import cache_disco
+import instrumentacao
+
+# A referência depende da máquina e não vai para o repositório; crie-a antes de comparar:
+#   python benchmark.py --salvar-referencia      (na versão de base, com as mesmas opções da comparação)
+#   python benchmark.py                          (compara e sai com código 1 em caso de regressão)
+#   python benchmark.py --sem-referencia         (só mede)
+REFERENCIA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_referencia.json")
+
+# Casos do benchmark: nome -> função que recebe o contexto (poço sintético já gerado)
+CASOS = {}
+
+def caso(nome):
+    def registrar(funcao):
+        CASOS[nome] = funcao
+        return funcao
+    return registrar
+
+class _SemProgresso:
+    # Substitui a Tarefa nas funções que reportam progresso
+    def atualizar(self, fracao, mensagem=""):
+        pass
+
+def _las(contexto):
+    # O LAS só é gerado se algum caso precisar dele
+    if 'las' not in contexto:
+        from escrita_las import escrever_las
+        contexto['las'] = escrever_las(contexto['dados'], cabecalho=contexto['cabecalho'])
+    return contexto['las']
+
+@caso("importacao_las")
+def _importacao(contexto):
+    from importacao import ler_poco
+    # Sem o cache compartilhado: leitura, hash e varredura de qualidade a cada execução
+    ler_poco.__wrapped__(_las(contexto), uuid.uuid4().hex)
+
+@caso("deteccao_curvas")
+def _deteccao(contexto):
+    from calculopetrofisico import detectar_curvas_automaticamente
+    # Independe do tamanho do poço: 1000 detecções por execução
+    for _ in range(1000):
+        detectar_curvas_automaticamente(contexto['cabecalho'])
+
+@caso("filtro_profundidade")
+def _filtro(contexto):
+    from acesso_dados import fatiar_profundidade
+    df = contexto['dados']
+    prof = df['DEPTH'].to_numpy()
+    for topo in np.linspace(prof[0], prof[-1], 20):
+        fatiar_profundidade(df, 'DEPTH', (topo, topo + (prof[-1] - prof[0]) / 4))['GR'].sum()
+
+@caso("qualidade")
+def _qualidade(contexto):
+    from qualidade import escanear_qualidade
+    escanear_qualidade(contexto['dados'], 'DEPTH')
+
+@caso("petrofisica")
+def _petrofisica(contexto):
+    from calculopetrofisico import calcular_petrofisica, detectar_curvas_automaticamente
+    curvas = detectar_curvas_automaticamente(contexto['cabecalho'])
+    calcular_petrofisica(_SemProgresso(), contexto['dados'], 'DEPTH', curvas, contexto['zonas'],
+                         2.65, 1.0, 1.0, 2.0, 2.0, 0.08)
+
+@caso("estatisticas_descritivas")
+def _descritivas(contexto):
+    contexto['dados'][contexto['curvas']].describe()
+
+@caso("correlacao_spearman")
+def _correlacao(contexto):
+    from correlacao import matriz_correlacao
+    matriz_correlacao(contexto['dados'], contexto['curvas'], "Spearman")
+
+@caso("estatisticas_moveis")
+def _moveis(contexto):
+    from estatistica_movel import estatisticas_moveis
+    estatisticas_moveis(contexto['dados'], 'DEPTH', contexto['curvas'], janela=15.24)
+
+@caso("reamostragem")
+def _reamostragem(contexto):
+    from reamostragem import reamostrar
+    # Decimação com média em bloco e volta ao passo original por interpolação linear
+    decimado = reamostrar(contexto['dados'], 'DEPTH', passo=0.6096, metodo="media")
+    reamostrar(decimado, 'DEPTH', passo=0.1524, metodo="linear")
+
+@caso("ajuste_profundidade")
+def _ajuste(contexto):
+    from ajuste_profundidade import deslocamentos_em_janelas, perfil_deslocamento, aplicar_deslocamento
+    df = contexto['dados']
+    janelas = deslocamentos_em_janelas(df, 'DEPTH', 'GR', 'DT', janela=50.0, max_deslocamento=3.0)
+    aplicar_deslocamento(df, 'DEPTH', ['DT'], perfil_deslocamento(janelas, df['DEPTH'].to_numpy()))
+
+@caso("correlacao_pocos")
+def _correlacao_pocos(contexto):
+    from correlacao_pocos import correlacionar_cadeia, projetar_topos
+    # Um par (o poço contra uma cópia 5% mais espessa), limitado a `max_kmeans` amostras como a varredura:
+    # a etapa fina percorre uma linha por amostra
+    df = contexto['dados'].iloc[:contexto['max_kmeans']]
+    alvo = df.assign(DEPTH=df['DEPTH'].iloc[0] + 300.0 + (df['DEPTH'] - df['DEPTH'].iloc[0]) * 1.05)
+    cadeia = correlacionar_cadeia({'A': (df, 'DEPTH'), 'B': (alvo, 'DEPTH')}, 'GR', max_workers=1)
+    projetar_topos({z: topo for z, (topo, *_) in enumerate(contexto['zonas'])}, cadeia, ['A', 'B'])
+
+@caso("estatistica_campo")
+def _estatistica_campo(contexto):
+    from estatistica_campo import resumir_poco, reduzir, tabela_resumo, tabela_normalizacao
+    # O poço fatiado em 20 "poços" com 5 zonas cada: parciais (sem cache nem processos) e fusões
+    df, curvas = contexto['dados'], contexto['curvas']
+    zonas = tuple((f"Z{i}", topo, base) for i, (topo, base, *_) in enumerate(contexto['zonas']))
+    limites = np.linspace(0, len(df), 21).astype(int)
+    parciais = {f"P{i}": resumir_poco(df.iloc[a:b], 'DEPTH', curvas, zonas)
+                for i, (a, b) in enumerate(zip(limites[:-1], limites[1:]))}
+    tabela_resumo(reduzir(parciais, ("Zona",)), ("Zona",))
+    tabela_normalizacao(parciais, curvas)
+
+@caso("kmeans_varredura")
+def _kmeans(contexto):
+    from agrupamento import varrer_k
+    # Varredura completa limitada a `max_kmeans` amostras; para o poço inteiro, ver kmeans_lotes
+    df = contexto['dados'].dropna(subset=contexto['curvas']).iloc[:contexto['max_kmeans']]
+    X = df[contexto['curvas']].to_numpy()
+    X = (X - X.mean(axis=0)) / X.std(axis=0)
+    varrer_k(X, ('benchmark', uuid.uuid4().hex), range(2, 7))
+
+@caso("kmeans_lotes")
+def _kmeans_lotes(contexto):
+    from agrupamento import iterar_blocos, escalonar_em_lotes, varrer_k_em_lotes
+    fonte = lambda: iterar_blocos(contexto['dados'], contexto['curvas'], 50_000)
+    escalonador, amostra, _ = escalonar_em_lotes(fonte, passo_amostra=max(1, len(contexto['dados']) // 20_000))
+    varrer_k_em_lotes(fonte, escalonador, amostra, ('benchmark', uuid.uuid4().hex), range(2, 7))
+
+@caso("figura_perfis")
+def _figura(contexto):
+    from Plotagem import figura_perfis_interativa
+    df = contexto['dados']
+    # Construção e serialização em JSON, o que o st.plotly_chart envia ao navegador
+    fig, _ = figura_perfis_interativa(df, 'DEPTH', contexto['curvas'], (df['DEPTH'].iloc[0], df['DEPTH'].iloc[-1]))
+    fig.to_json()
+
+@caso("escrita_las")
+def _escrita(contexto):
+    from escrita_las import escrever_las
+    escrever_las(contexto['dados'], cabecalho=contexto['cabecalho'])
+
+def _limpar_caches():
+    CACHE.descartar()
+    cache_disco.limpar()
+
+_aquecidos = set()
+
+def medir(funcao, contexto, repeticoes=3):
+    """Mediana e mínimo de `repeticoes` execuções e pico de memória (tracemalloc) numa execução extra"""
+    if funcao not in _aquecidos:
+        # Primeira execução do caso no processo, fora da medição: imports tardios e inicializações
+        funcao(contexto)
+        _aquecidos.add(funcao)
+
+    tempos = []
+    for _ in range(repeticoes):
+        _limpar_caches()
+        inicio = time.perf_counter()
+        funcao(contexto)
+        tempos.append(time.perf_counter() - inicio)
+
+    # Execução separada: o tracemalloc deixa o código Python mais lento e distorceria os tempos
+    _limpar_caches()
+    tracemalloc.start()
+    funcao(contexto)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    mediana = float(np.median(tempos))
+    return {
+        'mediana_s': mediana,
+        'minimo_s': float(min(tempos)),
+        'amostras_por_s': contexto['n_amostras'] / mediana if mediana > 0 else float('inf'),
+        'pico_mb': pico / 2**20,
+    }
+
+def preparar(n_amostras, n_curvas=6, max_kmeans=100_000, semente=0):
+    poco = sintetico.gerar_poco(n_amostras, n_curvas=n_curvas, semente=semente)
+    return {
+        'dados': poco['dados'],
+        'cabecalho': poco['cabecalho'],
+        'zonas': poco['zonas'],
+        'curvas': [c for c in poco['dados'].columns if c != 'DEPTH'],
+        'n_amostras': n_amostras,
+        'max_kmeans': max_kmeans,
+    }
+
+def executar(tamanhos, casos=None, n_curvas=6, repeticoes=3, max_kmeans=100_000, ao_medir=None):
+    """Roda os casos para cada tamanho de poço; resultados indexados por '<caso>@<n_amostras>'"""
+    resultados = {}
+    for n_amostras in tamanhos:
+        contexto = preparar(n_amostras, n_curvas, max_kmeans)
+        for nome in casos or CASOS:
+            chave = f"{nome}@{n_amostras}"
+            resultados[chave] = medir(CASOS[nome], contexto, repeticoes)
+            if ao_medir:
+                ao_medir(chave, resultados[chave])
+    _limpar_caches()
+    return resultados
+
+def comparar(resultados, referencia, tolerancia=0.25, minimo_s=0.02, minimo_mb=1.0):
+    """Variação relativa de tempo (melhor execução) e memória contra a referência.
+
+    É regressão a piora acima da tolerância que também passe de `minimo_s` / `minimo_mb`
+    em valor absoluto: casos de poucos milissegundos oscilam demais para uma comparação relativa.
+    """
+    comparacao = {}
+    for chave, atual in resultados.items():
+        anterior = referencia.get(chave)
+        if anterior is None:
+            continue
+        tempo = atual['minimo_s'] / anterior['minimo_s'] - 1 if anterior['minimo_s'] > 0 else 0.0
+        memoria = atual['pico_mb'] / anterior['pico_mb'] - 1 if anterior['pico_mb'] > 0 else 0.0
+        piorou_tempo = tempo > tolerancia and atual['minimo_s'] - anterior['minimo_s'] > minimo_s
+        piorou_memoria = memoria > tolerancia and atual['pico_mb'] - anterior['pico_mb'] > minimo_mb
+        comparacao[chave] = {'tempo': tempo, 'memoria': memoria, 'regressao': piorou_tempo or piorou_memoria}
+    return comparacao
+
+def _formatar(chave, r, c=None):
+    linha = f"{chave:<36}{r['mediana_s']:>10.3f}s{r['amostras_por_s'] / 1e6:>10.2f} M/s{r['pico_mb']:>10.1f} MB"
+    if c:
+        linha += f"   {c['tempo']:+7.1%} tempo {c['memoria']:+7.1%} mem" + ("  << REGRESSÃO" if c['regressao'] else "")
+    return linha
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos de cálculo com poços sintéticos")
+    parser.add_argument("--amostras", type=lambda v: int(float(v)), nargs="+", default=[100_000],
+                        help="tamanhos dos poços (ex.: 1e4 1e6 5e7)")
+    parser.add_argument("--curvas", type=int, default=6)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--casos", nargs="+", choices=list(CASOS), default=None)
+    parser.add_argument("--max-kmeans", type=int, default=100_000)
+    parser.add_argument("--referencia", default=REFERENCIA, help="JSON com os resultados de referência")
+    parser.add_argument("--salvar-referencia", action="store_true", help="grava os resultados como nova referência")
+    parser.add_argument("--sem-referencia", action="store_true", help="só mede, sem comparar com a referência")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="piora relativa tolerada (0.25 = 25%%)")
+    parser.add_argument("--saida", help="grava os resultados desta execução em JSON")
+    parser.add_argument("--trace", help="grava os trechos instrumentados em formato Chrome trace (os tempos incluem a medição)")
+    args = parser.parse_args()
+
+    referencia = {}
+    if not (args.salvar_referencia or args.sem_referencia):
+        if not os.path.exists(args.referencia):
+            # Sem referência não há o que comparar: falhar em vez de aprovar qualquer resultado
+            print(f"Referência {args.referencia} não encontrada. Grave-a na versão de base com\n"
+                  f"  python benchmark.py --salvar-referencia [mesmas opções]\n"
+                  f"ou rode com --sem-referencia para apenas medir.", file=sys.stderr)
+            sys.exit(2)
+        with open(args.referencia, encoding="utf-8") as arquivo:
+            referencia = json.load(arquivo)
+
+    print(f"{'caso@amostras':<36}{'mediana':>11}{'vazão':>14}{'pico':>13}")
+    ao_medir = lambda chave, r: print(_formatar(chave, r, comparar({chave: r}, referencia, args.tolerancia).get(chave)),
+                                      flush=True)
+    with instrumentacao.gravar() if args.trace else contextlib.nullcontext() as registro:
+        resultados = executar(args.amostras, args.casos, args.curvas, args.repeticoes, args.max_kmeans, ao_medir)
+    if args.trace:
+        with open(args.trace, "wb") as arquivo:
+            arquivo.write(registro.exportar_chrome_trace())
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+    if args.salvar_referencia:
+        with open(args.referencia, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+        print(f"Referência gravada em {args.referencia}")
+
+    regressoes = [c for c, v in comparar(resultados, referencia, args.tolerancia).items() if v['regressao']]
+    if regressoes:
+        print(f"{len(regressoes)} regressão(ões): {', '.join(regressoes)}")
+        sys.exit(1)
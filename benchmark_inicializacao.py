@@ -0,0 +1,72 @@
+import ast
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Uso: python benchmark_inicializacao.py [n_amostras]
+# Cada medição roda num processo novo (imports a frio), executando app1.py com o AppTest do Streamlit.
+# Relata a partida a frio (Home), a primeira renderização de cada página e o rerun seguinte.
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+def paginas_do_app():
+    """Módulos das páginas registradas em PAGINAS de app1.py, lidos sem executar o app"""
+    with open(os.path.join(DIRETORIO, "app1.py"), encoding="utf-8") as arquivo:
+        arvore = ast.parse(arquivo.read())
+    for no in arvore.body:
+        if isinstance(no, ast.Assign) and any(getattr(alvo, "id", None) == "PAGINAS" for alvo in no.targets):
+            return [modulo for modulo, _ in ast.literal_eval(no.value).values() if modulo]
+    raise RuntimeError("PAGINAS não encontrado em app1.py")
+
+PAGINAS = paginas_do_app()
+
+def medir(pagina, n_amostras):
+    # Executado no processo filho: tempos desde a partida do interpretador
+    inicio = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    importado = time.perf_counter()
+
+    app = AppTest.from_file(os.path.join(DIRETORIO, "app1.py"), default_timeout=120)
+    t = time.perf_counter()
+    app.run()
+    resultado = {"pagina": pagina, "import_streamlit": importado - inicio, "home": time.perf_counter() - t}
+
+    if pagina != "Home":
+        from sintetico import gerar_poco
+        poco = gerar_poco(n_amostras)
+        app.session_state["well_data"] = poco['dados']
+        app.session_state["las_object"] = poco['cabecalho']
+        app.query_params["pagina"] = pagina
+        t = time.perf_counter()
+        app.run()
+        resultado["primeira"] = time.perf_counter() - t
+        t = time.perf_counter()
+        app.run()
+        resultado["rerun"] = time.perf_counter() - t
+    resultado["excecoes"] = [e.message for e in app.exception]
+    return resultado
+
+def executar(n_amostras=20_000):
+    resultados = []
+    for pagina in ["Home"] + PAGINAS:
+        saida = subprocess.run([sys.executable, os.path.abspath(__file__), "--medir", pagina, str(n_amostras)],
+                               cwd=DIRETORIO, capture_output=True, text=True, check=True)
+        resultados.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+    return resultados
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--medir":
+        sys.path.insert(0, DIRETORIO)
+        print(json.dumps(medir(sys.argv[2], int(sys.argv[3]))))
+        sys.exit(0)
+
+    n_amostras = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    resultados = executar(n_amostras)
+    largura = max(20, max(len(r['pagina']) for r in resultados) + 2)
+    print(f"{'página':<{largura}}{'import st':>11}{'home':>9}{'1ª render':>11}{'rerun':>9}")
+    for r in resultados:
+        pagina = f"{r['primeira']:>10.2f}s{r['rerun']:>8.2f}s" if "primeira" in r else f"{'-':>11}{'-':>9}"
+        erro = f"  erro: {r['excecoes'][0]}" if r["excecoes"] else ""
+        print(f"{r['pagina']:<{largura}}{r['import_streamlit']:>10.2f}s{r['home']:>8.2f}s{pagina}{erro}")
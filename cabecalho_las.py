@@ -0,0 +1,63 @@
+class ItemCabecalho:
+    """Linha de cabeçalho LAS (mnemônico, unidade, valor, descrição), sem dados de curva"""
+    __slots__ = ("mnemonic", "unit", "value", "descr")
+
+    def __init__(self, mnemonic, unit="", value="", descr=""):
+        self.mnemonic = mnemonic
+        self.unit = unit
+        self.value = value
+        self.descr = descr
+
+    def __repr__(self):
+        return f"ItemCabecalho({self.mnemonic!r}, {self.unit!r}, {self.value!r}, {self.descr!r})"
+
+class SecaoCabecalho(list):
+    """Seção do cabeçalho com a mesma interface usada do lasio: iteração, `items()` e acesso por mnemônico"""
+
+    def keys(self):
+        return [item.mnemonic for item in self]
+
+    def items(self):
+        return [(item.mnemonic, item) for item in self]
+
+    def __getitem__(self, chave):
+        if isinstance(chave, str):
+            for item in self:
+                if item.mnemonic == chave:
+                    return item
+            raise KeyError(chave)
+        return super().__getitem__(chave)
+
+    def __contains__(self, chave):
+        if isinstance(chave, str):
+            return chave in self.keys()
+        return super().__contains__(chave)
+
+class CabecalhoLAS:
+    """Metadados de um arquivo LAS (~V, ~W, ~C, ~P e ~O) no lugar do lasio.LASFile completo.
+
+    Os dados das curvas ficam só no DataFrame do poço (`well_data`); guardar o LASFile
+    na sessão duplicaria cada curva na memória.
+    """
+
+    def __init__(self, version, well, curves, params, other=""):
+        self.version = version
+        self.well = well
+        self.curves = curves
+        self.params = params
+        self.other = other
+
+    def keys(self):
+        return self.curves.keys()
+
+def _secao(itens):
+    return SecaoCabecalho(ItemCabecalho(i.mnemonic, i.unit, i.value, i.descr) for i in itens)
+
+def extrair_cabecalho(las):
+    return CabecalhoLAS(
+        version=_secao(las.version),
+        well=_secao(las.well),
+        curves=_secao(las.curves),
+        params=_secao(las.params),
+        other=las.other,
+    )
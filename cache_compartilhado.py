@@ -0,0 +1,156 @@
+import functools
+import inspect
+import os
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import cache_disco
+
+def tamanho_objeto(obj, nivel=0):
+    """Estimativa de memória (bytes) de DataFrames, arrays e contêineres com eles"""
+    if nivel > 6:
+        return sys.getsizeof(obj)
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        # Series.memory_usage devolve um inteiro; DataFrame.memory_usage, uma Series por coluna
+        return int(np.sum(obj.memory_usage(deep=False))) if not isinstance(obj, pd.Index) else int(obj.nbytes)
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, (bytes, bytearray, str)):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(tamanho_objeto(v, nivel + 1) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(tamanho_objeto(v, nivel + 1) for v in obj)
+    if hasattr(obj, '__dict__'):
+        # Modelos do scikit-learn: os atributos ajustados são arrays
+        return sys.getsizeof(obj) + sum(tamanho_objeto(v, nivel + 1) for v in vars(obj).values())
+    return sys.getsizeof(obj)
+
+class CacheCompartilhado:
+    """LRU em memória compartilhado por todas as sessões do servidor, limitado por bytes.
+
+    A mesma chave pedida ao mesmo tempo por várias sessões é calculada uma única vez:
+    quem chega depois espera o cálculo em andamento. Os valores são compartilhados,
+    portanto devem ser tratados como somente leitura.
+    """
+
+    def __init__(self, orcamento_bytes):
+        self.orcamento = orcamento_bytes
+        self._itens = OrderedDict()  # chave -> (valor, bytes)
+        self._em_calculo = {}        # chave -> Event
+        self._trava = threading.Lock()
+        self.ocupado = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+
+    def obter(self, chave, padrao=None):
+        with self._trava:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return self._itens[chave][0]
+            self.falhas += 1
+            return padrao
+
+    def guardar(self, chave, valor):
+        tamanho = tamanho_objeto(valor)
+        with self._trava:
+            if chave in self._itens:
+                self.ocupado -= self._itens.pop(chave)[1]
+            if tamanho > self.orcamento:
+                return valor  # maior que o orçamento inteiro: não vale a pena guardar
+            self._itens[chave] = (valor, tamanho)
+            self.ocupado += tamanho
+            while self.ocupado > self.orcamento:
+                _, (_, liberado) = self._itens.popitem(last=False)
+                self.ocupado -= liberado
+                self.descartes += 1
+        return valor
+
+    def obter_ou_calcular(self, chave, calcular):
+        while True:
+            with self._trava:
+                if chave in self._itens:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return self._itens[chave][0]
+                evento = self._em_calculo.get(chave)
+                if evento is None:
+                    evento = self._em_calculo[chave] = threading.Event()
+                    self.falhas += 1
+                    break
+            # Outra sessão já está calculando: espera e tenta de novo (se ela falhar, calculamos nós)
+            evento.wait()
+
+        try:
+            return self.guardar(chave, calcular())
+        finally:
+            with self._trava:
+                del self._em_calculo[chave]
+            evento.set()
+
+    def descartar(self, filtro=None):
+        with self._trava:
+            for chave in [c for c in self._itens if filtro is None or filtro(c)]:
+                self.ocupado -= self._itens.pop(chave)[1]
+
+    def metricas(self):
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                'itens': len(self._itens),
+                'ocupado_mb': self.ocupado / 2**20,
+                'orcamento_mb': self.orcamento / 2**20,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'descartes': self.descartes,
+            }
+
+# Um cache por processo: sobrevive a reruns, troca de página e sessões
+CACHE = CacheCompartilhado(int(float(os.environ.get("PYGEOPLOT_CACHE_MB", 1024)) * 2**20))
+
+def compartilhado(operacao, persistir=False):
+    """Decorador no estilo de st.cache_data, mas sem cópia e compartilhado entre sessões.
+
+    A chave é o nome da operação mais os argumentos; parâmetros com prefixo `_` (como `_df`)
+    não entram na chave, então a função deve receber também uma chave que identifique os dados.
+    Com `persistir`, resultados em DataFrame também são gravados no cache em disco.
+    """
+    def decorador(funcao):
+        assinatura = inspect.signature(funcao)
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            chave = (operacao,) + tuple(v for nome, v in argumentos.arguments.items() if not nome.startswith('_'))
+            calcular = lambda: funcao(*args, **kwargs)
+            if persistir:
+                return CACHE.obter_ou_calcular(chave, lambda: cache_disco.obter_ou_calcular(chave, calcular))
+            return CACHE.obter_ou_calcular(chave, calcular)
+
+        envoltorio.limpar = lambda: CACHE.descartar(lambda c: c[0] == operacao)
+        return envoltorio
+    return decorador
+
+def exibir_metricas_cache():
+    import streamlit as st
+
+    m = CACHE.metricas()
+    with st.expander("🗄️ Cache do servidor", expanded=False):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Itens", m['itens'])
+        col2.metric("Memória", f"{m['ocupado_mb']:.0f} / {m['orcamento_mb']:.0f} MB")
+        col3.metric("Taxa de acerto", f"{m['taxa_acerto']:.0%}", help=f"{m['acertos']} acertos, {m['falhas']} falhas")
+        col4.metric("Descartes", m['descartes'])
+
+        d = cache_disco.metricas()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Arquivos em disco", d['arquivos'])
+        col2.metric("Disco", f"{d['ocupado_mb']:.0f} / {d['limite_mb']:.0f} MB")
+        col3.metric("Leituras do disco", d['acertos'])
+        col4.metric("Descartes do disco", d['descartes'])
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import threading
+import uuid
+import numpy as np
+import pandas as pd
+
+# Tabelas derivadas (petrofísica, fácies, estatísticas) persistidas em Parquet entre reinícios do servidor
+DIRETORIO = os.environ.get("PYGEOPLOT_CACHE_DIR",
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_resultados"))
+LIMITE_BYTES = int(float(os.environ.get("PYGEOPLOT_CACHE_DISCO_MB", 2048)) * 2**20)
+# Entra em todas as chaves: incrementar ao mudar o cálculo ou o formato de alguma tabela
+# invalida os arquivos gravados pela versão anterior
+VERSAO_CACHE = 1
+
+_TRAVA = threading.Lock()
+_TRAVA_ESTATISTICAS = threading.Lock()
+_estatisticas = {'acertos': 0, 'falhas': 0, 'gravacoes': 0, 'descartes': 0}
+
+def _contar(evento):
+    # Leituras e gravações chegam de várias threads (sessões e tarefas em segundo plano)
+    with _TRAVA_ESTATISTICAS:
+        _estatisticas[evento] += 1
+
+def _normalizar(valor):
+    # repr estável entre versões e reinícios: escalares numpy viram tipos Python
+    if isinstance(valor, (tuple, list)):
+        return tuple(_normalizar(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((str(k), _normalizar(v)) for k, v in valor.items()))
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return valor
+
+def caminho(chave):
+    nome = hashlib.blake2b(repr((VERSAO_CACHE, _normalizar(chave))).encode(), digest_size=20).hexdigest()
+    return os.path.join(DIRETORIO, nome + ".parquet")
+
+def ler(chave):
+    """DataFrame gravado para a chave, ou None; arquivos corrompidos são descartados"""
+    arquivo = caminho(chave)
+    try:
+        tabela = pd.read_parquet(arquivo)
+    except FileNotFoundError:
+        _contar('falhas')
+        return None
+    except Exception:
+        _remover(arquivo)
+        _contar('falhas')
+        return None
+    # A data de modificação marca o último uso, para o descarte por LRU
+    try:
+        os.utime(arquivo)
+    except OSError:
+        pass
+    _contar('acertos')
+    return tabela
+
+def gravar(chave, tabela):
+    if not isinstance(tabela, pd.DataFrame):
+        return tabela
+    os.makedirs(DIRETORIO, exist_ok=True)
+    destino = caminho(chave)
+    temporario = f"{destino}.{uuid.uuid4().hex}.tmp"
+    try:
+        # Escrita atômica: outra sessão nunca lê um arquivo pela metade
+        tabela.to_parquet(temporario, compression="zstd")
+        os.replace(temporario, destino)
+        _contar('gravacoes')
+    except Exception:
+        _remover(temporario)
+        return tabela
+    aplicar_limite()
+    return tabela
+
+def obter_ou_calcular(chave, calcular):
+    tabela = ler(chave)
+    if tabela is None:
+        tabela = gravar(chave, calcular())
+    return tabela
+
+def _remover(arquivo):
+    try:
+        os.remove(arquivo)
+    except OSError:
+        pass
+
+def _arquivos():
+    if not os.path.isdir(DIRETORIO):
+        return []
+    arquivos = []
+    for entrada in os.scandir(DIRETORIO):
+        if entrada.name.endswith(".parquet"):
+            info = entrada.stat()
+            arquivos.append((info.st_mtime, info.st_size, entrada.path))
+    return arquivos
+
+def aplicar_limite(limite=None):
+    """Remove os arquivos usados há mais tempo até o diretório caber em 90% do limite"""
+    limite = LIMITE_BYTES if limite is None else limite
+    with _TRAVA:
+        arquivos = sorted(_arquivos())
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        if total <= limite:
+            return
+        for _, tamanho, arquivo in arquivos:
+            if total <= 0.9 * limite:
+                break
+            _remover(arquivo)
+            total -= tamanho
+            _contar('descartes')
+
+def limpar():
+    for _, _, arquivo in _arquivos():
+        _remover(arquivo)
+
+def metricas():
+    arquivos = _arquivos()
+    with _TRAVA_ESTATISTICAS:
+        contagens = dict(_estatisticas)
+    return dict(contagens, arquivos=len(arquivos),
+                ocupado_mb=sum(tamanho for _, tamanho, _ in arquivos) / 2**20, limite_mb=LIMITE_BYTES / 2**20)
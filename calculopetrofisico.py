@@ -1,7 +1,17 @@
 import streamlit as st
 import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from preprocessamento import obter_hash_poco
+from acesso_dados import obter_poco
+from tarefas import submeter, acompanhar
+from escrita_las import escrever_las
+from cache_compartilhado import CACHE
+import cache_disco
+from instrumentacao import medir, medir_iteracoes
+from reamostragem import controle_reamostragem
+from ajuste_profundidade import controle_ajuste
 
 # Detecta curvas automaticamente
 def detectar_curvas_automaticamente(las):
@@ -24,6 +34,63 @@ def detectar_curvas_automaticamente(las):
                 resultados[nome_alvo] = mnem
     return resultados
 
+def calcular_petrofisica(tarefa, data, col_depth, curvas, zonas, rho_ma, rho_f, a, m, n, rw):
+    """Vcl, porosidades e saturações por zona; roda como tarefa em segundo plano.
+
+    As saídas são escritas em vetores pré-alocados, calculadas só nas linhas de cada zona;
+    o DataFrame de entrada não é copiado nem alterado.
+    """
+    def coluna(nome):
+        mnem = curvas.get(nome)
+        return data[mnem].to_numpy(dtype=float) if mnem and mnem in data.columns else None
+
+    prof = data[col_depth].to_numpy(dtype=float)
+    gr, rt = coluna("GR"), coluna("RT")
+    rhob, nphi, phi = coluna("RHOB"), coluna("NPHI"), coluna("PHI")
+
+    # Um único bloco 2D pré-alocado; cada saída é uma linha (visão) dele
+    nomes = ['Vcl', 'PHIT', 'PHIE', 'Sw', 'So', 'BVW']
+    bloco = np.full((len(nomes), len(data)), np.nan)
+    saidas = dict(zip(nomes, bloco))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i, (top, base, gr_min, gr_max) in medir_iteracoes(enumerate(zonas), "zona", "petrofisica"):
+            tarefa.atualizar(i / len(zonas), f"zona {i+1} de {len(zonas)}")
+            zona = np.flatnonzero((prof >= top) & (prof <= base))
+
+            # Vcl - Volume de argila
+            if gr is not None:
+                saidas['Vcl'][zona] = np.clip((gr[zona] - gr_min) / (gr_max - gr_min), 0, 1)
+            vcl = saidas['Vcl'][zona]
+
+            # Porosidade
+            if 'RHOB' in curvas and 'NPHI' in curvas:
+                if rhob is not None and nphi is not None:
+                    phid = np.clip((rho_ma - rhob[zona]) / (rho_ma - rho_f), 0, 1)
+                    phin = np.clip(nphi[zona], 0, 1)
+                    phit = np.clip((phid + phin) / 2, 0, 1) * 100
+                else:
+                    phit = np.nan
+            elif 'PHI' in curvas:
+                phit = np.clip(phi[zona], 0, 1) * 100 if phi is not None else np.nan
+            else:
+                phit = np.nan
+
+            phie = np.clip(phit / 100 * (1 - vcl), 0, 1) * 100
+            saidas['PHIT'][zona] = phit
+            saidas['PHIE'][zona] = phie
+
+            # Saturações (Equação de Archie)
+            if rt is not None:
+                sw = ((a * rw) / (rt[zona] * ((phie / 100) ** m))) ** (1 / n)
+                saidas['Sw'][zona] = np.clip(sw, 0, 1)
+                saidas['So'][zona] = np.clip(1 - sw, 0, 1)
+                saidas['BVW'][zona] = (phie / 100) * sw
+
+    # Copy-on-write: as curvas originais são compartilhadas, só o bloco de saídas ocupa memória nova
+    resultado = pd.DataFrame(bloco.T, columns=nomes, index=data.index, copy=False)
+    return pd.concat([data.drop(columns=nomes, errors='ignore'), resultado], axis=1)
+
 # Função principal
 def app():
     # Verificação inicial
@@ -31,7 +98,7 @@ def app():
         st.warning("⚠️ Carregue um arquivo LAS na aba de importação.")
         return
 
-    data = st.session_state['well_data'].copy()
+    data = obter_poco()
     las = st.session_state['las_object']
 
     curvas = detectar_curvas_automaticamente(las)
@@ -43,11 +110,17 @@ def app():
         st.write("Colunas disponíveis:", list(data.columns))
         return
 
+    chave_poco = obter_hash_poco(data)
+
     # Sidebar - Controles
     with st.sidebar:
         st.markdown("---")
         st.subheader("⚙️ Configuração de Cálculos")
 
+        # Grade de profundidade (opcional): zonas, cálculo e exportação sobre o poço reamostrado
+        data, chave_poco = controle_reamostragem(data, col_depth, chave_poco, "petrofisica")
+        data, chave_poco = controle_ajuste(data, col_depth, chave_poco, "petrofisica")
+
         # Parâmetros petrofísicos
         st.markdown("**Parâmetros Petrofísicos:**")
         rho_ma = st.number_input("ρ matriz (g/cm³)", value=2.65, step=0.01, format="%.2f")
@@ -131,198 +204,170 @@ def app():
 
             zonas.append((top, base, gr_min, gr_max))
 
-    # Botão de cálculo
+    # Botão de cálculo; o resultado fica disponível enquanto os parâmetros não mudarem
+    chave_calculo = ('petrofisica', chave_poco, tuple(zonas),
+                     rho_ma, rho_f, a, m, n, float(rw))
     if st.button("🚀 Calcular Parâmetros Petrofísicos", type="primary", use_container_width=True):
-        with st.spinner("Calculando..."):
-            col_gr = curvas.get("GR")
-            col_rt = curvas.get("RT")
-
-            # Inicializa colunas
-            data['Vcl'] = float('nan')
-            data['PHIT'] = float('nan')
-            data['PHIE'] = float('nan')
-            data['Sw'] = float('nan')
-            data['So'] = float('nan')
-            data['BVW'] = float('nan')
-
-            for top, base, gr_min, gr_max in zonas:
-                zona_mask = (data[col_depth] >= top) & (data[col_depth] <= base)
-
-                # Vcl - Volume de argila
-                if col_gr and col_gr in data.columns:
-                    vsh = (data[col_gr] - gr_min) / (gr_max - gr_min)
-                    data.loc[zona_mask, 'Vcl'] = vsh.clip(0, 1)
-
-                # Porosidade
-                if 'RHOB' in curvas and 'NPHI' in curvas:
-                    rhob = curvas['RHOB']
-                    nphi = curvas['NPHI']
-                    if rhob in data.columns and nphi in data.columns:
-                        phid = ((rho_ma - data[rhob]) / (rho_ma - rho_f)).clip(0, 1)
-                        phin = data[nphi].clip(0, 1)
-                        phit = ((phid + phin) / 2).clip(0, 1) * 100
-                    else:
-                        phit = np.nan
-                elif 'PHI' in curvas:
-                    col_por = curvas['PHI']
-                    phit = data[col_por].clip(0, 1) * 100 if col_por in data.columns else np.nan
-                else:
-                    phit = np.nan
-
-                phie = (phit / 100 * (1 - data['Vcl'])).clip(0, 1) * 100
-                data.loc[zona_mask, 'PHIT'] = phit
-                data.loc[zona_mask, 'PHIE'] = phie
-
-                # Saturações (Equação de Archie)
-                if col_rt and col_rt in data.columns:
-                    sw = ((a * rw) / (data[col_rt] * ((phie / 100) ** m))) ** (1 / n)
-                    data.loc[zona_mask, 'Sw'] = sw.clip(0, 1)
-                    data.loc[zona_mask, 'So'] = (1 - sw).clip(0, 1)
-                    data.loc[zona_mask, 'BVW'] = (phie / 100) * sw
-
-            st.session_state['petro_data'] = data
-
-        st.success("✅ Cálculo finalizado com sucesso!")
-
-        # Métricas
-        st.markdown("---")
-        st.subheader("📊 Resumo por Zona")
-
-        for i, (top, base, _, _) in enumerate(zonas):
-            zona_data = data[(data[col_depth] >= top) & (data[col_depth] <= base)]
-
-            with st.expander(f"📍 Zona {i+1}: {top:.1f} - {base:.1f} m", expanded=True):
-                col1, col2, col3, col4 = st.columns(4)
-
-                with col1:
-                    vcl_med = zona_data['Vcl'].mean() if 'Vcl' in zona_data else 0
-                    st.metric("Vcl médio", f"{vcl_med:.2%}")
-
-                with col2:
-                    phie_med = zona_data['PHIE'].mean() if 'PHIE' in zona_data else 0
-                    st.metric("PHIE médio", f"{phie_med:.1f}%")
-
-                with col3:
-                    sw_med = zona_data['Sw'].mean() if 'Sw' in zona_data else 0
-                    st.metric("Sw médio", f"{sw_med:.2%}")
-
-                with col4:
-                    so_med = zona_data['So'].mean() if 'So' in zona_data else 0
-                    st.metric("So médio", f"{so_med:.2%}")
-
-        # Tabela de resultados
-        st.markdown("---")
-        st.subheader("📋 Tabela de Resultados")
-
-        resultado_df = data[[col_depth, 'Vcl', 'PHIT', 'PHIE', 'Sw', 'So', 'BVW']].round(3)
-        st.dataframe(resultado_df, use_container_width=True, height=300)
-
-        # Download tabela
-        csv = resultado_df.to_csv(index=False).encode('utf-8')
-        st.download_button("📥 Download Resultados (CSV)", data=csv, file_name="parametros_petrofisicos.csv", mime='text/csv')
-
-        # Visualização Interativa com Plotly
-        st.markdown("---")
-        st.subheader("📈 Visualização Interativa")
-
-        fig = make_subplots(
-            rows=1, cols=6,
-            shared_yaxes=True,
-            subplot_titles=['Vcl', 'PHIT (%)', 'PHIE (%)', 'Sw', 'So', 'BVW'],
-            horizontal_spacing=0.03
-        )
-
-        tracks_config = [
-            ('Vcl', '#2ecc71', (0, 1)),
-            ('PHIT', '#3498db', (0, 40)),
-            ('PHIE', '#9b59b6', (0, 40)),
-            ('Sw', '#e74c3c', (0, 1)),
-            ('So', '#f39c12', (0, 1)),
-            ('BVW', '#95a5a6', (0, 0.4))
-        ]
-
-        for i, (col, color, xlim) in enumerate(tracks_config, 1):
-            if col in data.columns:
-                fig.add_trace(
-                    go.Scatter(
-                        x=data[col],
-                        y=data[col_depth],
-                        mode='lines',
-                        name=col,
-                        line=dict(color=color, width=1.5),
-                        hovertemplate=f'<b>{col}</b><br>%{{x:.3f}}<br>Depth: %{{y:.2f}}<extra></extra>'
-                    ),
-                    row=1, col=i
-                )
-                fig.update_xaxes(range=xlim, row=1, col=i)
-
-        fig.update_yaxes(title_text="Profundidade (m)", autorange="reversed", row=1, col=1)
-        fig.update_layout(
-            height=700,
-            showlegend=False,
-            plot_bgcolor='white',
-            hovermode='y unified'
-        )
+        st.session_state['calculo_petro'] = chave_calculo
+    if st.session_state.get('calculo_petro') != chave_calculo:
+        return
 
-        config = {
-            'displayModeBar': True,
-            'displaylogo': False,
-            'scrollZoom': True,
-            'toImageButtonOptions': {
-                'format': 'png',
-                'filename': 'petrofisico',
-                'height': 1200,
-                'width': 1800,
-                'scale': 2
-            }
+    # Resultado no cache do servidor e em disco: o mesmo poço com os mesmos parâmetros não é recalculado
+    tarefa = submeter(chave_calculo, lambda t: CACHE.obter_ou_calcular(chave_calculo, lambda: cache_disco.obter_ou_calcular(
+        chave_calculo, lambda: calcular_petrofisica(t, data, col_depth, curvas, zonas, rho_ma, rho_f, a, m, n, rw))),
+        rotulo="Cálculo petrofísico")
+    data = acompanhar(tarefa)
+    if data is None:
+        return
+    st.session_state['petro_data'] = data
+    col_gr = curvas.get("GR")
+    col_rt = curvas.get("RT")
+
+    st.success("✅ Cálculo finalizado com sucesso!")
+
+    # Métricas
+    st.markdown("---")
+    st.subheader("📊 Resumo por Zona")
+
+    for i, (top, base, _, _) in enumerate(zonas):
+        zona_data = data[(data[col_depth] >= top) & (data[col_depth] <= base)]
+
+        with st.expander(f"📍 Zona {i+1}: {top:.1f} - {base:.1f} m", expanded=True):
+            col1, col2, col3, col4 = st.columns(4)
+
+            with col1:
+                vcl_med = zona_data['Vcl'].mean() if 'Vcl' in zona_data else 0
+                st.metric("Vcl médio", f"{vcl_med:.2%}")
+
+            with col2:
+                phie_med = zona_data['PHIE'].mean() if 'PHIE' in zona_data else 0
+                st.metric("PHIE médio", f"{phie_med:.1f}%")
+
+            with col3:
+                sw_med = zona_data['Sw'].mean() if 'Sw' in zona_data else 0
+                st.metric("Sw médio", f"{sw_med:.2%}")
+
+            with col4:
+                so_med = zona_data['So'].mean() if 'So' in zona_data else 0
+                st.metric("So médio", f"{so_med:.2%}")
+
+    # Tabela de resultados
+    st.markdown("---")
+    st.subheader("📋 Tabela de Resultados")
+
+    resultado_df = data[[col_depth, 'Vcl', 'PHIT', 'PHIE', 'Sw', 'So', 'BVW']].round(3)
+    st.dataframe(resultado_df, use_container_width=True, height=300)
+
+    # Download tabela
+    st.download_button("📥 Download Resultados (CSV)", data=lambda: resultado_df.to_csv(index=False).encode('utf-8'), file_name="parametros_petrofisicos.csv", mime='text/csv')
+    # Poço completo (curvas originais + calculadas) em LAS 2.0, com o cabeçalho do arquivo importado
+    st.download_button("📥 Download Poço Interpretado (LAS)",
+                       data=lambda: escrever_las(data, cabecalho=las, depth_col=col_depth),
+                       file_name="poco_interpretado.las", mime='application/octet-stream')
+
+    # Visualização Interativa com Plotly
+    st.markdown("---")
+    st.subheader("📈 Visualização Interativa")
+
+    fig = make_subplots(
+        rows=1, cols=6,
+        shared_yaxes=True,
+        subplot_titles=['Vcl', 'PHIT (%)', 'PHIE (%)', 'Sw', 'So', 'BVW'],
+        horizontal_spacing=0.03
+    )
+
+    tracks_config = [
+        ('Vcl', '#2ecc71', (0, 1)),
+        ('PHIT', '#3498db', (0, 40)),
+        ('PHIE', '#9b59b6', (0, 40)),
+        ('Sw', '#e74c3c', (0, 1)),
+        ('So', '#f39c12', (0, 1)),
+        ('BVW', '#95a5a6', (0, 0.4))
+    ]
+
+    for i, (col, color, xlim) in enumerate(tracks_config, 1):
+        if col in data.columns:
+            fig.add_trace(
+                go.Scatter(
+                    x=data[col],
+                    y=data[col_depth],
+                    mode='lines',
+                    name=col,
+                    line=dict(color=color, width=1.5),
+                    hovertemplate=f'<b>{col}</b><br>%{{x:.3f}}<br>Depth: %{{y:.2f}}<extra></extra>'
+                ),
+                row=1, col=i
+            )
+            fig.update_xaxes(range=xlim, row=1, col=i)
+
+    fig.update_yaxes(title_text="Profundidade (m)", autorange="reversed", row=1, col=1)
+    fig.update_layout(
+        height=700,
+        showlegend=False,
+        plot_bgcolor='white',
+        hovermode='y unified'
+    )
+
+    config = {
+        'displayModeBar': True,
+        'displaylogo': False,
+        'scrollZoom': True,
+        'toImageButtonOptions': {
+            'format': 'png',
+            'filename': 'petrofisico',
+            'height': 1200,
+            'width': 1800,
+            'scale': 2
         }
+    }
 
+    with medir("serializacao.plotly", "figura"):
         st.plotly_chart(fig, use_container_width=True, config=config)
 
-        # Pickett Plot Interativo
-        if col_rt and col_rt in data.columns and 'PHIE' in data.columns:
-            st.markdown("---")
-            st.subheader("📊 Pickett Plot Interativo")
-
-            vcl_limit = st.slider("Limite de Vcl para Pickett", 0.0, 0.5, 0.1, 0.05)
-            filt = (data['Vcl'] < vcl_limit) & data[col_rt].notna() & data['PHIE'].notna()
-
-            fig_pickett = go.Figure()
-
-            # Dados
+    # Pickett Plot Interativo
+    if col_rt and col_rt in data.columns and 'PHIE' in data.columns:
+        st.markdown("---")
+        st.subheader("📊 Pickett Plot Interativo")
+
+        vcl_limit = st.slider("Limite de Vcl para Pickett", 0.0, 0.5, 0.1, 0.05)
+        filt = (data['Vcl'] < vcl_limit) & data[col_rt].notna() & data['PHIE'].notna()
+
+        fig_pickett = go.Figure()
+
+        # Dados
+        fig_pickett.add_trace(go.Scatter(
+            x=data.loc[filt, col_rt],
+            y=data.loc[filt, 'PHIE'] / 100,
+            mode='markers',
+            name='Dados',
+            marker=dict(color='red', size=5),
+            hovertemplate='<b>Dados</b><br>RT: %{x:.2f}<br>PHIE: %{y:.3f}<extra></extra>'
+        ))
+
+        # Linhas de Sw
+        sw_lines = [1.0, 0.8, 0.6, 0.4, 0.2]
+        phie_range = np.logspace(-2, 0, 100)
+        colors_sw = ['blue', 'green', 'orange', 'purple', 'brown']
+
+        for sw, color in zip(sw_lines, colors_sw):
+            rt_line = (a * rw) / (sw ** n) / (phie_range ** m)
             fig_pickett.add_trace(go.Scatter(
-                x=data.loc[filt, col_rt],
-                y=data.loc[filt, 'PHIE'] / 100,
-                mode='markers',
-                name='Dados',
-                marker=dict(color='red', size=5),
-                hovertemplate='<b>Dados</b><br>RT: %{x:.2f}<br>PHIE: %{y:.3f}<extra></extra>'
+                x=rt_line,
+                y=phie_range,
+                mode='lines',
+                name=f'Sw={int(sw*100)}%',
+                line=dict(color=color, width=2)
             ))
 
-            # Linhas de Sw
-            sw_lines = [1.0, 0.8, 0.6, 0.4, 0.2]
-            phie_range = np.logspace(-2, 0, 100)
-            colors_sw = ['blue', 'green', 'orange', 'purple', 'brown']
+        fig_pickett.update_xaxes(type="log", range=[-1, 3], title="Resistividade (Ω.m)")
+        fig_pickett.update_yaxes(type="log", range=[-2, 0], title="PHIE (v/v)")
 
-            for sw, color in zip(sw_lines, colors_sw):
-                rt_line = (a * rw) / (sw ** n) / (phie_range ** m)
-                fig_pickett.add_trace(go.Scatter(
-                    x=rt_line,
-                    y=phie_range,
-                    mode='lines',
-                    name=f'Sw={int(sw*100)}%',
-                    line=dict(color=color, width=2)
-                ))
-
-            fig_pickett.update_xaxes(type="log", range=[-1, 3], title="Resistividade (Ω.m)")
-            fig_pickett.update_yaxes(type="log", range=[-2, 0], title="PHIE (v/v)")
-
-            fig_pickett.update_layout(
-                title=f'Pickett Plot (Vcl < {vcl_limit:.0%})',
-                height=600,
-                plot_bgcolor='white',
-                hovermode='closest',
-                showlegend=True
-            )
+        fig_pickett.update_layout(
+            title=f'Pickett Plot (Vcl < {vcl_limit:.0%})',
+            height=600,
+            plot_bgcolor='white',
+            hovermode='closest',
+            showlegend=True
+        )
 
-            st.plotly_chart(fig_pickett, use_container_width=True)
+        st.plotly_chart(fig_pickett, use_container_width=True)
@@ -1,28 +1,63 @@
 import streamlit as st
-import pandas as pd
-import lasio
+from acesso_dados import obter_poco
+from exportacao import FORMATOS, exportar, selecionar
+
+def get_depth_column(df):
+    for col in ['DEPTH', 'DEPT', 'MD']:
+        if col in df.columns:
+            return col
+    return None
 
 def app():
     # Verifica se os dados de poço (LAS) estão carregados na sessão
-    if 'well_data' in st.session_state:
-        st.title('Conversão de Dados: LAS para CSV')
+    if obter_poco() is None:
+        st.error("Nenhum dado LAS carregado. Por favor, vá para a página de importação para carregar os dados.")
+        return
 
-        # Carregar dados LAS da sessão
-        las_data = st.session_state['well_data']
-        st.write("Prévia dos Dados LAS:")
-        st.write(las_data.head())  # Exibir uma prévia dos dados
+    st.title('Conversão de Dados: Exportação')
 
-        # Input para o nome do arquivo CSV a ser salvo
-        csv_filename = st.text_input("Nome do arquivo CSV para salvar", "output.csv")
+    # Fonte: dados do poço ou resultados do cálculo petrofísico
+    fontes = {"Dados do poço": obter_poco()}
+    if st.session_state.get('petro_data') is not None:
+        fontes["Resultados petrofísicos"] = st.session_state['petro_data']
+    fonte = st.radio("Dados", list(fontes), horizontal=True)
+    dados = fontes[fonte]
+    depth_col = get_depth_column(dados)
 
-        if st.button("Converter para CSV"):
-            # Salvar os dados como CSV
-            las_data.to_csv(csv_filename, index=False)
-            st.success(f"Arquivo CSV salvo como {csv_filename}")
+    st.write("Prévia dos Dados:")
+    st.write(dados.head())  # Exibir uma prévia dos dados
 
-            # Oferecer o download do arquivo CSV
-            with open(csv_filename, "rb") as file:
-                st.download_button(label="Baixar arquivo CSV", data=file, file_name=csv_filename)
+    col1, col2 = st.columns(2)
+    with col1:
+        curvas_disponiveis = [c for c in dados.columns if c != depth_col]
+        curvas = st.multiselect("Curvas", curvas_disponiveis, default=curvas_disponiveis)
+    with col2:
+        faixa = None
+        if depth_col:
+            min_depth, max_depth = float(dados[depth_col].min()), float(dados[depth_col].max())
+            faixa = st.slider("Intervalo de profundidade (m)", min_depth, max_depth, (min_depth, max_depth))
 
-    else:
-        st.error("Nenhum dado LAS carregado. Por favor, vá para a página de importação para carregar os dados.")
+    col3, col4, col5 = st.columns(3)
+    with col3:
+        formato = st.selectbox("Formato", list(FORMATOS))
+    with col4:
+        if formato.startswith("CSV"):
+            casas = st.number_input("Casas decimais", min_value=0, max_value=10, value=4)
+            float32 = False
+        else:
+            casas = None
+            float32 = st.checkbox("Gravar curvas em float32", value=False)
+    with col5:
+        nome = st.text_input("Nome do arquivo", "output")
+
+    selecao = selecionar(dados, depth_col, faixa, curvas)
+    st.caption(f"{len(selecao):,} linhas × {selecao.shape[1]} colunas")
+
+    extensao, mime = FORMATOS[formato]
+    # O arquivo é gerado só no clique, em memória e fora da thread do script; nada é gravado no servidor
+    st.download_button(
+        label=f"📥 Baixar {formato}",
+        data=lambda: exportar(selecao, formato, casas_decimais=casas, float32=float32, depth_col=depth_col),
+        file_name=f"{nome}.{extensao}",
+        mime=mime,
+    )
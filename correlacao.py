@@ -0,0 +1,179 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from cache_compartilhado import compartilhado
+
+METODOS = ["Pearson", "Spearman", "Kendall", "Informação Mútua"]
+MAX_AMOSTRAS_KENDALL = 20_000
+
+def calcular_postos(coluna):
+    """Postos médios (para Spearman) e postos densos inteiros (para Kendall e bins) de uma coluna"""
+    x = np.asarray(coluna, dtype=float)
+    n = len(x)
+    ordem = np.argsort(x)
+    ordenado = x[ordem]
+
+    # Início de cada grupo de valores empatados
+    novo_grupo = np.empty(n, dtype=bool)
+    if n:
+        novo_grupo[0] = True
+        novo_grupo[1:] = ordenado[1:] != ordenado[:-1]
+    densos_ordenados = np.cumsum(novo_grupo) - 1
+
+    inicios = np.flatnonzero(novo_grupo)
+    fins = np.append(inicios[1:], n)
+    medios_grupo = (inicios + fins + 1) / 2.0
+
+    densos = np.empty(n, dtype=np.int64)
+    densos[ordem] = densos_ordenados
+    medios = medios_grupo[densos].astype(np.float32)
+    return medios, densos
+
+def _correlacao_matricial(valores, bloco=200_000):
+    # Pearson de todas as colunas de uma vez: Z.T @ Z acumulado em blocos de linhas
+    n, p = valores.shape
+    media = valores.mean(axis=0, dtype=np.float64)
+    desvio = valores.std(axis=0, dtype=np.float64)
+    desvio[desvio == 0] = np.nan
+    acumulado = np.zeros((p, p))
+    for i in range(0, n, bloco):
+        z = (valores[i:i + bloco].astype(np.float64) - media) / desvio
+        acumulado += z.T @ z
+    return acumulado / n
+
+def _contar_inversoes(a):
+    """Conta pares i < j com a[i] > a[j] por merge sort de baixo para cima, vetorizado por nível.
+
+    Em cada nível os blocos de largura w já estão ordenados; a intercalação dos pares de
+    blocos é feita por uma ordenação estável, e a posição final de cada elemento da metade
+    direita diz quantos elementos da esquerda o superam. Como cada nível custa uma ordenação,
+    o total é O(n log² n); daí a subamostragem do Kendall em intervalos longos.
+    """
+    a = np.asarray(a, dtype=np.int64)
+    n = len(a)
+    if n < 2:
+        return 0
+    m = int(a.max()) + 1
+    indices = np.arange(n)
+    inversoes = 0
+    w = 1
+    while w < n:
+        bloco = indices // (2 * w)
+        chaves = bloco * m + a
+        ordem = np.argsort(chaves, kind="stable")
+
+        posicao = np.empty(n, dtype=np.int64)
+        posicao[ordem] = indices
+        inicio_bloco = bloco * 2 * w
+        direita = (indices - inicio_bloco) >= w
+        tamanho_esq = np.minimum(w, n - inicio_bloco)
+
+        # Elemento j da direita na posição p: (p - j) elementos da esquerda ficaram antes (≤ ele)
+        j = indices - inicio_bloco - w
+        p = posicao - inicio_bloco
+        inversoes += int((tamanho_esq - (p - j))[direita].sum())
+
+        a = a[ordem]
+        w *= 2
+    return inversoes
+
+def _pares_empatados(densos):
+    contagem = np.bincount(densos)
+    return int((contagem * (contagem - 1) // 2).sum())
+
+def tau_kendall(densos_x, densos_y):
+    """Tau-b de Kendall a partir dos postos densos (algoritmo de Knight)"""
+    n = len(densos_x)
+    if n < 2:
+        return np.nan
+    m = int(densos_y.max()) + 1
+    chaves = np.sort(densos_x.astype(np.int64) * m + densos_y)
+    y_ordenado = chaves % m
+
+    total = n * (n - 1) // 2
+    empates_x = _pares_empatados(densos_x)
+    empates_y = _pares_empatados(densos_y)
+    _, contagem_xy = np.unique(chaves, return_counts=True)
+    empates_xy = int((contagem_xy * (contagem_xy - 1) // 2).sum())
+
+    discordantes = _contar_inversoes(y_ordenado)
+    concordantes_menos_discordantes = total - empates_x - empates_y + empates_xy - 2 * discordantes
+    denominador = np.sqrt(float(total - empates_x) * float(total - empates_y))
+    if denominador == 0:
+        return np.nan
+    return concordantes_menos_discordantes / denominador
+
+def informacao_mutua(bins_x, bins_y, n_bins):
+    """Informação mútua (nats) estimada pelo histograma conjunto de bins de igual frequência"""
+    n = len(bins_x)
+    if n == 0:
+        return np.nan
+    conjunta = np.bincount(bins_x.astype(np.uint16) * n_bins + bins_y, minlength=n_bins * n_bins).reshape(n_bins, n_bins) / n
+    px = conjunta.sum(axis=1, keepdims=True)
+    py = conjunta.sum(axis=0, keepdims=True)
+    nz = conjunta > 0
+    return float((conjunta[nz] * np.log(conjunta[nz] / (px @ py)[nz])).sum())
+
+def _em_paralelo(funcao, itens):
+    # numpy libera o GIL nas ordenações e contagens, então threads bastam
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+        return list(executor.map(funcao, itens))
+
+def _por_pares(funcao, p, diagonal=None):
+    # Preenche a matriz simétrica avaliando cada par uma única vez
+    matriz = np.eye(p) if diagonal is None else np.diag(diagonal)
+    pares = [(i, j) for i in range(p) for j in range(i + 1, p)]
+    for (i, j), valor in zip(pares, _em_paralelo(lambda par: funcao(*par), pares)):
+        matriz[i, j] = matriz[j, i] = valor
+    return matriz
+
+def passo_kendall(n, max_amostras_kendall=MAX_AMOSTRAS_KENDALL):
+    """Passo da subamostragem sistemática do Kendall para `n` linhas completas (1 = todas)"""
+    return max(1, int(np.ceil(n / max_amostras_kendall)))
+
+def matriz_correlacao(df, curvas, metodo="Pearson", n_bins=16, max_amostras_kendall=MAX_AMOSTRAS_KENDALL):
+    """Matriz de correlação entre curvas; os postos de cada coluna são calculados uma única vez.
+
+    Pearson mantém o comportamento do pandas (pares completos); os métodos baseados
+    em postos usam apenas as linhas completas em todas as curvas selecionadas. Kendall
+    usa uma linha a cada passo_kendall(n) acima de `max_amostras_kendall` linhas.
+    """
+    curvas = list(curvas)
+    if metodo == "Pearson":
+        return df[curvas].corr()
+
+    valores = df[curvas].dropna().to_numpy(dtype=float)
+    n, p = valores.shape
+
+    if metodo == "Spearman":
+        # Spearman = Pearson dos postos médios, todos os pares num único produto matricial
+        medios = np.empty((n, p), dtype=np.float32)
+        for j, (pm, _) in enumerate(_em_paralelo(calcular_postos, valores.T)):
+            medios[:, j] = pm
+        matriz = _correlacao_matricial(medios)
+        np.fill_diagonal(matriz, 1.0)
+
+    elif metodo == "Kendall":
+        # Subamostragem sistemática ao longo da profundidade para intervalos muito longos
+        passo = passo_kendall(n, max_amostras_kendall)
+        densos = [pd_ for _, pd_ in _em_paralelo(calcular_postos, valores[::passo].T)]
+        matriz = _por_pares(lambda i, j: tau_kendall(densos[i], densos[j]), p)
+
+    elif metodo == "Informação Mútua":
+        # Bins de igual frequência derivados diretamente dos postos médios
+        tipo = np.uint8 if n_bins <= 16 else np.uint16
+        bins = [np.minimum((pm - 1) * n_bins / max(n, 1), n_bins - 1).astype(tipo)
+                for pm, _ in _em_paralelo(calcular_postos, valores.T)]
+        diagonal = [informacao_mutua(b, b, n_bins) for b in bins]
+        matriz = _por_pares(lambda i, j: informacao_mutua(bins[i], bins[j], n_bins), p, diagonal)
+
+    else:
+        raise ValueError(f"Método de correlação desconhecido: {metodo}")
+
+    return pd.DataFrame(matriz, index=curvas, columns=curvas)
+
+@compartilhado("matriz_correlacao", persistir=True)
+def matriz_correlacao_cache(_df, chave, curvas, metodo, n_bins=16, max_amostras_kendall=MAX_AMOSTRAS_KENDALL):
+    # `chave` identifica poço, intervalo de profundidade e tratamento de nulos
+    return matriz_correlacao(_df, curvas, metodo, n_bins, max_amostras_kendall)
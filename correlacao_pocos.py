@@ -0,0 +1,226 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from reamostragem import passo_amostragem, grade_profundidade, reamostrar_matriz
+
+# Correlação poço a poço por DTW (dynamic time warping) com banda de Sakoe-Chiba: as curvas são
+# decimadas, alinhadas dentro da banda e o caminho obtido é refinado na resolução original numa
+# faixa estreita em torno dele. Os pares de uma cadeia de poços rodam em processos separados.
+MAX_AMOSTRAS_GROSSO = 1500
+PENALIDADE = 0.1
+
+def preparar_curva(df, depth_col, curva, categorica=False):
+    """Profundidade regular e valores sem nulos (interpolados; fácies pelo mais próximo).
+
+    Curvas contínuas são padronizadas (média 0, desvio 1) para que poços com calibrações
+    diferentes fiquem comparáveis.
+    """
+    prof = df[depth_col].to_numpy(dtype=float)
+    valores = df[curva].to_numpy(dtype=float, na_value=np.nan)
+    validos = np.isfinite(prof) & ~np.isnan(valores)
+    if validos.sum() < 2:
+        raise ValueError(f"Curva {curva} sem amostras suficientes")
+    prof, valores = prof[validos], valores[validos]
+    passo = passo_amostragem(prof)
+    grade = grade_profundidade(prof.min(), prof.max(), passo)
+    # Sem nulos na entrada, a reamostragem só preenche as lacunas entre amostras válidas
+    valores = reamostrar_matriz(prof, valores, grade, "proximo" if categorica else "linear", peso_minimo=0.0)
+    valores = pd.Series(valores).ffill().bfill().to_numpy()
+    if not categorica:
+        desvio = valores.std()
+        valores = (valores - valores.mean()) / (desvio if desvio > 0 else 1.0)
+    return grade, valores
+
+def _custos(xi, y, categorica):
+    return (y != xi).astype(float) if categorica else (y - xi) ** 2
+
+def dtw_janela(x, y, inicio, fim, categorica=False, penalidade=PENALIDADE):
+    """DTW restrito: na linha i só as colunas inicio[i]..fim[i] (inclusive) são avaliadas.
+
+    Passos horizontais e verticais pagam `penalidade` a mais que o diagonal, o que evita que o
+    caminho se acumule em camadas homogêneas. Cada linha é resolvida de forma vetorizada: com
+    A[j] = c[j] + min(D[i-1, j-1], D[i-1, j] + p), a recorrência D[i, j] = min(A[j], c[j] + p + D[i, j-1])
+    equivale a C[j] + min_{k≤j}(A[k] - C[k]), com C a soma acumulada de c + p na linha.
+    Só a linha anterior de custos fica em memória; o caminho sai de um byte de direção por célula.
+    Retorna (caminho n x 2, custo médio por passo).
+    """
+    n, m = len(x), len(y)
+    if not (inicio[-1] <= m - 1 <= fim[-1]) or inicio[0] != 0:
+        raise ValueError("Janela do DTW não conecta o início ao fim das curvas")
+    larguras = fim - inicio + 1
+    deslocamentos = np.concatenate([[0], np.cumsum(larguras)])
+    # Direção de chegada em cada célula da janela: 0 diagonal, 1 de cima (i-1, j), 2 da esquerda (i, j-1)
+    direcoes = np.empty(deslocamentos[-1], dtype=np.uint8)
+    # Linha anterior em coordenadas absolutas (deslocada de 1): anterior[j + 1] = D[i-1, j], inf fora da janela
+    anterior = np.full(m + 1, np.inf)
+    with np.errstate(invalid="ignore"):
+        for i in range(n):
+            a, b = inicio[i], fim[i] + 1
+            c = _custos(x[i], y[a:b], categorica)
+            if i == 0:
+                A = np.full(b - a, np.inf)
+                A[0] = c[0]
+                de_cima = np.zeros(b - a, dtype=bool)
+            else:
+                cima = anterior[a + 1:b + 1] + penalidade
+                diagonal = anterior[a:b]
+                de_cima = cima < diagonal
+                A = c + np.where(de_cima, cima, diagonal)
+                anterior[inicio[i - 1] + 1:fim[i - 1] + 2] = np.inf
+            C = np.cumsum(c + penalidade)
+            relativo = A - C
+            minimo = np.minimum.accumulate(relativo)
+            trecho = direcoes[deslocamentos[i]:deslocamentos[i + 1]]
+            trecho[:] = de_cima
+            # Comparação no mesmo espaço do acumulado, sem erro de arredondamento
+            trecho[minimo < relativo] = 2
+            anterior[a + 1:b + 1] = C + minimo
+
+    custo = anterior[m]
+    if not np.isfinite(custo):
+        raise ValueError("Janela do DTW não conecta o início ao fim das curvas")
+
+    passos = ((-1, -1), (-1, 0), (0, -1))
+    caminho = [(n - 1, m - 1)]
+    i, j = n - 1, m - 1
+    while i > 0 or j > 0:
+        di, dj = passos[direcoes[deslocamentos[i] + j - inicio[i]]]
+        i, j = i + di, j + dj
+        caminho.append((i, j))
+    caminho = np.array(caminho[::-1])
+    return caminho, float(custo / len(caminho))
+
+def janela_sakoe_chiba(n, m, raio=0.1):
+    """Banda em torno da diagonal normalizada: |j/m - i/n| ≤ `raio` (fração do comprimento)"""
+    centro = np.arange(n) * (m - 1) / max(n - 1, 1)
+    meia = max(raio * m, (m - 1) / max(n - 1, 1) + 1)
+    inicio = np.clip(np.ceil(centro - meia), 0, m - 1).astype(np.int64)
+    fim = np.clip(np.floor(centro + meia), 0, m - 1).astype(np.int64)
+    inicio[0], fim[-1] = 0, m - 1
+    return inicio, fim
+
+def janela_refinamento(caminho, fator_x, fator_y, n, m, raio):
+    """Faixa na resolução original: as células cobertas pelo caminho grosso, alargadas por `raio` amostras"""
+    linhas_grossas = caminho[:, 0]
+    j_min = np.full(linhas_grossas.max() + 1, np.iinfo(np.int64).max)
+    j_max = np.full(linhas_grossas.max() + 1, -1)
+    np.minimum.at(j_min, linhas_grossas, caminho[:, 1])
+    np.maximum.at(j_max, linhas_grossas, caminho[:, 1])
+    bloco = np.minimum(np.arange(n) // fator_x, len(j_min) - 1)
+    inicio = np.clip(j_min[bloco] * fator_y - raio, 0, m - 1)
+    fim = np.clip((j_max[bloco] + 1) * fator_y - 1 + raio, 0, m - 1)
+    inicio = np.maximum.accumulate(inicio)
+    fim = np.maximum.accumulate(fim)
+    # Linhas consecutivas precisam se tocar para o caminho existir
+    inicio = np.minimum(inicio, np.concatenate([[0], fim[:-1] + 1]))
+    inicio[0], fim[-1] = 0, m - 1
+    return inicio, fim
+
+def _decimar(valores, fator, categorica):
+    # Médias de blocos de `fator` amostras; nas fácies, a amostra central do bloco (média de rótulos não faz sentido)
+    if fator <= 1:
+        return valores
+    n = int(np.ceil(len(valores) / fator))
+    preenchido = np.full(n * fator, np.nan)
+    preenchido[:len(valores)] = valores
+    blocos = preenchido.reshape(n, fator)
+    if categorica:
+        centro = blocos[:, fator // 2]
+        return np.where(np.isnan(centro), blocos[:, 0], centro)
+    return np.nanmean(blocos, axis=1)
+
+def correlacionar_curvas(prof_a, x, prof_b, y, categorica=False, raio=0.1, max_amostras=MAX_AMOSTRAS_GROSSO,
+                         raio_refino=None, penalidade=PENALIDADE):
+    """Alinha duas curvas já preparadas; retorna o mapeamento de profundidade A -> B e o custo.
+
+    Etapa grossa: curvas decimadas para até `max_amostras` amostras e DTW na banda de Sakoe-Chiba
+    (`raio` = fração do comprimento). Etapa fina: DTW na resolução original restrito às células do
+    caminho grosso, alargadas por `raio_refino` amostras (padrão: um bloco decimado).
+    """
+    fator_x = max(1, int(np.ceil(len(x) / max_amostras)))
+    fator_y = max(1, int(np.ceil(len(y) / max_amostras)))
+    xg, yg = _decimar(x, fator_x, categorica), _decimar(y, fator_y, categorica)
+    caminho_grosso, custo_grosso = dtw_janela(xg, yg, *janela_sakoe_chiba(len(xg), len(yg), raio), categorica,
+                                              penalidade)
+
+    if fator_x == 1 and fator_y == 1:
+        caminho, custo = caminho_grosso, custo_grosso
+    else:
+        janela = janela_refinamento(caminho_grosso, fator_x, fator_y, len(x), len(y), raio_refino or max(fator_x, fator_y))
+        caminho, custo = dtw_janela(x, y, *janela, categorica, penalidade)
+
+    # Profundidade em B para cada amostra de A: média das colunas casadas com a linha
+    soma = np.bincount(caminho[:, 0], weights=prof_b[caminho[:, 1]], minlength=len(x))
+    contagem = np.bincount(caminho[:, 0], minlength=len(x))
+    return {
+        'prof_a': prof_a,
+        'prof_b': soma / np.maximum(contagem, 1),
+        'custo': custo,
+        'custo_grosso': custo_grosso,
+        'caminho_grosso': caminho_grosso,
+        'fatores': (fator_x, fator_y),
+    }
+
+def _correlacionar_par(argumentos):
+    indice, prof_a, x, prof_b, y, opcoes = argumentos
+    return indice, correlacionar_curvas(prof_a, x, prof_b, y, **opcoes)
+
+def correlacionar_cadeia(pocos, curva, pares=None, categorica=False, raio=0.1, max_amostras=MAX_AMOSTRAS_GROSSO,
+                         raio_refino=None, penalidade=PENALIDADE, max_workers=None, progresso=None):
+    """Correlaciona pares de poços, em paralelo (um processo por par).
+
+    `pocos` é um dict ordenado nome -> (DataFrame, coluna de profundidade); sem `pares`, correlaciona
+    cada poço com o seguinte (cadeia). Retorna um dict (nome_a, nome_b) -> resultado de correlacionar_curvas.
+    """
+    nomes = list(pocos)
+    pares = pares or list(zip(nomes[:-1], nomes[1:]))
+    curvas = {nome: preparar_curva(df, depth_col, curva, categorica)
+              for nome, (df, depth_col) in pocos.items() if any(nome in par for par in pares)}
+    opcoes = dict(categorica=categorica, raio=raio, max_amostras=max_amostras, raio_refino=raio_refino,
+                  penalidade=penalidade)
+    argumentos = [(k, *curvas[a], *curvas[b], opcoes) for k, (a, b) in enumerate(pares)]
+
+    resultados = {}
+    workers = min(len(argumentos), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        for feitos, args in enumerate(argumentos, 1):
+            k, resultado = _correlacionar_par(args)
+            resultados[pares[k]] = resultado
+            if progresso is not None:
+                progresso(feitos / len(argumentos), f"{feitos}/{len(argumentos)} pares")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = [executor.submit(_correlacionar_par, args) for args in argumentos]
+            try:
+                for feitos, futuro in enumerate(as_completed(futuros), 1):
+                    k, resultado = futuro.result()
+                    resultados[pares[k]] = resultado
+                    if progresso is not None:
+                        progresso(feitos / len(argumentos), f"{feitos}/{len(argumentos)} pares")
+            except BaseException:
+                for futuro in futuros:
+                    futuro.cancel()
+                raise
+    return {par: resultados[par] for par in pares}
+
+def mapear_profundidade(resultado, profundidades):
+    """Profundidades de A levadas a B pelo mapeamento do DTW; fora do intervalo correlacionado, NaN"""
+    profundidades = np.asarray(profundidades, dtype=float)
+    prof_a, prof_b = resultado['prof_a'], resultado['prof_b']
+    mapeadas = np.interp(profundidades, prof_a, prof_b)
+    return np.where((profundidades >= prof_a[0]) & (profundidades <= prof_a[-1]), mapeadas, np.nan)
+
+def projetar_topos(topos, cadeia, ordem):
+    """Topos marcados no primeiro poço de `ordem`, projetados poço a poço ao longo da cadeia.
+
+    `topos` é um dict nome do topo -> profundidade; `cadeia` o resultado de correlacionar_cadeia
+    com os pares consecutivos de `ordem`. Retorna um DataFrame topo x poço com as profundidades.
+    """
+    nomes = list(topos)
+    atual = np.array([topos[t] for t in nomes], dtype=float)
+    tabela = {ordem[0]: atual}
+    for a, b in zip(ordem[:-1], ordem[1:]):
+        atual = mapear_profundidade(cadeia[(a, b)], atual)
+        tabela[b] = atual
+    return pd.DataFrame(tabela, index=pd.Index(nomes, name="Topo"))
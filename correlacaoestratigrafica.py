@@ -0,0 +1,139 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from importacao import reunir_pocos
+from tarefas import submeter, acompanhar
+from instrumentacao import medir
+from correlacao_pocos import correlacionar_cadeia, projetar_topos, MAX_AMOSTRAS_GROSSO, PENALIDADE
+
+MAX_PONTOS_TRILHA = 4000
+
+def get_depth_column(data):
+    for col in ['DEPTH', 'DEPT', 'MD']:
+        if col in data.columns:
+            return col
+    return None
+
+def topos_padrao(df, depth_col):
+    prof = df[depth_col].dropna()
+    return pd.DataFrame({'Topo': ["Topo A", "Topo B", "Topo C"],
+                         'Profundidade': np.round(prof.quantile([0.25, 0.5, 0.75]).to_numpy(), 2)})
+
+def figura_correlacao(pocos, ordem, curva, projetados):
+    # Uma trilha por poço, na ordem da cadeia, com os topos projetados na mesma cor em todas
+    fig = make_subplots(rows=1, cols=len(ordem), subplot_titles=ordem, horizontal_spacing=0.04)
+    cores = px.colors.qualitative.Plotly
+    for k, nome in enumerate(ordem, 1):
+        df, depth_col, _ = pocos[nome]
+        passo = max(1, len(df) // MAX_PONTOS_TRILHA)
+        fig.add_trace(go.Scattergl(x=df[curva].to_numpy()[::passo], y=df[depth_col].to_numpy()[::passo],
+                                   mode='lines', line=dict(color='black', width=1), name=nome, showlegend=False),
+                      row=1, col=k)
+        for t, (topo, prof) in enumerate(projetados[nome].items()):
+            if np.isfinite(prof):
+                fig.add_hline(y=prof, line=dict(color=cores[t % len(cores)], width=2), row=1, col=k,
+                              annotation_text=topo if k == 1 else None, annotation_position="top left")
+        fig.update_yaxes(autorange="reversed", row=1, col=k)
+        fig.update_xaxes(title_text=curva, row=1, col=k)
+    fig.update_yaxes(title_text="Profundidade (m)", row=1, col=1)
+    fig.update_layout(height=800, margin=dict(l=60, r=20, t=60, b=40))
+    return fig
+
+def app():
+    with st.sidebar:
+        st.markdown("---")
+        st.subheader("📁 Poços")
+        arquivos = st.file_uploader("Arquivos LAS dos poços", type=['las'], accept_multiple_files=True,
+                                    key="correlacao_arquivos")
+        incluir_importado = False
+        if st.session_state.get('well_data') is not None:
+            incluir_importado = st.checkbox("Incluir o poço importado", value=True, key="correlacao_importado")
+
+    st.title("🔗 Correlação de Poços")
+
+    pocos = {nome: (df, get_depth_column(df), chave)
+             for nome, (df, chave) in reunir_pocos(arquivos or [], incluir_importado).items()}
+    pocos = {nome: poco for nome, poco in pocos.items() if poco[1] is not None}
+    if len(pocos) < 2:
+        st.info("ℹ️ Envie ao menos dois arquivos LAS (ou um, somado ao poço importado) para correlacionar.")
+        return
+
+    with st.sidebar:
+        st.markdown("---")
+        st.subheader("⚙️ Configurações")
+
+        ordem = st.multiselect("Ordem dos poços (cadeia)", list(pocos), default=list(pocos),
+                               help="Cada poço é correlacionado com o seguinte; os topos seguem a cadeia a partir do primeiro")
+        comuns = set.intersection(*(set(df.select_dtypes(include="number").columns) - {depth_col}
+                                    for df, depth_col, _ in pocos.values()))
+        curvas = sorted(comuns)
+        if not curvas:
+            st.error("❌ Nenhuma curva numérica em comum entre os poços.")
+            return
+        curva = st.selectbox("Curva", curvas, index=curvas.index('GR') if 'GR' in curvas else 0)
+        categorica = st.checkbox("Curva categórica (fácies)", value=False,
+                                 help="Custo 0/1 por fácies diferente, em vez da diferença das curvas padronizadas")
+        raio = st.slider("Banda de Sakoe-Chiba (% do intervalo)", min_value=2, max_value=50, value=10,
+                         help="Quanto um ponto pode se afastar da posição proporcional no outro poço") / 100
+        with st.expander("Avançado", expanded=False):
+            max_amostras = st.number_input("Amostras na etapa grossa", min_value=200, max_value=10_000,
+                                           value=MAX_AMOSTRAS_GROSSO, step=100)
+            penalidade = st.number_input("Penalidade de passo não diagonal", min_value=0.0, max_value=5.0,
+                                         value=PENALIDADE, step=0.05, format="%.2f")
+
+    if len(ordem) < 2:
+        st.warning("⚠️ Selecione ao menos dois poços.")
+        return
+
+    with st.expander("ℹ️ Sobre a correlação", expanded=False):
+        st.markdown("""
+        - As curvas são **decimadas** e alinhadas por **DTW** dentro de uma banda de Sakoe-Chiba
+          em torno da diagonal; o caminho é depois **refinado na resolução original** numa faixa estreita.
+        - Curvas contínuas são padronizadas por poço, o que compensa calibrações diferentes.
+        - Os pares da cadeia rodam em **processos paralelos**.
+        - Em camadas homogêneas o casamento é ambíguo: confie mais nos topos marcados em contatos.
+        """)
+
+    chave = ('correlacao', tuple((nome, pocos[nome][2]) for nome in ordem), curva, categorica, raio,
+             int(max_amostras), float(penalidade))
+    if st.button("🔗 Correlacionar", type="primary", use_container_width=True):
+        st.session_state['correlacao'] = chave
+    if st.session_state.get('correlacao') != chave:
+        return
+
+    selecionados = {nome: pocos[nome][:2] for nome in ordem}
+    tarefa = submeter(chave, lambda t: correlacionar_cadeia(
+        selecionados, curva, categorica=categorica, raio=raio, max_amostras=int(max_amostras),
+        penalidade=float(penalidade), progresso=t.atualizar), rotulo="Correlação de poços")
+    cadeia = acompanhar(tarefa)
+    if cadeia is None:
+        return
+
+    st.subheader("📏 Pares correlacionados")
+    st.dataframe(pd.DataFrame([{
+        'Poço A': a, 'Poço B': b, 'Custo médio': r['custo'], 'Custo (etapa grossa)': r['custo_grosso'],
+        'Decimação': f"{r['fatores'][0]}x / {r['fatores'][1]}x",
+    } for (a, b), r in cadeia.items()]), hide_index=True, use_container_width=True)
+
+    st.subheader("🎯 Topos")
+    df_ref, depth_ref, chave_ref = pocos[ordem[0]]
+    st.caption(f"Marque os topos em **{ordem[0]}**; eles são projetados nos demais poços ao longo da cadeia.")
+    topos = st.data_editor(topos_padrao(df_ref, depth_ref), num_rows="dynamic", hide_index=True,
+                           key=f"topos_correlacao_{chave_ref}", use_container_width=True)
+    topos = topos.dropna()
+    topos = dict(zip(topos['Topo'].astype(str), topos['Profundidade'].astype(float)))
+    projetados = projetar_topos(topos, cadeia, ordem)
+
+    st.dataframe(projetados.round(2), use_container_width=True)
+    st.download_button("📥 Baixar topos (CSV)", data=projetados.to_csv().encode(), file_name="topos_correlacao.csv",
+                       mime="text/csv")
+
+    with medir("correlacao.figura", "plot"):
+        fig = figura_correlacao(pocos, ordem, curva, projetados)
+    st.plotly_chart(fig, use_container_width=True)
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,198 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+NULO = -999.25
+
+# Unidade e descrição das curvas geradas pelo aplicativo
+CURVAS_CALCULADAS = {
+    'Vcl': ('V/V', 'Volume de argila'),
+    'PHIT': ('%', 'Porosidade total'),
+    'PHIE': ('%', 'Porosidade efetiva'),
+    'Sw': ('V/V', 'Saturação de água (Archie)'),
+    'So': ('V/V', 'Saturação de óleo'),
+    'BVW': ('V/V', 'Volume de água no bulk'),
+    'FACIES': ('', 'Eletrofácies (K-means)'),
+}
+
+_DIGITOS = np.frombuffer(b"0123456789", dtype=np.uint8)
+_ESPACO, _PONTO, _MENOS, _QUEBRA = ord(" "), ord("."), ord("-"), ord("\n")
+
+def _largura_necessaria(valores, casas):
+    # Dígitos inteiros do maior valor + ponto + casas + sinal + espaço separador; o maior valor é
+    # tomado já arredondado, pois o arredondamento pode ganhar um dígito (9999.99996 -> 10000.0000)
+    maior = np.abs(valores).max() if len(valores) else 0.0
+    maior = np.rint(maior * 10.0 ** casas) / 10.0 ** casas
+    inteiros = 1 if maior < 1 else int(np.floor(np.log10(maior))) + 1
+    return inteiros + (casas + 1 if casas else 0) + 2
+
+def _formatar_coluna(saida, valores, casas, fim):
+    """Escreve `valores` alinhados à direita em saida[:, :fim] (uint8), sem laço por amostra.
+
+    Os números viram inteiros escalados (valor × 10^casas) e os dígitos são extraídos da
+    direita para a esquerda com divmod sobre a coluna inteira.
+    """
+    escalado = np.rint(np.abs(valores) * 10.0 ** casas).astype(np.int64)
+    negativo = (valores < 0) & (escalado > 0)
+    linhas = np.arange(len(valores))
+    pos = fim - 1
+
+    for _ in range(casas):
+        escalado, digito = np.divmod(escalado, 10)
+        saida[:, pos] = _DIGITOS[digito]
+        pos -= 1
+    if casas:
+        saida[:, pos] = _PONTO
+        pos -= 1
+
+    # Parte inteira: ao menos um dígito; a posição do sinal acompanha o número de dígitos de cada valor
+    sinal = np.full(len(valores), pos - 1)
+    primeiro = True
+    while primeiro or escalado.any():
+        ativo = (escalado > 0) | primeiro
+        escalado, digito = np.divmod(escalado, 10)
+        saida[ativo, pos] = _DIGITOS[digito[ativo]]
+        sinal[ativo] = pos - 1
+        pos -= 1
+        primeiro = False
+    saida[linhas[negativo], sinal[negativo]] = _MENOS
+
+def larguras_colunas(matriz, casas, nulo=NULO):
+    matriz = np.where(np.isfinite(matriz), matriz, nulo)
+    return [max(_largura_necessaria(matriz[:, j], casas[j]), 10) for j in range(matriz.shape[1])]
+
+def formatar_ascii(matriz, casas=4, nulo=NULO, larguras=None):
+    """Bloco ~A de largura fixa (bytes) para uma matriz amostras x curvas.
+
+    `casas` é um inteiro ou uma sequência por coluna. Nulos viram o valor NULL do LAS.
+    `larguras` fixa a largura das colunas (para blocos do mesmo arquivo ficarem alinhados).
+    """
+    matriz = np.asarray(matriz, dtype=float)
+    n, p = matriz.shape
+    casas = [casas] * p if np.isscalar(casas) else list(casas)
+    ausente = ~np.isfinite(matriz)
+    matriz = np.where(ausente, 0.0, matriz)
+
+    if larguras is None:
+        larguras = larguras_colunas(matriz, casas, nulo)
+    saida = np.full((n, sum(larguras) + 1), _ESPACO, dtype=np.uint8)
+    saida[:, -1] = _QUEBRA
+    # O NULL sai sempre com o texto do cabeçalho, mesmo em colunas inteiras (sem casas decimais)
+    texto_nulo = np.frombuffer(f"{nulo}".encode(), dtype=np.uint8)
+    fim = 0
+    for j in range(p):
+        fim += larguras[j]
+        if np.abs(matriz[:, j]).max(initial=0) * 10.0 ** casas[j] < 2**62:
+            _formatar_coluna(saida, matriz[:, j], casas[j], fim)
+        else:
+            # Valores fora do alcance de int64: formatação com string (raro)
+            texto = "".join(f"{v:{larguras[j]}.{casas[j]}f}" for v in matriz[:, j]).encode()
+            saida[:, fim - larguras[j]:fim] = np.frombuffer(texto, dtype=np.uint8).reshape(n, larguras[j])
+        if ausente[:, j].any():
+            campo = saida[ausente[:, j], fim - larguras[j]:fim]
+            campo[:] = _ESPACO
+            campo[:, -len(texto_nulo):] = texto_nulo
+            saida[ausente[:, j], fim - larguras[j]:fim] = campo
+    return saida.tobytes()
+
+def _linha_cabecalho(mnem, unidade, valor, descricao):
+    return f" {mnem:<8}.{unidade or '':<10} {'' if valor is None else valor!s:<26}: {descricao or ''}\n"
+
+def _secao(cabecalho, nome):
+    return list(getattr(cabecalho, nome, []) or []) if cabecalho is not None else []
+
+def montar_cabecalho(df, depth_col, curvas, cabecalho=None, info_curvas=None, nulo=NULO):
+    """Cabeçalho LAS 2.0: ~W e ~P do arquivo original, ~C com as curvas originais e as novas"""
+    prof = df[depth_col].to_numpy(dtype=float)
+    passos = np.unique(np.round(np.diff(prof), 6)) if len(prof) > 1 else np.array([0.0])
+    passo = float(passos[0]) if len(passos) == 1 else 0.0
+    originais = {c.mnemonic: c for c in _secao(cabecalho, "curves")}
+    info_curvas = dict(CURVAS_CALCULADAS, **(info_curvas or {}))
+    unidade_prof = getattr(originais.get(depth_col), "unit", "") or "M"
+
+    linhas = ["~Version Information\n",
+              _linha_cabecalho("VERS", "", "2.0", "CWLS LOG ASCII STANDARD - VERSION 2.0"),
+              _linha_cabecalho("WRAP", "", "NO", "One line per depth step"),
+              "~Well Information\n"]
+    # Limites e NULL refletem os dados exportados; o restante vem do arquivo original
+    atualizados = {
+        "STRT": (unidade_prof, f"{prof[0]:.4f}" if len(prof) else "", "START DEPTH"),
+        "STOP": (unidade_prof, f"{prof[-1]:.4f}" if len(prof) else "", "STOP DEPTH"),
+        "STEP": (unidade_prof, f"{passo:.4f}", "STEP"),
+        "NULL": ("", f"{nulo}", "NULL VALUE"),
+    }
+    for mnem, (unidade, valor, descricao) in atualizados.items():
+        linhas.append(_linha_cabecalho(mnem, unidade, valor, descricao))
+    for item in _secao(cabecalho, "well"):
+        if item.mnemonic not in atualizados:
+            linhas.append(_linha_cabecalho(item.mnemonic, item.unit, item.value, item.descr))
+
+    linhas.append("~Curve Information\n")
+    for curva in [depth_col] + list(curvas):
+        if curva in originais:
+            item = originais[curva]
+            linhas.append(_linha_cabecalho(curva, item.unit, "", item.descr))
+        else:
+            unidade, descricao = info_curvas.get(curva, ("", ""))
+            linhas.append(_linha_cabecalho(curva, unidade, "", descricao))
+
+    parametros = _secao(cabecalho, "params")
+    if parametros:
+        linhas.append("~Parameter Information\n")
+        for item in parametros:
+            linhas.append(_linha_cabecalho(item.mnemonic, item.unit, item.value, item.descr))
+
+    outros = getattr(cabecalho, "other", "") if cabecalho is not None else ""
+    if outros:
+        linhas.append("~Other Information\n" + str(outros).rstrip("\n") + "\n")
+
+    linhas.append("~A  " + " ".join(str(c) for c in [depth_col] + list(curvas)) + "\n")
+    return "".join(linhas)
+
+def escrever_las(df, destino=None, cabecalho=None, depth_col="DEPTH", curvas=None, info_curvas=None,
+                 casas_decimais=4, nulo=NULO, tamanho_bloco=200_000):
+    """Grava um poço em LAS 2.0 (arquivo binário aberto ou caminho); sem destino, devolve bytes.
+
+    As curvas não numéricas são ignoradas; o ~A é escrito em blocos de `tamanho_bloco` linhas.
+    """
+    if curvas is None:
+        curvas = [c for c in df.select_dtypes(include="number").columns if c != depth_col]
+    curvas = list(curvas)
+    casas = [casas_decimais] + [0 if pd.api.types.is_integer_dtype(df[c].dtype) else casas_decimais for c in curvas]
+
+    fechar = isinstance(destino, (str, os.PathLike))
+    saida = open(destino, "wb") if fechar else (destino if destino is not None else io.BytesIO())
+    try:
+        saida.write(montar_cabecalho(df, depth_col, curvas, cabecalho, info_curvas, nulo).encode("utf-8"))
+        colunas = [depth_col] + curvas
+        # Larguras a partir dos extremos do poço inteiro: todas as linhas do ~A ficam alinhadas
+        extremos = np.vstack([df[colunas].min().to_numpy(dtype=float, na_value=np.nan),
+                              df[colunas].max().to_numpy(dtype=float, na_value=np.nan)])
+        larguras = larguras_colunas(extremos, casas, nulo)
+        for inicio in range(0, len(df), tamanho_bloco):
+            bloco = df[colunas].iloc[inicio:inicio + tamanho_bloco].to_numpy(dtype=float, na_value=np.nan)
+            saida.write(formatar_ascii(bloco, casas, nulo, larguras))
+    finally:
+        if fechar:
+            saida.close()
+    if destino is None:
+        return saida.getvalue()
+    return destino
+
+def _escrever_um(argumentos):
+    df, cabecalho, caminho, opcoes = argumentos
+    escrever_las(df, caminho, cabecalho, **opcoes)
+    return caminho
+
+def escrever_varios(pocos, pasta_saida, max_workers=None, **opcoes):
+    """Grava vários poços em paralelo (um processo por poço).
+
+    `pocos` é um dict nome -> (DataFrame, cabeçalho ou None). Retorna a lista de caminhos gravados.
+    """
+    os.makedirs(pasta_saida, exist_ok=True)
+    tarefas = [(df, cabecalho, os.path.join(pasta_saida, f"{nome}.las"), opcoes)
+               for nome, (df, cabecalho) in pocos.items()]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_escrever_um, tarefas))
@@ -1,10 +1,23 @@
 import streamlit as st
-import seaborn as sns
-import matplotlib.pyplot as plt
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import numpy as np
 import pandas as pd
+from preprocessamento import obter_hash_poco, tratar_dados_ausentes
+from acesso_dados import obter_poco
+from correlacao import METODOS as METODOS_CORRELACAO, matriz_correlacao_cache, passo_kendall
+from estatistica_movel import estatisticas_moveis_cache
+from qualidade import obter_qualidade
+from tarefas import submeter, acompanhar, pairplot_png
+from instrumentacao import medir
+from reamostragem import controle_reamostragem
+from ajuste_profundidade import controle_ajuste
+from importacao import reunir_pocos
+from estatistica_campo import DIMENSOES, zonas_de_topos, calcular_parciais, reduzir, tabela_resumo, tabela_normalizacao
+
+MODO_POCO = "Poço atual"
+MODO_CAMPO = "Campo (vários poços)"
 
 def get_depth_column(df):
     for col in ['DEPTH', 'DEPT', 'MD']:
@@ -12,44 +25,148 @@ def get_depth_column(df):
             return col
     return None
 
+def app_campo():
+    # Vários poços: um resumo parcial por poço (em cache no servidor), fundido nos grupos escolhidos
+    with st.sidebar:
+        st.markdown("---")
+        st.subheader("📁 Poços do Campo")
+        arquivos = st.file_uploader("Arquivos LAS", type=['las'], accept_multiple_files=True, key="campo_arquivos")
+        incluir_importado = False
+        if st.session_state.get('well_data') is not None:
+            incluir_importado = st.checkbox("Incluir o poço importado", value=True, key="campo_importado")
+        arquivo_topos = st.file_uploader("Topos (CSV da Correlação de Poços)", type=['csv'], key="campo_topos",
+                                         help="Tabela topo x poço; cada zona vai de um topo ao seguinte")
+
+    st.title("🌎 Estatísticas do Campo")
+
+    pocos = {nome: (df, get_depth_column(df), chave)
+             for nome, (df, chave) in reunir_pocos(arquivos or [], incluir_importado).items()}
+    pocos = {nome: poco for nome, poco in pocos.items() if poco[1] is not None}
+    if not pocos:
+        st.info("ℹ️ Envie os arquivos LAS dos poços (ou importe um poço) para resumir o campo.")
+        return
+
+    zonas = None
+    if arquivo_topos is not None:
+        zonas = zonas_de_topos(pd.read_csv(arquivo_topos, index_col=0))
+        sem_topos = [nome for nome in pocos if nome not in zonas]
+        if sem_topos:
+            st.warning(f"⚠️ Poços sem topos (entram como uma zona única): {', '.join(sem_topos)}")
+
+    with st.sidebar:
+        st.markdown("---")
+        st.subheader("⚙️ Configurações")
+
+        # União das curvas: cada poço contribui com as que tiver
+        colunas = list(dict.fromkeys(c for df, depth_col, _ in pocos.values()
+                                     for c in df.select_dtypes(include="number").columns if c != depth_col))
+        curvas = st.multiselect("Curvas", colunas, default=colunas[:min(5, len(colunas))], key="campo_curvas")
+        col_facies = st.selectbox("Coluna de fácies", ["Nenhuma"] + colunas, key="campo_facies",
+                                  help="Curva com o rótulo de fácies de cada amostra (ex.: exportada da classificação)")
+        col_facies = None if col_facies == "Nenhuma" else col_facies
+        por = st.multiselect("Agrupar por", list(DIMENSOES), default=["Zona"] if zonas else ["Poço"], key="campo_por")
+
+        st.markdown("**Percentis de Normalização:**")
+        col_baixo, col_alto = st.columns(2)
+        with col_baixo:
+            baixo = st.number_input("Inferior", min_value=0.0, max_value=50.0, value=5.0, step=1.0, key="campo_baixo")
+        with col_alto:
+            alto = st.number_input("Superior", min_value=50.0, max_value=100.0, value=95.0, step=1.0, key="campo_alto")
+
+    curvas = [c for c in curvas if c != col_facies]
+    if not curvas:
+        st.info("📌 Selecione pelo menos uma curva na sidebar")
+        return
+
+    # Cada poço é resumido uma única vez: incluir um poço novo calcula só o parcial dele
+    chave = ('campo', tuple((nome, poco[2]) for nome, poco in pocos.items()), tuple(curvas),
+             tuple(sorted(zonas.items())) if zonas else None, col_facies)
+    tarefa = submeter(chave, lambda t: calcular_parciais(pocos, curvas, zonas, col_facies, progresso=t.atualizar),
+                      rotulo="Estatísticas do campo")
+    saida = acompanhar(tarefa)
+    if saida is None:
+        return
+    parciais, calculados = saida
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Poços", len(parciais))
+    with col2:
+        st.metric("Amostras", sum(agregado.n for parcial in parciais.values() for grupo in parcial.values()
+                                  for agregado in grupo.values()) // len(curvas))
+    with col3:
+        st.metric("Poços resumidos agora", calculados, help="Os demais vieram do cache do servidor")
+
+    with medir("campo.reduzir", "estatistica", grupos=len(por)):
+        grupos = reduzir(parciais, tuple(por))
+
+    tab1, tab2, tab3 = st.tabs(["📋 Resumo", "📊 Distribuições", "📏 Normalização"])
+
+    with tab1:
+        resumo = tabela_resumo(grupos, tuple(por))
+        st.dataframe(resumo, hide_index=True, use_container_width=True)
+        st.download_button("📥 Baixar resumo (CSV)", data=resumo.to_csv(index=False).encode(),
+                           file_name="resumo_campo.csv", mime="text/csv")
+
+    with tab2:
+        curva_hist = st.selectbox("Curva", curvas, key="campo_hist_curva")
+        fig_hist = go.Figure()
+        for chave_grupo, agregados in list(grupos.items())[:12]:
+            if curva_hist not in agregados or agregados[curva_hist].n == 0:
+                continue
+            bordas, contagens = agregados[curva_hist].histograma()
+            # Densidade, para comparar grupos com números de amostras diferentes
+            densidade = contagens / (contagens.sum() * np.diff(bordas))
+            fig_hist.add_trace(go.Scatter(x=np.repeat(bordas, 2)[1:-1], y=np.repeat(densidade, 2), mode='lines',
+                                          name=" / ".join(map(str, chave_grupo)) or "Campo"))
+        if len(grupos) > 12:
+            st.caption(f"Mostrando 12 de {len(grupos)} grupos")
+        fig_hist.update_layout(title=f'Distribuição: {curva_hist}', xaxis_title=curva_hist, yaxis_title='Densidade',
+                               height=500, plot_bgcolor='white', hovermode='x unified')
+        st.plotly_chart(fig_hist, use_container_width=True)
+
+    with tab3:
+        st.caption("Percentis por poço (todas as zonas e fácies), para normalizar as curvas entre poços")
+        vazios = [poco for poco, parcial in parciais.items() if not parcial]
+        if vazios:
+            st.warning(f"⚠️ Sem amostras nas zonas escolhidas: {', '.join(vazios)}")
+        normalizacao = tabela_normalizacao(parciais, curvas, baixo, alto)
+        st.dataframe(normalizacao, use_container_width=True)
+        st.download_button("📥 Baixar tabela de normalização (CSV)", data=normalizacao.to_csv().encode(),
+                           file_name="normalizacao_pocos.csv", mime="text/csv")
+
 def app():
+    with st.sidebar:
+        modo = st.radio("Modo", [MODO_POCO, MODO_CAMPO], horizontal=True, key="estatistica_modo")
+    if modo == MODO_CAMPO:
+        app_campo()
+        return
+
     # Verificação inicial
     if "well_data" not in st.session_state or st.session_state["well_data"] is None:
         st.warning("⚠️ Nenhum dado carregado. Vá até a aba de Importação.")
         return
 
-    df_original = st.session_state["well_data"].copy()
+    df_original = obter_poco()
     depth_col = get_depth_column(df_original)
+    chave_poco = obter_hash_poco(df_original)
 
     # Sidebar - Controles
     with st.sidebar:
         st.markdown("---")
         st.subheader("⚙️ Configurações")
 
-        # Tratamento de dados faltantes
-        st.markdown("**Dados Ausentes:**")
-        handle_na = st.radio(
-            "Tratamento",
-            ["Remover", "Manter", "Interpolar"],
-            label_visibility="collapsed"
-        )
-
-        if handle_na == "Remover":
-            df = df_original.dropna().copy()
-        elif handle_na == "Interpolar":
-            df = df_original.interpolate(method='linear').copy()
-        else:
-            df = df_original.copy()
-
-        if df.empty:
-            st.error("❌ DataFrame vazio após tratamento")
-            return
+        # Grade de profundidade (opcional): o restante da página usa o poço reamostrado
+        df_original, chave_poco = controle_reamostragem(df_original, depth_col, chave_poco, "estatistica")
+        # Curvas de corridas diferentes casadas em profundidade antes dos crossplots
+        df_original, chave_poco = controle_ajuste(df_original, depth_col, chave_poco, "estatistica")
 
         # Filtro de profundidade
+        depth_range = None
         if depth_col:
             st.markdown("**Intervalo de Profundidade:**")
-            min_depth = float(df[depth_col].min())
-            max_depth = float(df[depth_col].max())
+            min_depth = float(df_original[depth_col].min())
+            max_depth = float(df_original[depth_col].max())
 
             depth_range = st.slider(
                 "Range (m)",
@@ -59,10 +176,8 @@ def app():
                 label_visibility="collapsed"
             )
 
-            df = df[(df[depth_col] >= depth_range[0]) & (df[depth_col] <= depth_range[1])].copy()
-
         # Seleção de curvas
-        curvas_numericas = df.select_dtypes(include="number").columns.tolist()
+        curvas_numericas = df_original.select_dtypes(include="number").columns.tolist()
         if depth_col and depth_col in curvas_numericas:
             curvas_numericas.remove(depth_col)
 
@@ -78,6 +193,41 @@ def app():
             label_visibility="collapsed"
         )
 
+        # Tratamento de dados faltantes (aplicado só às curvas e ao intervalo selecionados)
+        st.markdown("**Dados Ausentes:**")
+        handle_na = st.radio(
+            "Tratamento",
+            ["Remover", "Manter", "Interpolar"],
+            label_visibility="collapsed"
+        )
+
+        limite_gap = None
+        if handle_na == "Interpolar" and depth_col:
+            limite_gap = st.number_input(
+                "Lacuna máxima interpolada (m)",
+                min_value=0.0,
+                value=5.0,
+                step=0.5,
+                help="Lacunas maiores que este valor permanecem sem dados (0 = sem limite)"
+            ) or None
+
+        mascarar_qc = st.checkbox(
+            "Mascarar amostras sinalizadas (QC)",
+            value=False,
+            help="Sentinelas NULL, picos, trechos planos e valores travados detectados na importação"
+        )
+        qc = obter_qualidade(df_original, chave_poco, depth_col) if mascarar_qc else None
+
+        df = tratar_dados_ausentes(
+            df_original, chave_poco, depth_col, tuple(selected_curves),
+            tuple(depth_range) if depth_range else None, handle_na, limite_gap,
+            _qc=qc, mascarar_qc=mascarar_qc
+        )
+
+        if selected_curves and df.empty:
+            st.error("❌ DataFrame vazio após tratamento")
+            return
+
         st.markdown("---")
         st.metric("Total de Amostras", len(df))
         st.metric("Curvas Selecionadas", len(selected_curves))
@@ -99,6 +249,14 @@ def app():
     stats_df['cv'] = (stats_df['std'] / stats_df['mean'] * 100).round(2)  # Coeficiente de variação
     st.dataframe(stats_df.style.background_gradient(cmap='YlOrRd', subset=['mean', 'std']), use_container_width=True)
 
+    # Outliers por IQR, todas as curvas de uma vez (usado na métrica e na tabela)
+    quartis = df[selected_curves].quantile([0.25, 0.75])
+    Q1, Q3 = quartis.loc[0.25], quartis.loc[0.75]
+    IQR = Q3 - Q1
+    lower_bounds = Q1 - 1.5 * IQR
+    upper_bounds = Q3 + 1.5 * IQR
+    outliers_por_curva = ((df[selected_curves] < lower_bounds) | (df[selected_curves] > upper_bounds)).sum()
+
     # Métricas principais
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -109,16 +267,10 @@ def app():
     with col3:
         st.metric("Curvas Analisadas", len(selected_curves))
     with col4:
-        outliers = 0
-        for curve in selected_curves:
-            Q1 = df[curve].quantile(0.25)
-            Q3 = df[curve].quantile(0.75)
-            IQR = Q3 - Q1
-            outliers += ((df[curve] < (Q1 - 1.5 * IQR)) | (df[curve] > (Q3 + 1.5 * IQR))).sum()
-        st.metric("Outliers Detectados", outliers)
+        st.metric("Outliers Detectados", int(outliers_por_curva.sum()))
 
     # Tabs para organização
-    tab1, tab2, tab3, tab4 = st.tabs(["📊 Distribuições", "📈 Correlações", "📦 Box Plot", "🎯 Dispersão"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Distribuições", "📈 Correlações", "📦 Box Plot", "🎯 Dispersão", "📉 Estatística Móvel"])
 
     with tab1:
         st.markdown("### 📊 Análise de Distribuições")
@@ -144,8 +296,9 @@ def app():
         # KDE (densidade)
         from scipy import stats
         kde_x = np.linspace(df[curva_hist].min(), df[curva_hist].max(), 100)
-        kde = stats.gaussian_kde(df[curva_hist].dropna())
-        kde_y = kde(kde_x)
+        with medir("kde", "estatistica", curva=curva_hist):
+            kde = stats.gaussian_kde(df[curva_hist].dropna())
+            kde_y = kde(kde_x)
 
         # Normalizar KDE para sobrepor ao histograma
         hist_counts, _ = np.histogram(df[curva_hist].dropna(), bins=n_bins)
@@ -178,7 +331,8 @@ def app():
             plot_bgcolor='white'
         )
 
-        st.plotly_chart(fig_hist, use_container_width=True)
+        with medir("serializacao.plotly", "figura"):
+            st.plotly_chart(fig_hist, use_container_width=True)
 
         # Estatísticas adicionais
         col_a, col_b, col_c, col_d = st.columns(4)
@@ -197,23 +351,35 @@ def app():
         if len(selected_curves) < 2:
             st.warning("Selecione pelo menos 2 curvas para análise de correlação")
         else:
-            # Matriz de correlação interativa
-            corr_matrix = df[selected_curves].corr()
-
+            metodo_corr = st.selectbox("Método", METODOS_CORRELACAO, key="corr_metodo")
+            if metodo_corr in ("Spearman", "Kendall", "Informação Mútua"):
+                completas = int(df[selected_curves].notna().all(axis=1).sum())
+                passo = passo_kendall(completas) if metodo_corr == "Kendall" else 1
+                if passo > 1:
+                    st.caption(f"Kendall estimado sobre {len(range(0, completas, passo)):,} de {completas:,} amostras "
+                               f"completas (uma a cada {passo}, ao longo da profundidade)")
+                else:
+                    st.caption("Calculado sobre as amostras completas em todas as curvas selecionadas")
+
+            # Matriz de correlação interativa (em cache por poço, intervalo e tratamento de nulos)
+            chave_intervalo = (chave_poco, tuple(depth_range) if depth_range else None, handle_na, limite_gap, mascarar_qc)
+            corr_matrix = matriz_correlacao_cache(df, chave_intervalo, tuple(selected_curves), metodo_corr)
+
+            informacao_mutua = metodo_corr == "Informação Mútua"
             fig_corr = go.Figure(data=go.Heatmap(
                 z=corr_matrix.values,
                 x=corr_matrix.columns,
                 y=corr_matrix.columns,
-                colorscale='RdYlGn',
-                zmid=0,
+                colorscale='Viridis' if informacao_mutua else 'RdYlGn',
+                zmid=None if informacao_mutua else 0,
                 text=corr_matrix.values,
                 texttemplate='%{text:.2f}',
                 textfont={"size": 10},
-                colorbar=dict(title="Correlação")
+                colorbar=dict(title="IM (nats)" if informacao_mutua else "Correlação")
             ))
 
             fig_corr.update_layout(
-                title='Matriz de Correlação entre Curvas',
+                title=f'Matriz de Correlação entre Curvas ({metodo_corr})',
                 height=600,
                 xaxis={'side': 'bottom'},
                 yaxis={'side': 'left'}
@@ -225,16 +391,19 @@ def app():
             if len(selected_curves) <= 5:
                 st.markdown("### 🎯 Pairplot")
 
-                fig_pair = plt.figure(figsize=(12, 10))
-                sns.set_style("whitegrid")
-                pairplot = sns.pairplot(
+                tarefa_pairplot = submeter(
+                    ('pairplot_estatistica', chave_intervalo, tuple(selected_curves)),
+                    pairplot_png,
                     df[selected_curves],
+                    'Matriz de Dispersão entre Curvas',
                     diag_kind='kde',
                     plot_kws={'alpha': 0.6, 's': 20, 'edgecolor': 'black', 'linewidth': 0.3},
-                    diag_kws={'alpha': 0.7, 'linewidth': 2}
+                    diag_kws={'alpha': 0.7, 'linewidth': 2},
+                    rotulo="Gerando pairplot"
                 )
-                pairplot.fig.suptitle('Matriz de Dispersão entre Curvas', y=1.01, fontweight='bold')
-                st.pyplot(pairplot)
+                imagem = acompanhar(tarefa_pairplot)
+                if imagem is not None:
+                    st.image(imagem, use_container_width=True)
 
     with tab3:
         st.markdown("### 📦 Box Plot - Análise de Outliers")
@@ -264,27 +433,14 @@ def app():
         # Tabela de outliers
         st.markdown("#### 🔍 Detalhes de Outliers por Curva")
 
-        outlier_data = []
-        for curve in selected_curves:
-            Q1 = df[curve].quantile(0.25)
-            Q3 = df[curve].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-
-            outliers_count = ((df[curve] < lower_bound) | (df[curve] > upper_bound)).sum()
-            outlier_percent = (outliers_count / len(df) * 100)
-
-            outlier_data.append({
-                'Curva': curve,
-                'Q1': f"{Q1:.2f}",
-                'Q3': f"{Q3:.2f}",
-                'IQR': f"{IQR:.2f}",
-                'Outliers': outliers_count,
-                'Percentual': f"{outlier_percent:.2f}%"
-            })
-
-        outlier_df = pd.DataFrame(outlier_data)
+        outlier_df = pd.DataFrame({
+            'Curva': selected_curves,
+            'Q1': Q1.map("{:.2f}".format).values,
+            'Q3': Q3.map("{:.2f}".format).values,
+            'IQR': IQR.map("{:.2f}".format).values,
+            'Outliers': outliers_por_curva.values,
+            'Percentual': (outliers_por_curva / len(df) * 100).map("{:.2f}%".format).values
+        })
         st.dataframe(outlier_df, use_container_width=True)
 
     with tab4:
@@ -331,12 +487,97 @@ def app():
             else:
                 st.info("Selecione curvas diferentes para os eixos X e Y")
 
+    with tab5:
+        st.markdown("### 📉 Estatística Móvel por Profundidade")
+
+        if not depth_col:
+            st.warning("Coluna de profundidade necessária para estatísticas móveis")
+        else:
+            col_curvas, col_janela = st.columns([3, 1])
+            with col_curvas:
+                curvas_moveis = st.multiselect(
+                    "Curvas", selected_curves,
+                    default=selected_curves[:min(3, len(selected_curves))],
+                    key="movel_curvas"
+                )
+            with col_janela:
+                janela = st.number_input("Janela (m)", min_value=0.1, value=5.0, step=0.5, key="movel_janela")
+
+            if curvas_moveis:
+                # Com "Remover", as linhas dependem de todas as curvas selecionadas, não só das trilhas
+                chave_intervalo = (chave_poco, tuple(depth_range) if depth_range else None, handle_na, limite_gap,
+                                   mascarar_qc, tuple(selected_curves))
+                trilhas = estatisticas_moveis_cache(df, chave_intervalo, depth_col, tuple(curvas_moveis), janela)
+
+                fig_movel = make_subplots(
+                    rows=1, cols=len(curvas_moveis),
+                    shared_yaxes=True,
+                    subplot_titles=curvas_moveis,
+                    horizontal_spacing=0.05
+                )
+                prof = trilhas[depth_col]
+
+                for i, curva in enumerate(curvas_moveis, 1):
+                    media = trilhas[f"{curva}_media"]
+                    desvio = trilhas[f"{curva}_desvio"]
+
+                    # Faixa P10-P90
+                    fig_movel.add_trace(go.Scatter(x=trilhas[f"{curva}_P10"], y=prof, mode='lines',
+                                                   line=dict(width=0), showlegend=False, hoverinfo='skip'),
+                                        row=1, col=i)
+                    fig_movel.add_trace(go.Scatter(x=trilhas[f"{curva}_P90"], y=prof, mode='lines',
+                                                   line=dict(width=0), fill='tonextx',
+                                                   fillcolor='rgba(52, 152, 219, 0.2)',
+                                                   name='P10-P90', showlegend=(i == 1), hoverinfo='skip'),
+                                        row=1, col=i)
+                    fig_movel.add_trace(go.Scatter(x=df[curva], y=df[depth_col], mode='lines',
+                                                   line=dict(color='lightgray', width=1),
+                                                   name='Curva', showlegend=(i == 1)),
+                                        row=1, col=i)
+                    fig_movel.add_trace(go.Scatter(x=trilhas[f"{curva}_min"], y=prof, mode='lines',
+                                                   line=dict(color='#7f8c8d', width=1, dash='dot'),
+                                                   name='Mín/Máx', showlegend=(i == 1)),
+                                        row=1, col=i)
+                    fig_movel.add_trace(go.Scatter(x=trilhas[f"{curva}_max"], y=prof, mode='lines',
+                                                   line=dict(color='#7f8c8d', width=1, dash='dot'),
+                                                   showlegend=False),
+                                        row=1, col=i)
+                    fig_movel.add_trace(go.Scatter(x=media - desvio, y=prof, mode='lines',
+                                                   line=dict(color='#e67e22', width=1, dash='dash'),
+                                                   name='Média ± σ', showlegend=(i == 1)),
+                                        row=1, col=i)
+                    fig_movel.add_trace(go.Scatter(x=media + desvio, y=prof, mode='lines',
+                                                   line=dict(color='#e67e22', width=1, dash='dash'),
+                                                   showlegend=False),
+                                        row=1, col=i)
+                    fig_movel.add_trace(go.Scatter(x=media, y=prof, mode='lines',
+                                                   line=dict(color='#c0392b', width=2),
+                                                   name='Média', showlegend=(i == 1)),
+                                        row=1, col=i)
+
+                fig_movel.update_yaxes(title_text="Profundidade (m)", autorange="reversed", row=1, col=1)
+                fig_movel.update_layout(
+                    title=f'Estatísticas Móveis (janela de {janela:g} m)',
+                    height=800,
+                    plot_bgcolor='white',
+                    hovermode='y unified'
+                )
+
+                st.plotly_chart(fig_movel, use_container_width=True)
+
+                st.download_button(
+                    label="📥 Download Estatísticas Móveis (CSV)",
+                    data=lambda: trilhas.to_csv(index=False),
+                    file_name="estatisticas_moveis.csv",
+                    mime="text/csv"
+                )
+
     # Download de relatório
     st.markdown("---")
-    csv = df[selected_curves].describe().to_csv()
+    # Conteúdo dos downloads gerado só no clique, não a cada rerun
     st.download_button(
         label="📥 Download Estatísticas (CSV)",
-        data=csv,
+        data=lambda: df[selected_curves].describe().to_csv(),
         file_name="estatisticas.csv",
         mime="text/csv"
     )
@@ -0,0 +1,314 @@
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from cache_compartilhado import CACHE
+
+# Estatísticas de campo em map-reduce: cada poço vira um resumo parcial por (zona, fácies) e curva
+# (momentos, histograma e esboço de quantis, todos mescláveis), calculado uma vez e guardado no
+# cache do servidor. Resumos de campo e tabelas de normalização saem da fusão dos parciais, então
+# incluir um poço novo só calcula o parcial dele.
+K_ESBOCO = 256
+BINS_POR_DECADA = 100
+TODOS = "Todos"
+DIMENSOES = ("Poço", "Zona", "Fácies")
+
+def momentos(valores):
+    """[n, média, M2, M3, M4, mín, máx], com Mk a soma dos desvios à média elevados a k"""
+    n = len(valores)
+    if n == 0:
+        return np.array([0.0, 0.0, 0.0, 0.0, 0.0, np.inf, -np.inf])
+    media = valores.mean()
+    d = valores - media
+    d2 = d * d
+    return np.array([n, media, d2.sum(), (d2 * d).sum(), (d2 * d2).sum(), valores.min(), valores.max()])
+
+def unir_momentos(a, b):
+    # Fórmulas de fusão de Pébay (2008) para momentos centrais de dois conjuntos
+    na, ma, m2a, m3a, m4a = a[:5]
+    nb, mb, m2b, m3b, m4b = b[:5]
+    if na == 0 or nb == 0:
+        return (b if na == 0 else a).copy()
+    n = na + nb
+    delta = mb - ma
+    d_n = delta / n
+    m2 = m2a + m2b + delta * d_n * na * nb
+    m3 = m3a + m3b + delta * d_n * d_n * na * nb * (na - nb) + 3 * d_n * (na * m2b - nb * m2a)
+    m4 = (m4a + m4b + delta * d_n ** 3 * na * nb * (na * na - na * nb + nb * nb)
+          + 6 * d_n * d_n * (na * na * m2b + nb * nb * m2a) + 4 * d_n * (na * m3b - nb * m3a))
+    return np.array([n, ma + d_n * nb, m2, m3, m4, min(a[5], b[5]), max(a[6], b[6])])
+
+class EsbocoQuantis:
+    """Esboço de quantis mesclável (KLL): níveis de amostras ordenadas com peso 2**nível.
+
+    Cada nível guarda no máximo ~k * (2/3)**(distância ao topo) itens; ao estourar, metade dos
+    itens (alternados, com deslocamento sorteado) sobe um nível com o dobro do peso. O erro de
+    posto fica na ordem de 1/k do total, independente do número de amostras e de fusões.
+    """
+
+    def __init__(self, k=K_ESBOCO):
+        self.k = k
+        self.n = 0
+        self.niveis = []
+
+    @classmethod
+    def de_valores(cls, valores, k=K_ESBOCO):
+        esboco = cls(k)
+        esboco.n = len(valores)
+        esboco.niveis = [np.asarray(valores, dtype=float)]
+        esboco._compactar()
+        return esboco
+
+    def _capacidade(self, nivel):
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.niveis) - 1 - nivel))))
+
+    def _compactar(self):
+        # Sorteio determinístico: o mesmo conjunto de poços dá sempre o mesmo esboço
+        rng = np.random.default_rng(self.n)
+        h = 0
+        while h < len(self.niveis):
+            nivel = self.niveis[h]
+            if len(nivel) > self._capacidade(h):
+                nivel = np.sort(nivel)
+                impar = len(nivel) % 2
+                promovidos = nivel[rng.integers(2):len(nivel) - impar:2]
+                if h + 1 == len(self.niveis):
+                    self.niveis.append(promovidos)
+                else:
+                    self.niveis[h + 1] = np.concatenate([self.niveis[h + 1], promovidos])
+                self.niveis[h] = nivel[len(nivel) - impar:]
+            h += 1
+
+    @classmethod
+    def unir_varios(cls, esbocos):
+        # Níveis de mesmo peso concatenados e uma única compactação no fim
+        novo = cls(max(e.k for e in esbocos))
+        novo.n = sum(e.n for e in esbocos)
+        altura = max(len(e.niveis) for e in esbocos)
+        novo.niveis = [np.concatenate([e.niveis[h] for e in esbocos if h < len(e.niveis)]) for h in range(altura)]
+        novo._compactar()
+        return novo
+
+    def unir(self, outro):
+        return EsbocoQuantis.unir_varios([self, outro])
+
+    def quantis(self, q):
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        if self.n == 0:
+            return np.full(len(q), np.nan)
+        valores = np.concatenate(self.niveis)
+        pesos = np.concatenate([np.full(len(v), 2.0 ** h) for h, v in enumerate(self.niveis)])
+        ordem = np.argsort(valores, kind="stable")
+        acumulado = np.cumsum(pesos[ordem])
+        posicao = np.searchsorted(acumulado, q * acumulado[-1], side="left")
+        return valores[ordem][np.clip(posicao, 0, len(valores) - 1)]
+
+def _expoente(minimo, maximo):
+    # Largura das classes: potência de 10 com ~BINS_POR_DECADA a ~10x isso de classes no intervalo.
+    # Classes de larguras diferentes continuam mescláveis: a mais fina é agrupada de 10 em 10
+    amplitude = max(maximo - minimo, abs(maximo) * 1e-6, 1e-12)
+    return int(np.floor(np.log10(amplitude / BINS_POR_DECADA)))
+
+def _reagrupar(indices, contagens, fator):
+    if fator == 1:
+        return indices, contagens
+    # Índices ordenados continuam ordenados após a divisão inteira
+    novos, inverso = np.unique(indices // fator, return_inverse=True)
+    return novos, np.bincount(inverso, weights=contagens).astype(np.int64)
+
+class Agregado:
+    """Resumo mesclável de uma curva num grupo: momentos, histograma esparso e esboço de quantis.
+
+    O histograma conta amostras em classes [i, i+1) * 10**expoente, guardando só as classes
+    ocupadas (`indices`, `contagens`).
+    """
+
+    def __init__(self, momentos, expoente, indices, contagens, esboco):
+        self.momentos = momentos
+        self.expoente = expoente
+        self.indices = indices
+        self.contagens = contagens
+        self.esboco = esboco
+
+    @classmethod
+    def de_valores(cls, valores, k=K_ESBOCO):
+        valores = np.asarray(valores, dtype=float)
+        valores = valores[np.isfinite(valores)]
+        m = momentos(valores)
+        expoente = _expoente(m[5], m[6]) if len(valores) else 0
+        indices, contagens = np.unique(np.floor(valores / 10.0 ** expoente).astype(np.int64), return_counts=True)
+        return cls(m, expoente, indices, contagens, EsbocoQuantis.de_valores(valores, k))
+
+    @property
+    def n(self):
+        return int(self.momentos[0])
+
+    @classmethod
+    def unir_varios(cls, agregados):
+        """Fusão de vários resumos de uma vez (histogramas e esboços compactados uma única vez)"""
+        agregados = [a for a in agregados if a.n > 0] or agregados[:1]
+        if len(agregados) == 1:
+            return agregados[0]
+        expoente = max(a.expoente for a in agregados)
+        partes = [_reagrupar(a.indices, a.contagens, 10 ** (expoente - a.expoente)) for a in agregados]
+        indices, inverso = np.unique(np.concatenate([i for i, _ in partes]), return_inverse=True)
+        contagens = np.bincount(inverso, weights=np.concatenate([c for _, c in partes])).astype(np.int64)
+        return cls(functools.reduce(unir_momentos, [a.momentos for a in agregados]), expoente, indices, contagens,
+                   EsbocoQuantis.unir_varios([a.esboco for a in agregados]))
+
+    def unir(self, outro):
+        return Agregado.unir_varios([self, outro])
+
+    def estatisticas(self, percentis=(10, 50, 90)):
+        n, media, m2, m3, m4, minimo, maximo = self.momentos
+        resultado = {'n': int(n), 'média': media if n else np.nan}
+        resultado['desvio'] = np.sqrt(m2 / (n - 1)) if n > 1 else np.nan
+        # Assimetria e curtose (excesso) populacionais
+        resultado['assimetria'] = np.sqrt(n) * m3 / m2 ** 1.5 if m2 > 0 else np.nan
+        resultado['curtose'] = n * m4 / (m2 * m2) - 3 if m2 > 0 else np.nan
+        resultado['mín'] = minimo if n else np.nan
+        for p, valor in zip(percentis, self.esboco.quantis(np.asarray(percentis) / 100)):
+            resultado[f"P{p:g}"] = float(np.clip(valor, minimo, maximo)) if n else np.nan
+        resultado['máx'] = maximo if n else np.nan
+        return resultado
+
+    def histograma(self, max_classes=60):
+        """(bordas, contagens) densos, com classes agrupadas por 1, 2, 5, 10, 20... até caber em `max_classes`"""
+        if self.n == 0:
+            return np.array([0.0, 1.0]), np.zeros(1, dtype=np.int64)
+        fator = 1
+        for passo in (2, 2.5, 2) * 20:
+            if (self.indices[-1] // fator) - (self.indices[0] // fator) < max_classes:
+                break
+            fator = int(fator * passo)
+        indices, contagens = _reagrupar(self.indices, self.contagens, fator)
+        densas = np.zeros(indices[-1] - indices[0] + 1, dtype=np.int64)
+        densas[indices - indices[0]] = contagens
+        largura = fator * 10.0 ** self.expoente
+        bordas = (indices[0] + np.arange(len(densas) + 1)) * largura
+        return bordas, densas
+
+def zonas_de_topos(tabela):
+    """Zonas por poço a partir da tabela de topos (topo x poço, como a exportada na correlação).
+
+    Cada zona vai de um topo ao seguinte em profundidade; a última, até a base do poço.
+    Retorna um dict poço -> tupla de (nome, topo, base).
+    """
+    zonas = {}
+    for poco in tabela.columns:
+        topos = tabela[poco].dropna().sort_values()
+        bases = list(topos.to_numpy()[1:]) + [np.inf]
+        zonas[str(poco)] = tuple((str(nome), float(topo), float(base)) for (nome, topo), base in zip(topos.items(), bases))
+    return zonas
+
+def resumir_poco(df, depth_col, curvas, zonas=None, col_facies=None, k=K_ESBOCO):
+    """Parcial de um poço: dict (zona, fácies) -> {curva: Agregado}.
+
+    Sem `zonas` (tupla de (nome, topo, base)), o poço todo é uma zona; com elas, amostras fora de
+    qualquer zona ficam de fora. Sem `col_facies`, todas as amostras caem numa única fácies.
+    """
+    n = len(df)
+    curvas = [c for c in curvas if c in df.columns]
+    if zonas:
+        prof = df[depth_col].to_numpy(dtype=float)
+        rotulo_zona = np.full(n, -1)
+        for i, (_, topo, base) in enumerate(zonas):
+            rotulo_zona[(prof >= topo) & (prof < base)] = i
+        nomes_zona = [nome for nome, _, _ in zonas]
+    else:
+        rotulo_zona, nomes_zona = np.zeros(n, dtype=int), [TODOS]
+    if col_facies and col_facies in df.columns:
+        rotulo_facies, nomes_facies = pd.factorize(df[col_facies], sort=True)
+        nomes_facies = [f"{f:g}" if isinstance(f, (float, np.floating)) else str(f) for f in nomes_facies]
+    else:
+        rotulo_facies, nomes_facies = np.zeros(n, dtype=int), [TODOS]
+
+    validos = (rotulo_zona >= 0) & (rotulo_facies >= 0)
+    grupo = rotulo_zona * len(nomes_facies) + rotulo_facies
+    ordem = np.flatnonzero(validos)[np.argsort(grupo[validos], kind="stable")]
+    chaves, inicios = np.unique(grupo[ordem], return_index=True)
+    blocos = np.split(ordem, inicios[1:])
+    matriz = {c: df[c].to_numpy(dtype=float, na_value=np.nan) for c in curvas}
+
+    parcial = {}
+    for chave, linhas in zip(chaves, blocos):
+        zona, facies = divmod(int(chave), len(nomes_facies))
+        parcial[(nomes_zona[zona], nomes_facies[facies])] = {c: Agregado.de_valores(matriz[c][linhas], k) for c in curvas}
+    return parcial
+
+def _resumir(argumentos):
+    nome, df, depth_col, curvas, zonas, col_facies = argumentos
+    return nome, resumir_poco(df, depth_col, curvas, zonas, col_facies)
+
+def calcular_parciais(pocos, curvas, zonas=None, col_facies=None, max_workers=None, progresso=None):
+    """Parciais de vários poços, reaproveitando os que já estão no cache do servidor.
+
+    `pocos` é um dict nome -> (DataFrame, coluna de profundidade, hash do poço); `zonas`, um dict
+    nome -> tupla de zonas (ver zonas_de_topos). Os poços ainda não resumidos rodam em paralelo
+    (um processo por poço). Retorna (dict nome -> parcial, número de poços calculados agora).
+    """
+    zonas = zonas or {}
+    chaves = {nome: ('estatistica_campo', chave, tuple(curvas), zonas.get(nome), col_facies)
+              for nome, (_, _, chave) in pocos.items()}
+    parciais = {nome: CACHE.obter(chave) for nome, chave in chaves.items()}
+    faltando = [nome for nome, parcial in parciais.items() if parcial is None]
+    # Só as colunas usadas vão para os processos
+    argumentos = []
+    for nome in faltando:
+        df, depth_col, _ = pocos[nome]
+        colunas = [depth_col] + [c for c in curvas if c in df.columns] + ([col_facies] if col_facies in df.columns else [])
+        argumentos.append((nome, df[colunas], depth_col, curvas, zonas.get(nome), col_facies))
+
+    def guardar(feitos, nome, parcial):
+        parciais[nome] = CACHE.guardar(chaves[nome], parcial)
+        if progresso is not None:
+            progresso(feitos / len(argumentos), f"{feitos}/{len(argumentos)} poços")
+
+    workers = min(len(argumentos), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        for feitos, args in enumerate(argumentos, 1):
+            guardar(feitos, *_resumir(args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = [executor.submit(_resumir, args) for args in argumentos]
+            try:
+                for feitos, futuro in enumerate(as_completed(futuros), 1):
+                    guardar(feitos, *futuro.result())
+            except BaseException:
+                for futuro in futuros:
+                    futuro.cancel()
+                raise
+    return parciais, len(argumentos)
+
+def reduzir(parciais, por=("Zona",)):
+    """Funde os parciais nos grupos pedidos (subconjunto de DIMENSOES): dict grupo -> {curva: Agregado}"""
+    grupos = {}
+    for poco, parcial in parciais.items():
+        for (zona, facies), agregados in parcial.items():
+            valores = dict(zip(DIMENSOES, (poco, zona, facies)))
+            destino = grupos.setdefault(tuple(valores[d] for d in por), {})
+            for curva, agregado in agregados.items():
+                destino.setdefault(curva, []).append(agregado)
+    return {chave: {curva: Agregado.unir_varios(lista) for curva, lista in curvas.items()}
+            for chave, curvas in sorted(grupos.items())}
+
+def tabela_resumo(grupos, por=("Zona",), percentis=(10, 50, 90)):
+    """Uma linha por grupo e curva com contagem, momentos, extremos e percentis"""
+    linhas = [{**dict(zip(por, chave)), 'Curva': curva, **agregado.estatisticas(percentis)}
+              for chave, agregados in grupos.items() for curva, agregado in agregados.items()]
+    return pd.DataFrame(linhas)
+
+def tabela_normalizacao(parciais, curvas, baixo=5, alto=95):
+    """Percentis de normalização por poço (todas as zonas e fácies): linhas = poços.
+
+    Poços sem nenhuma amostra resumida (todas as zonas fora do intervalo perfilado) ficam com NaN.
+    """
+    grupos = reduzir(parciais, por=("Poço",))
+    tabela = pd.DataFrame(
+        {f"{curva} P{p:g}": [grupos[(poco,)][curva].esboco.quantis(p / 100)[0]
+                             if curva in grupos.get((poco,), {}) else np.nan
+                             for poco in parciais]
+         for curva in curvas for p in (baixo, alto)},
+        index=pd.Index(list(parciais), name="Poço"))
+    return tabela
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+from cache_compartilhado import compartilhado
+
+class IndexadorProfundidade(BaseIndexer):
+    """Janelas de largura fixa em profundidade (amostragem irregular), com limites pré-calculados"""
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        return self.inicio, self.fim
+
+def limites_janela(profundidade, janela):
+    # Janela centrada [d - janela/2, d + janela/2]; início e fim são monotônicos em profundidade crescente
+    prof = np.asarray(profundidade, dtype=float)
+    meia = janela / 2.0
+    inicio = np.searchsorted(prof, prof - meia, side="left").astype(np.int64)
+    fim = np.searchsorted(prof, prof + meia, side="right").astype(np.int64)
+    return inicio, fim
+
+def media_desvio_moveis(valores, inicio, fim, min_amostras=1):
+    """Média e desvio-padrão móveis por somas acumuladas, O(n) independente da largura da janela.
+
+    Nulos são ignorados: cada janela usa a contagem acumulada de amostras válidas.
+    """
+    v = np.asarray(valores, dtype=float)
+    if v.ndim == 1:
+        v = v[:, None]
+    validos = ~np.isnan(v)
+
+    # Centralizar pela média global reduz o cancelamento numérico em somas longas
+    referencia = np.where(validos, v, 0.0).sum(axis=0) / np.maximum(validos.sum(axis=0), 1)
+    centrado = np.where(validos, v - referencia, 0.0)
+
+    zeros = np.zeros((1, v.shape[1]))
+    soma = np.vstack([zeros, np.cumsum(centrado, axis=0)])
+    soma_quad = np.vstack([zeros, np.cumsum(centrado ** 2, axis=0)])
+    contagem = np.vstack([zeros, np.cumsum(validos, axis=0)])
+
+    n = contagem[fim] - contagem[inicio]
+    s1 = soma[fim] - soma[inicio]
+    s2 = soma_quad[fim] - soma_quad[inicio]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = s1 / n + referencia
+        variancia = (s2 - s1 ** 2 / n) / (n - 1)
+    desvio = np.sqrt(np.clip(variancia, 0, None))
+
+    insuficiente = n < max(min_amostras, 1)
+    media[insuficiente] = np.nan
+    desvio[insuficiente | (n < 2)] = np.nan
+    return media, desvio
+
+def estatisticas_moveis(df, depth_col, curvas, janela, percentis=(0.1, 0.5, 0.9), min_amostras=1):
+    """Trilhas de estatística móvel por profundidade para as curvas selecionadas.
+
+    Retorna um DataFrame com a profundidade e, para cada curva, as colunas
+    `<curva>_media`, `_desvio`, `_min`, `_max` e `_P<nn>`.
+    """
+    curvas = list(curvas)
+    dados = df[[depth_col] + curvas]
+    prof = dados[depth_col].to_numpy(dtype=float)
+    if np.any(np.diff(prof) < 0):
+        dados = dados.sort_values(depth_col, kind="stable")
+        prof = dados[depth_col].to_numpy(dtype=float)
+
+    inicio, fim = limites_janela(prof, janela)
+    media, desvio = media_desvio_moveis(dados[curvas].to_numpy(dtype=float), inicio, fim, min_amostras)
+
+    # Mínimo/máximo: o rolling do pandas usa a fila monotônica (deque) em Cython, O(n) por curva;
+    # percentis usam skiplist, O(n log w)
+    indexador = IndexadorProfundidade()
+    indexador.inicio, indexador.fim = inicio, fim
+    movel = dados[curvas].reset_index(drop=True).rolling(indexador, min_periods=max(min_amostras, 1))
+
+    resultado = {depth_col: prof}
+    minimos = movel.min()
+    maximos = movel.max()
+    quantis = {q: movel.quantile(q) for q in percentis}
+    for j, curva in enumerate(curvas):
+        resultado[f"{curva}_media"] = media[:, j]
+        resultado[f"{curva}_desvio"] = desvio[:, j]
+        resultado[f"{curva}_min"] = minimos[curva].to_numpy()
+        resultado[f"{curva}_max"] = maximos[curva].to_numpy()
+        for q, tabela in quantis.items():
+            resultado[f"{curva}_P{int(round(q * 100)):02d}"] = tabela[curva].to_numpy()
+    return pd.DataFrame(resultado)
+
+@compartilhado("estatisticas_moveis", persistir=True)
+def estatisticas_moveis_cache(_df, chave, depth_col, curvas, janela, percentis=(0.1, 0.5, 0.9)):
+    # `chave` identifica poço, intervalo de profundidade, tratamento de nulos e curvas selecionadas
+    return estatisticas_moveis(_df, depth_col, curvas, janela, percentis)
@@ -0,0 +1,74 @@
+import gzip
+import io
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from acesso_dados import compactar_curvas, fatiar_profundidade
+
+# Formato -> (extensão, tipo MIME)
+FORMATOS = {
+    "CSV": ("csv", "text/csv"),
+    "CSV comprimido (gzip)": ("csv.gz", "application/gzip"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Feather": ("feather", "application/vnd.apache.arrow.file"),
+}
+
+def selecionar(df, depth_col=None, faixa=None, curvas=None):
+    """Intervalo de profundidade e curvas a exportar (sem copiar os dados)"""
+    df = fatiar_profundidade(df, depth_col, faixa)
+    if curvas is not None:
+        colunas = ([depth_col] if depth_col and depth_col not in curvas else []) + list(curvas)
+        df = df[colunas]
+    return df
+
+def _tabelas(df, tamanho_bloco, casas_decimais, float32, depth_col):
+    # Blocos de linhas convertidos para Arrow um de cada vez, todos com o esquema do primeiro
+    esquema = None
+    for inicio in range(0, max(len(df), 1), tamanho_bloco):
+        bloco = df.iloc[inicio:inicio + tamanho_bloco]
+        if casas_decimais is not None:
+            bloco = bloco.round(casas_decimais)
+        if float32:
+            bloco = compactar_curvas(bloco, depth_col)
+        tabela = pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False)
+        esquema = tabela.schema
+        yield tabela
+
+def exportar(df, formato, destino=None, casas_decimais=None, float32=False, depth_col=None, tamanho_bloco=100_000):
+    """Grava `df` no formato escolhido, bloco a bloco, em `destino` (arquivo binário aberto).
+
+    Sem `destino`, devolve os bytes. O DataFrame nunca é convertido inteiro para texto:
+    a memória extra fica limitada a um bloco mais o arquivo de saída.
+    """
+    saida = destino if destino is not None else io.BytesIO()
+    tabelas = _tabelas(df, tamanho_bloco, casas_decimais, float32, depth_col)
+
+    if formato.startswith("CSV"):
+        comprimido = formato != "CSV"
+        alvo = gzip.GzipFile(fileobj=saida, mode="wb", compresslevel=3, mtime=0) if comprimido else saida
+        for i, tabela in enumerate(tabelas):
+            pa_csv.write_csv(tabela, alvo, pa_csv.WriteOptions(include_header=(i == 0)))
+        if comprimido:
+            alvo.close()
+    elif formato == "Parquet":
+        escritor = None
+        for tabela in tabelas:
+            if escritor is None:
+                escritor = pq.ParquetWriter(saida, tabela.schema, compression="zstd")
+            escritor.write_table(tabela)
+        escritor.close()
+    elif formato == "Feather":
+        # Feather v2 é o formato de arquivo IPC do Arrow
+        escritor = None
+        for tabela in tabelas:
+            if escritor is None:
+                escritor = pa.ipc.new_file(saida, tabela.schema,
+                                           options=pa.ipc.IpcWriteOptions(compression="zstd"))
+            escritor.write_table(tabela)
+        escritor.close()
+    else:
+        raise ValueError(f"Formato desconhecido: {formato}")
+
+    if destino is None:
+        return saida.getvalue()
+    return destino
@@ -1,27 +1,77 @@
+import hashlib
 import streamlit as st
 import lasio
 import tempfile
 import os
-
-def load_las_data(uploaded_file):
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.las') as tmp:
-            tmp.write(uploaded_file.getvalue())
-            tmp_path = tmp.name
-
+from preprocessamento import hash_poco, obter_hash_poco, referencia_hash
+from qualidade import escanear_qualidade_cache
+from cabecalho_las import extrair_cabecalho
+from acesso_dados import compactar_curvas
+from cache_compartilhado import compartilhado, exibir_metricas_cache
+from instrumentacao import instrumentado, medir
+
+@compartilhado("poco_las")
+def ler_poco(_conteudo, chave_arquivo, float32=False):
+    """Leitura do LAS, hash do poço e varredura de qualidade, feitas uma única vez por arquivo no servidor"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.las') as tmp:
+        tmp.write(_conteudo)
+        tmp_path = tmp.name
+
+    with medir("lasio.read", "importacao", bytes=len(_conteudo)):
         las = lasio.read(tmp_path)
-        os.unlink(tmp_path)
-
-        df = las.df()
-        df.insert(0, "DEPTH", las.index)  # Adiciona a profundidade
-
-        # ✅ Remover linhas com dados ausentes sem exibir mensagem
-       
-
-        return las, df
+    os.unlink(tmp_path)
+
+    df = las.df()
+    df.insert(0, "DEPTH", las.index)  # Adiciona a profundidade
+    well_data = df.reset_index(drop=True)
+    if float32:
+        well_data = compactar_curvas(well_data, "DEPTH")
+
+    # Só o cabeçalho segue adiante: os dados das curvas ficam apenas em well_data
+    cabecalho = extrair_cabecalho(las)
+    del las, df
+
+    with medir("hash_poco", "importacao"):
+        chave_poco = hash_poco(well_data)
+    with medir("qualidade", "importacao"):
+        qc = dict(escanear_qualidade_cache(well_data, chave_poco, "DEPTH"), chave=chave_poco)
+    return {'las': cabecalho, 'well_data': well_data, 'chave_poco': chave_poco, 'qc': qc}
+
+@instrumentado("load_las_data", "importacao")
+def load_las_data(uploaded_file, float32=False):
+    try:
+        conteudo = uploaded_file.getvalue()
+        return ler_poco(conteudo, hashlib.blake2b(conteudo, digest_size=16).hexdigest(), float32)
     except Exception as e:
         st.error(f"Erro ao carregar arquivo LAS: {str(e)}")
-        return None, None
+        return None
+
+def nome_poco(las, padrao):
+    try:
+        nome = str(las.well['WELL'].value).strip()
+    except (AttributeError, KeyError):
+        nome = ""
+    return nome or padrao
+
+def reunir_pocos(arquivos, incluir_importado):
+    """Vários poços de uma vez (páginas multipoço): nome -> (DataFrame, hash); nomes repetidos ganham sufixo"""
+    pocos = {}
+
+    def adicionar(nome, df, chave):
+        base, k = nome, 2
+        while nome in pocos:
+            nome, k = f"{base} ({k})", k + 1
+        pocos[nome] = (df, chave)
+
+    if incluir_importado:
+        df = st.session_state['well_data']
+        adicionar(nome_poco(st.session_state.get('las_object'), "Poço importado"), df, obter_hash_poco(df))
+    for arquivo in arquivos:
+        # Leitura compartilhada no servidor: reenviar o mesmo arquivo não relê o LAS
+        poco = load_las_data(arquivo)
+        if poco is not None:
+            adicionar(nome_poco(poco['las'], arquivo.name), poco['well_data'], poco['chave_poco'])
+    return pocos
 
 def display_well_info(las):
     st.subheader("~WELL INFORMATION SECTION")
@@ -50,24 +100,50 @@ def display_curve_info(las):
         description = curve.descr if curve.descr else "No description"
         st.markdown(f'<p class="las-format">{mnem}{unit}: {description}</p>', unsafe_allow_html=True)
 
+def display_quality_info(qc):
+    st.subheader("🔎 Controle de Qualidade")
+    resumo = qc["resumo"]
+    if resumo.empty:
+        st.info("Nenhuma curva numérica para verificar.")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Curvas com amostras sinalizadas", int((resumo["% sinalizado"] > 0).sum()))
+    with col2:
+        st.metric("Trechos sinalizados", len(qc["intervalos"]))
+
+    st.dataframe(resumo, use_container_width=True)
+    with st.expander("Trechos sinalizados por curva", expanded=False):
+        st.dataframe(qc["intervalos"], use_container_width=True, height=300)
+
 def app():
     with st.sidebar:
         st.markdown("---")
         st.subheader("📁 Importação de Arquivo LAS")
 
         uploaded_file = st.file_uploader("Selecione um arquivo LAS", type=['las'])
+        float32 = st.checkbox(
+            "Curvas em float32",
+            value=False,
+            help="Metade da memória por poço; precisão de ~7 dígitos significativos (a profundidade fica em float64)"
+        )
 
         if uploaded_file is not None:
-            las, df = load_las_data(uploaded_file)
+            poco = load_las_data(uploaded_file, float32)
 
-            if las is not None and df is not None:
-                st.session_state['well_data'] = df.reset_index(drop=True)
-                st.session_state['las_object'] = las
+            if poco is not None:
+                # Objetos compartilhados entre sessões que abrem o mesmo arquivo (somente leitura)
+                well_data = poco['well_data']
+                st.session_state['well_data'] = well_data
+                st.session_state['well_hash'] = referencia_hash(well_data, poco['chave_poco'])
+                st.session_state['las_object'] = poco['las']
+                st.session_state['qc'] = poco['qc']
 
                 st.success("✓ Arquivo carregado!")
 
                 try:
-                    st.caption(f"**Depth:** {df['DEPTH'].min():.2f} - {df['DEPTH'].max():.2f}")
+                    st.caption(f"**Depth:** {well_data['DEPTH'].min():.2f} - {well_data['DEPTH'].max():.2f}")
                 except Exception as e:
                     st.warning(f"Erro ao determinar profundidade: {str(e)}")
 
@@ -82,5 +158,10 @@ def app():
         display_well_info(las)
         display_curve_info(las)
 
+        if st.session_state.get('qc') is not None:
+            display_quality_info(st.session_state['qc'])
+
+    exibir_metricas_cache()
+
 if __name__ == "__main__":
     app()
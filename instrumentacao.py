@@ -0,0 +1,227 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Temporizadores e contadores de memória nos caminhos quentes (leitura do LAS, figuras, zonas,
+# varredura de K, pairplot, serialização). Desligado, cada ponto medido custa uma consulta a um
+# atributo da thread. Ligado (painel na sidebar ou PYGEOPLOT_INSTRUMENTAR=1), os eventos vão para
+# o registro da sessão e podem ser exportados em JSON ou no formato Chrome trace (chrome://tracing,
+# ui.perfetto.dev).
+PADRAO_ATIVO = os.environ.get("PYGEOPLOT_INSTRUMENTAR", "0") not in ("", "0", "false", "False")
+MAX_EVENTOS = 20_000
+
+try:
+    import psutil
+    _PROCESSO = psutil.Process()
+except ImportError:
+    _PROCESSO = None
+
+_local = threading.local()
+
+def _rss():
+    return _PROCESSO.memory_info().rss if _PROCESSO is not None else 0
+
+class Registro:
+    """Eventos de uma sessão (ou de uma execução fora do Streamlit), limitados a MAX_EVENTOS.
+
+    Cada evento guarda nome, categoria, início e duração (s, relativos à criação do registro),
+    thread, profundidade de aninhamento, RSS ao final e sua variação (bytes), o rerun em curso e
+    se veio de uma tarefa em segundo plano (que escreve no registro da sessão que a submeteu).
+    """
+
+    def __init__(self, max_eventos=MAX_EVENTOS):
+        self.origem = time.perf_counter()
+        self.eventos = deque(maxlen=max_eventos)
+        self.rerun = 0
+        self.pagina = None
+        self.inicio_script = 0.0
+        self.visto_ate = 0.0
+        self._trava = threading.Lock()
+
+    def adicionar(self, evento):
+        with self._trava:
+            self.eventos.append(evento)
+
+    def novo_rerun(self, pagina):
+        with self._trava:
+            self.rerun += 1
+        self.pagina = pagina
+        self.inicio_script = time.perf_counter()
+        return self.rerun
+
+    def copiar_eventos(self):
+        with self._trava:
+            return list(self.eventos)
+
+    def resumo(self, eventos=None):
+        """Totais por nome: chamadas, tempo total/máximo (ms) e maior variação de RSS (MB)"""
+        import pandas as pd
+
+        eventos = self.copiar_eventos() if eventos is None else eventos
+        if not eventos:
+            return pd.DataFrame(columns=['nome', 'chamadas', 'total_ms', 'max_ms', 'delta_rss_mb'])
+        df = pd.DataFrame(eventos)
+        resumo = df.groupby('nome', sort=False).agg(
+            chamadas=('duracao', 'size'), total_ms=('duracao', 'sum'), max_ms=('duracao', 'max'),
+            delta_rss_mb=('delta_rss', 'max'))
+        resumo[['total_ms', 'max_ms']] *= 1000
+        resumo['delta_rss_mb'] /= 2**20
+        return resumo.sort_values('total_ms', ascending=False).reset_index()
+
+    def exportar_json(self):
+        return json.dumps({'eventos': self.copiar_eventos(), 'resumo': self.resumo().to_dict('records')},
+                          indent=1, default=float).encode()
+
+    def exportar_chrome_trace(self):
+        """Eventos completos ('ph': 'X') em microssegundos, com o nome de cada thread"""
+        pid = os.getpid()
+        eventos = self.copiar_eventos()
+        trace = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': nome}}
+                 for tid, nome in {(e['tid'], e['thread']) for e in eventos}]
+        trace += [{
+            'name': e['nome'], 'cat': e['categoria'], 'ph': 'X', 'pid': pid, 'tid': e['tid'],
+            'ts': e['inicio'] * 1e6, 'dur': e['duracao'] * 1e6,
+            'args': {'rerun': e['rerun'], 'rss_mb': e['rss'] / 2**20, 'delta_rss_mb': e['delta_rss'] / 2**20,
+                     **e['args']},
+        } for e in eventos]
+        return json.dumps({'traceEvents': trace, 'displayTimeUnit': 'ms'}, default=str).encode()
+
+def registro_atual():
+    return getattr(_local, 'registro', None)
+
+@contextlib.contextmanager
+def ativar(registro):
+    """Direciona para `registro` os eventos desta thread (None desliga)"""
+    anterior = getattr(_local, 'registro', None)
+    _local.registro = registro
+    try:
+        yield registro
+    finally:
+        _local.registro = anterior
+
+def propagar(funcao):
+    """Envolve `funcao` para que, em outra thread, ela escreva no registro da thread atual"""
+    registro = registro_atual()
+    if registro is None:
+        return funcao
+
+    @functools.wraps(funcao)
+    def envolvida(*args, **kwargs):
+        with ativar(registro):
+            return funcao(*args, **kwargs)
+    return envolvida
+
+@contextlib.contextmanager
+def medir(nome, categoria="app", **args):
+    """Mede o bloco (tempo e RSS) se houver registro ativo na thread; `args` vão para o evento"""
+    registro = getattr(_local, 'registro', None)
+    if registro is None:
+        yield
+        return
+
+    profundidade = getattr(_local, 'profundidade', 0)
+    _local.profundidade = profundidade + 1
+    rss_inicial = _rss()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fim = time.perf_counter()
+        _local.profundidade = profundidade
+        rss = _rss()
+        thread = threading.current_thread()
+        registro.adicionar({
+            'nome': nome, 'categoria': categoria, 'inicio': inicio - registro.origem, 'duracao': fim - inicio,
+            'thread': thread.name, 'tid': thread.ident, 'profundidade': profundidade,
+            'rss': rss, 'delta_rss': rss - rss_inicial, 'rerun': registro.rerun,
+            'segundo_plano': not getattr(_local, 'script', False), 'args': args,
+        })
+
+def instrumentado(nome=None, categoria="app"):
+    """Decorador: mede cada chamada da função com `medir`"""
+    def decorar(funcao):
+        rotulo = nome or f"{funcao.__module__}.{funcao.__qualname__}"
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if getattr(_local, 'registro', None) is None:
+                return funcao(*args, **kwargs)
+            with medir(rotulo, categoria):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorar
+
+def medir_iteracoes(iteravel, nome, categoria="app"):
+    """Mede cada iteração de um laço (o corpo executado entre um item e o próximo)"""
+    if registro_atual() is None:
+        yield from iteravel
+        return
+    for i, item in enumerate(iteravel):
+        with medir(nome, categoria, iteracao=i + 1):
+            yield item
+
+@contextlib.contextmanager
+def gravar():
+    """Registro novo ativo nesta thread, para medir fora do Streamlit (benchmarks, scripts)"""
+    with ativar(Registro()) as registro:
+        yield registro
+
+# --- Integração com o Streamlit ---
+
+def iniciar_rerun(pagina):
+    """Chamado no início do script: ativa o registro da sessão se o painel estiver ligado"""
+    import streamlit as st
+
+    _local.script = True
+    if not st.session_state.get("instrumentar", PADRAO_ATIVO):
+        _local.registro = None
+        return None
+    registro = st.session_state.get("_registro_desempenho")
+    if registro is None:
+        registro = st.session_state["_registro_desempenho"] = Registro()
+    registro.novo_rerun(pagina)
+    _local.registro = registro
+    return registro
+
+def exibir_painel():
+    """Painel da sidebar (no fim do script): liga/desliga e detalha o rerun atual"""
+    import streamlit as st
+
+    registro = registro_atual()
+    _local.registro = None
+    with st.sidebar:
+        with st.expander("⏱️ Desempenho", expanded=registro is not None):
+            st.toggle("Instrumentar", value=PADRAO_ATIVO, key="instrumentar",
+                      help="Mede tempo e memória dos trechos mais pesados a cada rerun")
+            if registro is None:
+                return
+
+            agora = time.perf_counter()
+            eventos = registro.copiar_eventos()
+            do_rerun = [e for e in eventos if e['rerun'] == registro.rerun and not e['segundo_plano']]
+            # Tarefas em segundo plano terminadas desde o painel anterior (cada uma aparece uma vez)
+            segundo_plano = [e for e in eventos if e['segundo_plano'] and e['inicio'] + e['duracao'] > registro.visto_ate]
+            registro.visto_ate = agora - registro.origem
+            total = agora - registro.inicio_script
+
+            st.caption(f"Rerun {registro.rerun} ({registro.pagina}): {total * 1000:.0f} ms no script, "
+                       f"RSS {_rss() / 2**20:.0f} MB")
+            if do_rerun:
+                st.dataframe(registro.resumo(do_rerun), hide_index=True, use_container_width=True)
+            if segundo_plano:
+                st.caption("Tarefas em segundo plano")
+                st.dataframe(registro.resumo(segundo_plano), hide_index=True, use_container_width=True)
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("JSON", data=registro.exportar_json, file_name="desempenho.json",
+                                   mime="application/json", use_container_width=True)
+            with col2:
+                st.download_button("Chrome trace", data=registro.exportar_chrome_trace, file_name="trace.json",
+                                   mime="application/json", use_container_width=True)
+            if st.button("Limpar registro", use_container_width=True):
+                del st.session_state["_registro_desempenho"]
@@ -1,12 +1,20 @@
+import hashlib
 import streamlit as st
-import matplotlib.pyplot as plt
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import silhouette_score
-from sklearn.utils import resample
+import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import seaborn as sns
+from preprocessamento import obter_hash_poco
+from acesso_dados import obter_poco, fatiar_profundidade
+from qualidade import obter_qualidade, mascarar_amostras
+from pontuacao import CRITERIOS, escolher_k
+from modelo_facies import criar_modelo, modelo_para_bytes, carregar_modelo, curvas_ausentes, classificar, nomear
+from tarefas import submeter, acompanhar, pairplot_png
+from escrita_las import escrever_las
+from instrumentacao import medir
+from reamostragem import controle_reamostragem
+from agrupamento import (reduzir_pca, pca_em_lotes, varrer_k, sobreposicao_faixas, iterar_blocos,
+                         escalonar_em_lotes, varrer_k_em_lotes, rotular_em_lotes)
 
 def get_depth_column(data):
     for col in ['DEPTH', 'DEPT', 'MD']:
@@ -14,13 +22,63 @@ def get_depth_column(data):
             return col
     return None
 
+def agrupar_em_lotes(tarefa, fonte, n_linhas, chave, ks, tamanho_lote, pca=None):
+    # Tarefa em segundo plano do modo mini-batch: padronização, PCA incremental e varredura de K
+    tarefa.atualizar(0.0, "padronizando")
+    scaler, amostra, _ = escalonar_em_lotes(fonte, passo_amostra=max(1, n_linhas // 20_000))
+    variancia = None
+    if pca:
+        tarefa.atualizar(0.05, "PCA incremental")
+        reducao, variancia = pca_em_lotes(fonte, scaler, amostra.shape[1], *pca)
+        from sklearn.pipeline import make_pipeline
+        scaler = make_pipeline(scaler, reducao)
+    tarefa.atualizar(0.1, "ajustando K")
+    resultados = varrer_k_em_lotes(fonte, scaler, amostra, chave, ks, tamanho_lote,
+                                   lambda f, msg: tarefa.atualizar(0.1 + 0.9 * f, f"K ajustados: {msg}"))
+    return scaler, resultados, variancia
+
+def aplicar_modelo_salvo(data, depth_col):
+    # Classificação somente por predição, com um modelo treinado em outra sessão ou poço
+    with st.expander("📂 Aplicar Modelo Salvo", expanded=False):
+        arquivo_modelo = st.file_uploader("Modelo de fácies (.npz)", type=['npz'], key="modelo_facies")
+        if arquivo_modelo is None:
+            return
+
+        try:
+            modelo = carregar_modelo(arquivo_modelo.getvalue())
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            return
+        faltando = curvas_ausentes(modelo, data)
+        if faltando:
+            st.error(f"❌ Curvas do modelo ausentes neste poço: {', '.join(faltando)}")
+            return
+
+        clusters = classificar(modelo, data)
+        resultado = pd.DataFrame({
+            depth_col: data[depth_col],
+            'Cluster': clusters,
+            'Litologia': nomear(modelo, clusters)
+        })[clusters >= 0]
+
+        st.success(f"✅ {len(resultado)} amostras classificadas com {len(modelo['rotulos'])} litofácies "
+                   f"({', '.join(modelo['curvas'])})")
+        st.dataframe(resultado['Litologia'].value_counts(normalize=True).mul(100).round(1).rename('%'),
+                     use_container_width=True)
+        st.download_button(
+            label="📥 Download Classificação pelo Modelo (CSV)",
+            data=lambda: resultado.to_csv(index=False),
+            file_name="classificacao_modelo.csv",
+            mime="text/csv"
+        )
+
 def app():
     # Verificação dos dados
     if 'well_data' not in st.session_state:
         st.warning("⚠️ Nenhum dado carregado. Vá até a aba de Importação.")
         return
 
-    data = st.session_state['well_data']
+    data = obter_poco()
     depth_col = get_depth_column(data)
 
     if not depth_col:
@@ -32,11 +90,17 @@ def app():
         st.warning("Nenhuma curva disponível para classificação.")
         return
 
+    chave_poco = obter_hash_poco(data)
+
     # Controles na sidebar
     with st.sidebar:
         st.markdown("---")
         st.subheader("⚙️ Configurações")
 
+        # Grade de profundidade (opcional): classificação e exportação sobre o poço reamostrado
+        data, chave_poco = controle_reamostragem(data, depth_col, chave_poco, "litofaceis")
+        colunas_disponiveis = [col for col in colunas_disponiveis if col in data.columns]
+
         # Seleção de curvas
         st.markdown("**Curvas para Classificação:**")
         selected_curves = st.multiselect(
@@ -55,8 +119,27 @@ def app():
 
         if metodo == "Manual (K clusters)":
             n_clusters = st.slider("Número de Clusters", 2, 8, 3)
+            criterio = None
         else:
             n_clusters = None
+            criterio = st.selectbox("Critério de escolha do K", list(CRITERIOS))
+
+        modo_lotes = st.checkbox(
+            "Mini-batch (grandes volumes)",
+            value=False,
+            help="Padroniza e agrupa em blocos com MiniBatchKMeans, limitando a memória usada"
+        )
+        if modo_lotes:
+            tamanho_lote = st.number_input("Tamanho do bloco (amostras)", min_value=1_000, value=50_000, step=10_000)
+
+        usar_pca = st.checkbox(
+            "Redução por PCA",
+            value=False,
+            help="Projeta as curvas padronizadas nos componentes principais antes do agrupamento"
+        )
+        if usar_pca:
+            variancia_alvo = st.slider("Variância explicada alvo", 0.50, 0.99, 0.95, 0.01)
+            branquear = st.checkbox("Branqueamento (whitening)", value=False)
 
         # Intervalo de profundidade
         st.markdown("**Intervalo de Profundidade:**")
@@ -71,6 +154,12 @@ def app():
             label_visibility="collapsed"
         )
 
+        mascarar_qc = st.checkbox(
+            "Mascarar amostras sinalizadas (QC)",
+            value=False,
+            help="Sentinelas NULL, picos, trechos planos e valores travados detectados na importação"
+        )
+
         st.markdown("---")
         st.info("💡 **Dica:** Use múltiplas curvas para classificação mais robusta")
 
@@ -88,64 +177,159 @@ def app():
         - ⚠️ É uma classificação estatística, não substitui interpretação geológica
         """)
 
+    aplicar_modelo_salvo(data, depth_col)
+
     if not selected_curves:
         st.info("📌 Selecione pelo menos uma curva na sidebar para começar a classificação")
         return
 
     # Filtrar por profundidade
-    data_filtered = data[(data[depth_col] >= depth_range[0]) & (data[depth_col] <= depth_range[1])].copy()
+    data_filtered = fatiar_profundidade(data, depth_col, depth_range)
+    if mascarar_qc:
+        qc = obter_qualidade(data, chave_poco, depth_col)
+        data_filtered = mascarar_amostras(data_filtered, qc, selected_curves)
 
     # Limpar dados
-    data_clean = data_filtered.dropna(subset=selected_curves).copy()
+    data_clean = data_filtered.dropna(subset=selected_curves)
     if len(data_clean) < 10:
         st.warning("⚠️ Poucos dados disponíveis. Ajuste o intervalo de profundidade.")
         return
 
-    # Preparar dados para clustering
-    X = data_clean[selected_curves].values
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    # Chave dos dados para o cache de modelos; sem o intervalo, identifica a "mesma análise"
+    chave_base = (chave_poco, tuple(selected_curves), mascarar_qc,
+                  (variancia_alvo, branquear) if usar_pca else None)
+    chave = chave_base + (tuple(depth_range),)
+
+    ks = range(2, 8) if metodo == "Automático (Silhouette)" else [n_clusters]
+    chave_tarefa = ('litofaceis', chave, tuple(ks), tamanho_lote if modo_lotes else None)
+
+    if modo_lotes:
+        # Mini-batch: padronização e agrupamento bloco a bloco, sem materializar a matriz completa
+        fonte = lambda: iterar_blocos(data_clean, selected_curves, tamanho_lote)
+        tarefa = submeter(chave_tarefa, agrupar_em_lotes, fonte, len(data_clean), chave, ks, tamanho_lote,
+                          (variancia_alvo, branquear) if usar_pca else None, rotulo="Agrupamento mini-batch")
+        saida = acompanhar(tarefa)
+        if saida is None:
+            return
+        scaler, resultados, variancia = saida
+    else:
+        # Preparar dados para clustering
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.pipeline import make_pipeline
+        X = data_clean[selected_curves].values
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+
+        if usar_pca:
+            reducao = reduzir_pca(X_scaled, chave, variancia_alvo, branquear)
+            X_scaled, variancia = reducao['Z'], reducao['variancia']
+            scaler = make_pipeline(scaler, reducao['pca'])
+
+        # Warm start: reaproveitar centroides (em unidades originais) se o intervalo mudou pouco
+        centroides = {}
+        anterior = st.session_state.get('kmeans_anterior')
+        if anterior and anterior['chave'] == chave_base and anterior['faixa'] != tuple(depth_range) \
+                and sobreposicao_faixas(anterior['faixa'], depth_range) >= 0.9:
+            centroides = {k: scaler.transform(c) for k, c in anterior['centroides'].items()}
+        if centroides:
+            # Tarefas concluídas são reaproveitadas entre sessões: a varredura com warm start não
+            # pode devolver (nem receber) o resultado da varredura a frio
+            assinatura = hashlib.blake2b(digest_size=16)
+            for k in sorted(centroides):
+                assinatura.update(str(k).encode())
+                assinatura.update(np.ascontiguousarray(centroides[k], dtype=float).tobytes())
+            chave_tarefa += ('warm', assinatura.hexdigest())
+
+        tarefa = submeter(chave_tarefa, lambda t: varrer_k(X_scaled, chave, ks, centroides,
+                                                           lambda f, msg: t.atualizar(f, f"K ajustados: {msg}")),
+                          rotulo="Ajustando K-Means")
+        resultados = acompanhar(tarefa)
+        if resultados is None:
+            return
+
+    if usar_pca:
+        n_componentes = scaler.steps[-1][1].n_components_
+        with st.expander(f"🧭 PCA: {n_componentes} de {len(selected_curves)} componentes "
+                         f"({np.cumsum(variancia)[n_componentes-1]:.1%} da variância)", expanded=False):
+            fig_pca = go.Figure()
+            componentes = [f"PC{i+1}" for i in range(len(variancia))]
+            fig_pca.add_trace(go.Bar(x=componentes, y=variancia, name='Individual', marker_color='#3498db'))
+            fig_pca.add_trace(go.Scatter(x=componentes, y=np.cumsum(variancia), name='Acumulada',
+                                         mode='lines+markers', line=dict(color='#02ab21', width=2)))
+            fig_pca.add_hline(y=variancia_alvo, line_dash="dash", line_color="red",
+                              annotation_text=f"Alvo: {variancia_alvo:.0%}")
+            fig_pca.update_layout(title='Variância Explicada', yaxis_title='Fração da variância',
+                                  height=350, plot_bgcolor='white')
+            st.plotly_chart(fig_pca, use_container_width=True)
 
     # Determinar número de clusters
     if metodo == "Automático (Silhouette)":
-        melhor_k, melhor_score, melhor_kmeans = 2, -1, None
-        scores = []
-
-        for k in range(2, 8):
-            kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-            labels = kmeans.fit_predict(X_scaled)
-            amostra_size = min(1000, len(X_scaled))
-            amostra_X, amostra_labels = resample(X_scaled, labels, n_samples=amostra_size, random_state=42)
-            score = silhouette_score(amostra_X, amostra_labels)
-            scores.append({'k': k, 'score': score})
+        melhor, estabilidade = escolher_k(resultados, criterio)
+        melhor_k, melhor_kmeans = melhor['k'], melhor['modelo']
+        melhor_score = melhor['indices'][CRITERIOS[criterio][0]]
 
-            if score > melhor_score:
-                melhor_k, melhor_score, melhor_kmeans = k, score, kmeans
+        st.success(f"✅ Clusters ideais: **{melhor_k}** | {criterio}: **{melhor_score:.3f}**")
 
-        st.success(f"✅ Clusters ideais: **{melhor_k}** | Silhouette Score: **{melhor_score:.3f}**")
-
-        # Gráfico de Silhouette Score
+        # Gráfico de Silhouette Score (todas as amostras) com IC da silhouette amostral
         col1, col2 = st.columns([1, 2])
         with col1:
+            import matplotlib.pyplot as plt
             fig_sil, ax_sil = plt.subplots(figsize=(6, 4))
-            k_values = [s['k'] for s in scores]
-            score_values = [s['score'] for s in scores]
-            ax_sil.plot(k_values, score_values, 'o-', color='#02ab21', linewidth=2, markersize=8)
+            k_values = [r['k'] for r in resultados]
+            simplificada = [r['indices']['silhouette_simplificada'] for r in resultados]
+            amostral = np.array([r['indices']['silhouette_amostral'] for r in resultados])
+            ic = np.array([r['indices']['ic_silhouette'] for r in resultados])
+            ax_sil.plot(k_values, simplificada, 'o-', color='#02ab21', linewidth=2, markersize=8, label='Simplificada')
+            # Poços pequenos: réplicas idênticas e a média pode sair do IC por arredondamento
+            ax_sil.errorbar(k_values, amostral, yerr=np.clip([amostral - ic[:, 0], ic[:, 1] - amostral], 0, None),
+                            fmt='s--', color='#3498db', capsize=4, label='Amostral (IC 95%)')
             ax_sil.axvline(melhor_k, color='red', linestyle='--', label=f'Melhor K={melhor_k}')
             ax_sil.set_xlabel('Número de Clusters', fontweight='bold')
             ax_sil.set_ylabel('Silhouette Score', fontweight='bold')
             ax_sil.set_title('Otimização de Clusters', fontweight='bold')
             ax_sil.grid(True, alpha=0.3)
             ax_sil.legend()
-            st.pyplot(fig_sil)
+            with medir("serializacao.matplotlib", "figura"):
+                st.pyplot(fig_sil)
+        with col2:
+            tabela_k = pd.DataFrame({
+                'K': k_values,
+                'Silhouette simplificada': simplificada,
+                'Silhouette amostral': amostral,
+                'IC 95%': [f"{lo:.3f} – {hi:.3f}" for lo, hi in ic],
+                'Davies-Bouldin': [r['indices']['davies_bouldin'] for r in resultados],
+                'Calinski-Harabasz': [r['indices']['calinski_harabasz'] for r in resultados],
+                'Estabilidade': [f"{estabilidade[k]:.0%}" for k in k_values],
+            }).set_index('K')
+            st.dataframe(tabela_k.round(3), use_container_width=True)
+            st.caption("Estabilidade: fração das subamostras estratificadas em que cada K tem a maior silhouette")
     else:
-        melhor_k = n_clusters
-        melhor_kmeans = KMeans(n_clusters=melhor_k, random_state=42, n_init=10)
-        melhor_kmeans.fit(X_scaled)
+        melhor = resultados[0]
+        melhor_k, melhor_kmeans = n_clusters, melhor['modelo']
         st.info(f"🔧 Usando **{melhor_k} clusters** (modo manual)")
 
+    if modo_lotes:
+        qualidade_lote = melhor['qualidade']
+        with st.expander("⚖️ Mini-batch vs. K-Means completo (mesma amostra)", expanded=False):
+            col_q1, col_q2 = st.columns(2)
+            with col_q1:
+                st.metric("Razão de inércia", f"{qualidade_lote['razao_inercia']:.3f}",
+                          help="Inércia do mini-batch / inércia do K-Means completo (1.0 = igual)")
+            with col_q2:
+                st.metric("Concordância (ARI)", f"{qualidade_lote['ari']:.3f}",
+                          help="Índice de Rand ajustado entre as duas classificações")
+
+    st.session_state['kmeans_anterior'] = {
+        'chave': chave_base,
+        'faixa': tuple(depth_range),
+        'centroides': {r['k']: scaler.inverse_transform(r['modelo'].cluster_centers_) for r in resultados}
+    }
+
     # Aplicar classificação
-    data_clean['Cluster'] = melhor_kmeans.predict(X_scaled)
+    if modo_lotes:
+        data_clean['Cluster'] = rotular_em_lotes(fonte, scaler, melhor_kmeans, len(data_clean))
+    else:
+        data_clean['Cluster'] = melhor_kmeans.predict(X_scaled)
     data_clean['Litologia'] = data_clean['Cluster'].apply(lambda x: f"Litofácies {x+1}")
 
     # Cores
@@ -228,7 +412,8 @@ def app():
             legend=dict(x=1.05, y=1)
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        with medir("serializacao.plotly", "figura"):
+            st.plotly_chart(fig, use_container_width=True)
 
     with col_right:
         # Estatísticas por litofácies
@@ -249,27 +434,60 @@ def app():
         st.markdown("---")
         st.subheader("🎯 Análise Multivariada")
 
-        # Pairplot
-        pairplot_data = data_clean[selected_curves + ['Litologia']].copy()
+        # Pairplot (renderizado em segundo plano; a página segue enquanto a imagem é gerada)
+        pairplot_data = data_clean[selected_curves + ['Litologia']]
 
-        sns.set_style("whitegrid")
-        pairplot_fig = sns.pairplot(
+        # Os rótulos dependem de tudo o que escolheu o modelo: dados, K testados, lote, critério e centroides
+        # (estes cobrem o warm start)
+        assinatura_modelo = hashlib.blake2b(np.ascontiguousarray(melhor_kmeans.cluster_centers_).tobytes(),
+                                            digest_size=16).hexdigest()
+        tarefa_pairplot = submeter(
+            ('pairplot_litofaceis', chave_tarefa, criterio, melhor_k, assinatura_modelo),
+            pairplot_png,
             pairplot_data,
+            'Matriz de Correlação entre Curvas',
             hue='Litologia',
             palette=cores,
             diag_kind='kde',
             plot_kws={'alpha': 0.6, 's': 20, 'edgecolor': 'black', 'linewidth': 0.3},
-            diag_kws={'alpha': 0.7, 'linewidth': 2}
+            diag_kws={'alpha': 0.7, 'linewidth': 2},
+            rotulo="Gerando pairplot"
+        )
+        imagem = acompanhar(tarefa_pairplot)
+        if imagem is not None:
+            st.image(imagem, use_container_width=True)
+
+    # Salvar modelo treinado (padronização + centroides + nomes das litologias)
+    with st.expander("💾 Salvar Modelo de Fácies", expanded=False):
+        st.caption("Dê nomes às litofácies para reaplicar o modelo a outros poços")
+        rotulos = []
+        for i in range(melhor_k):
+            rotulos.append(st.text_input(f"Litofácies {i+1}", value=f"Litofácies {i+1}", key=f"rotulo_facies_{i}"))
+        modelo_salvo = criar_modelo(scaler, melhor_kmeans.cluster_centers_, selected_curves, rotulos)
+        st.download_button(
+            label="📥 Download Modelo (.npz)",
+            data=modelo_para_bytes(modelo_salvo),
+            file_name="modelo_facies.npz",
+            mime="application/octet-stream"
         )
-        pairplot_fig.figure.suptitle('Matriz de Correlação entre Curvas', y=1.01, fontweight='bold')
-        st.pyplot(pairplot_fig)
+        st.caption("Para classificar uma pasta de arquivos LAS: `python modelo_facies.py modelo_facies.npz pasta_las saida`")
 
     # Opção de download
     st.markdown("---")
-    csv = data_clean[[depth_col] + selected_curves + ['Litologia']].to_csv(index=False)
     st.download_button(
         label="📥 Download Classificação (CSV)",
-        data=csv,
+        data=lambda: data_clean[[depth_col] + selected_curves + ['Litologia']].to_csv(index=False),
         file_name="classificacao_litologica.csv",
         mime="text/csv"
     )
+
+    # Fácies como curva do poço inteiro (1, 2, ...; nulo fora do intervalo classificado)
+    facies = (data_clean['Cluster'] + 1).reindex(data.index).astype('Int16')
+    # Lido aqui: o download adiado roda fora da thread do script, sem acesso ao session_state
+    cabecalho = st.session_state.get('las_object')
+    st.download_button(
+        label="📥 Download Poço com Fácies (LAS)",
+        data=lambda: escrever_las(data.assign(FACIES=facies), cabecalho=cabecalho, depth_col=depth_col),
+        file_name="poco_facies.las",
+        mime="application/octet-stream"
+    )
@@ -0,0 +1,144 @@
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+VERSAO_MODELO = 1
+
+def criar_modelo(escalonador, centroides, curvas, rotulos=None):
+    """Modelo de fácies compacto: padronização (+ PCA opcional) + centroides + curvas + nomes das litologias
+
+    `escalonador` é um StandardScaler ou um pipeline StandardScaler → PCA.
+    """
+    centroides = np.asarray(centroides, dtype=float)
+    if rotulos is None:
+        rotulos = [f"Litofácies {i+1}" for i in range(len(centroides))]
+    etapas = [e for _, e in escalonador.steps] if hasattr(escalonador, 'steps') else [escalonador]
+    modelo = {
+        'curvas': list(curvas),
+        'rotulos': list(rotulos),
+        'media': np.asarray(etapas[0].mean_, dtype=float),
+        'escala': np.asarray(etapas[0].scale_, dtype=float),
+        'centroides': centroides,
+    }
+    if len(etapas) > 1:
+        pca = etapas[1]
+        modelo['componentes'] = np.asarray(pca.components_, dtype=float)
+        modelo['media_pca'] = np.asarray(pca.mean_, dtype=float)
+        modelo['escala_pca'] = np.sqrt(pca.explained_variance_) if pca.whiten else np.ones(len(pca.components_))
+    return modelo
+
+def salvar_modelo(modelo, destino):
+    # .npz comprimido; os metadados vão como JSON para dispensar pickle na leitura
+    metadados = json.dumps({'versao': VERSAO_MODELO, 'curvas': modelo['curvas'], 'rotulos': modelo['rotulos']})
+    matrizes = {k: v for k, v in modelo.items() if k not in ('curvas', 'rotulos')}
+    np.savez_compressed(destino, metadados=np.array(metadados), **matrizes)
+
+def modelo_para_bytes(modelo):
+    buffer = io.BytesIO()
+    salvar_modelo(modelo, buffer)
+    return buffer.getvalue()
+
+def carregar_modelo(origem):
+    """Modelo gravado por salvar_modelo; ValueError se o arquivo não for um modelo desta versão"""
+    if isinstance(origem, (bytes, bytearray)):
+        origem = io.BytesIO(origem)
+    try:
+        with np.load(origem, allow_pickle=False) as arquivo:
+            metadados = json.loads(str(arquivo['metadados']))
+            modelo = {k: arquivo[k] for k in arquivo.files if k != 'metadados'}
+    except Exception as e:
+        # zip corrompido, arquivo que não é .npz, metadados ausentes ou fora do JSON
+        raise ValueError(f"Arquivo de modelo inválido: {e}") from e
+    if not isinstance(metadados, dict) or metadados.get('versao') != VERSAO_MODELO:
+        versao = metadados.get('versao') if isinstance(metadados, dict) else None
+        raise ValueError(f"Modelo na versão {versao}; esta versão do aplicativo lê a versão {VERSAO_MODELO}")
+    faltando = [k for k in ('media', 'escala', 'centroides') if k not in modelo] + \
+               [k for k in ('curvas', 'rotulos') if k not in metadados]
+    if faltando:
+        raise ValueError(f"Arquivo de modelo incompleto: faltam {', '.join(faltando)}")
+    modelo.update(curvas=metadados['curvas'], rotulos=metadados['rotulos'])
+    return modelo
+
+def curvas_ausentes(modelo, df):
+    return [c for c in modelo['curvas'] if c not in df.columns]
+
+def classificar(modelo, df, tamanho_bloco=200_000):
+    """Centroide mais próximo, vetorizado em blocos; amostras com nulos recebem -1"""
+    curvas = modelo['curvas']
+    centroides = modelo['centroides']
+    norma_c = (centroides ** 2).sum(axis=1)
+    clusters = np.full(len(df), -1, dtype=np.int16)
+
+    for inicio in range(0, len(df), tamanho_bloco):
+        X = df[curvas].iloc[inicio:inicio + tamanho_bloco].to_numpy(dtype=float)
+        validos = ~np.isnan(X).any(axis=1)
+        Z = (X[validos] - modelo['media']) / modelo['escala']
+        if 'componentes' in modelo:
+            Z = (Z - modelo['media_pca']) @ modelo['componentes'].T / modelo['escala_pca']
+        # ||z - c||² sem materializar a diferença amostra x centroide x curva
+        d2 = (Z ** 2).sum(axis=1)[:, None] - 2 * Z @ centroides.T + norma_c
+        clusters[inicio:inicio + tamanho_bloco][validos] = d2.argmin(axis=1)
+    return clusters
+
+def nomear(modelo, clusters):
+    nomes = np.asarray(modelo['rotulos'] + [''], dtype=object)
+    return nomes[np.asarray(clusters)]
+
+def classificar_arquivo_las(caminho, modelo, pasta_saida=None):
+    """Classifica um arquivo LAS; opcionalmente grava <poço>_facies.csv e <poço>_facies.las em `pasta_saida`.
+
+    Falhas (arquivo ilegível, curvas ausentes, erro de gravação) voltam como {'poco', 'erro'}, sem
+    interromper o lote dos demais poços.
+    """
+    import lasio
+    from cabecalho_las import extrair_cabecalho
+    from escrita_las import escrever_las
+
+    nome = os.path.splitext(os.path.basename(caminho))[0]
+    try:
+        las = lasio.read(caminho)
+        df = las.df()
+        df.insert(0, "DEPTH", las.index)
+        df = df.reset_index(drop=True)
+
+        faltando = curvas_ausentes(modelo, df)
+        if faltando:
+            return {'poco': nome, 'erro': f"curvas ausentes: {', '.join(faltando)}"}
+
+        clusters = classificar(modelo, df)
+        resultado = pd.DataFrame({'DEPTH': df['DEPTH'], 'Cluster': clusters, 'Litologia': nomear(modelo, clusters)})
+        if pasta_saida:
+            resultado.to_csv(os.path.join(pasta_saida, f"{nome}_facies.csv"), index=False)
+            facies = pd.array(np.where(clusters >= 0, clusters + 1, 0), dtype="Int16")
+            facies[clusters < 0] = pd.NA
+            escrever_las(df.assign(FACIES=facies), os.path.join(pasta_saida, f"{nome}_facies.las"),
+                         cabecalho=extrair_cabecalho(las))
+
+        classificadas = clusters >= 0
+        proporcoes = pd.Series(resultado.loc[classificadas, 'Litologia']).value_counts(normalize=True)
+        return {'poco': nome, 'amostras': int(classificadas.sum()), **proporcoes.round(4).to_dict()}
+    except Exception as e:
+        return {'poco': nome, 'erro': str(e)}
+
+def classificar_diretorio(modelo, pasta, pasta_saida=None, max_workers=None):
+    """Aplica o modelo a todos os .las de uma pasta em paralelo (um processo por poço)"""
+    arquivos = sorted(os.path.join(pasta, f) for f in os.listdir(pasta) if f.lower().endswith('.las'))
+    if pasta_saida:
+        os.makedirs(pasta_saida, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        resumos = list(executor.map(classificar_arquivo_las, arquivos,
+                                    [modelo] * len(arquivos), [pasta_saida] * len(arquivos)))
+    return pd.DataFrame(resumos)
+
+if __name__ == "__main__":
+    # Uso: python modelo_facies.py modelo.npz pasta_las [pasta_saida]
+    if len(sys.argv) < 3:
+        print("Uso: python modelo_facies.py modelo.npz pasta_las [pasta_saida]")
+        sys.exit(1)
+    resumo = classificar_diretorio(carregar_modelo(sys.argv[1]), sys.argv[2],
+                                   sys.argv[3] if len(sys.argv) > 3 else None)
+    print(resumo.to_string(index=False))
@@ -0,0 +1,124 @@
+import numpy as np
+from instrumentacao import instrumentado
+
+CRITERIOS = {
+    "Silhouette simplificada": ("silhouette_simplificada", max),
+    "Silhouette amostral (IC 95%)": ("silhouette_amostral", max),
+    "Davies-Bouldin": ("davies_bouldin", min),
+    "Calinski-Harabasz": ("calinski_harabasz", max),
+}
+
+def _blocos_de_matriz(X, labels, tamanho_bloco=100_000):
+    return lambda: ((X[i:i + tamanho_bloco], labels[i:i + tamanho_bloco]) for i in range(0, len(X), tamanho_bloco))
+
+def indices_em_blocos(fonte, k):
+    """Silhouette simplificada, Davies-Bouldin e Calinski-Harabasz em O(n·k) a partir de blocos.
+
+    `fonte` devolve um iterador de pares (X_bloco, labels_bloco). A primeira passada acumula
+    as médias dos clusters; a segunda calcula as distâncias de cada amostra a todos os centroides
+    e acumula, no mesmo laço, tudo o que os três índices precisam.
+    """
+    somas, contagens, total = None, np.zeros(k), 0
+    for X, labels in fonte():
+        if somas is None:
+            somas = np.zeros((k, X.shape[1]))
+        np.add.at(somas, labels, X)
+        contagens += np.bincount(labels, minlength=k)
+        total += len(X)
+
+    if somas is None or total == 0:
+        return {"silhouette_simplificada": np.nan, "davies_bouldin": np.nan, "calinski_harabasz": np.nan}
+
+    ocupados = contagens > 0
+    centroides = somas / np.maximum(contagens, 1)[:, None]
+    media_global = somas.sum(axis=0) / total
+
+    soma_s = 0.0
+    soma_dist = np.zeros(k)
+    soma_quad = 0.0
+    for X, labels in fonte():
+        # Distâncias de cada amostra a todos os centroides: n_bloco x k
+        d2 = np.maximum((X ** 2).sum(axis=1)[:, None] - 2 * X @ centroides.T + (centroides ** 2).sum(axis=1), 0)
+        d2[:, ~ocupados] = np.inf
+        linhas = np.arange(len(X))
+        a2 = d2[linhas, labels]
+        d2[linhas, labels] = np.inf
+        a = np.sqrt(a2)
+        b = np.sqrt(d2.min(axis=1))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            s = np.where(np.maximum(a, b) > 0, (b - a) / np.maximum(a, b), 0.0)
+        soma_s += np.nan_to_num(s, nan=0.0, posinf=0.0, neginf=0.0).sum()
+        soma_dist += np.bincount(labels, weights=a, minlength=k)
+        soma_quad += a2.sum()
+
+    k_efetivo = int(ocupados.sum())
+    indices = {"silhouette_simplificada": soma_s / total}
+
+    # Davies-Bouldin: dispersão média intra-cluster vs. distância entre centroides
+    if k_efetivo >= 2:
+        c = centroides[ocupados]
+        dispersao = (soma_dist / np.maximum(contagens, 1))[ocupados]
+        separacao = np.sqrt(((c[:, None, :] - c[None, :, :]) ** 2).sum(axis=2))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            razao = (dispersao[:, None] + dispersao[None, :]) / separacao
+        np.fill_diagonal(razao, 0)
+        indices["davies_bouldin"] = float(razao.max(axis=1).mean())
+
+        # Calinski-Harabasz: dispersão entre clusters / dispersão intra-cluster
+        entre = (contagens[ocupados] * ((c - media_global) ** 2).sum(axis=1)).sum()
+        indices["calinski_harabasz"] = float(entre * (total - k_efetivo) / (soma_quad * (k_efetivo - 1))) \
+            if soma_quad > 0 else np.inf
+    else:
+        indices["davies_bouldin"] = np.nan
+        indices["calinski_harabasz"] = np.nan
+    return indices
+
+def indices_agrupamento(X, labels, k=None):
+    labels = np.asarray(labels)
+    k = k if k is not None else int(labels.max()) + 1
+    return indices_em_blocos(_blocos_de_matriz(np.asarray(X, dtype=float), labels), k)
+
+@instrumentado("silhouette_estratificada", "agrupamento")
+def silhouette_estratificada(X, labels, tamanho=2000, repeticoes=10, confianca=0.95, random_state=42):
+    """Silhouette exata em subamostras estratificadas por cluster, com intervalo de confiança.
+
+    Retorna (média, (limite inferior, limite superior), valores por réplica). A mesma semente
+    gera réplicas comparáveis entre diferentes k.
+    """
+    labels = np.asarray(labels)
+    n = len(labels)
+    rng = np.random.default_rng(random_state)
+    grupos = [np.flatnonzero(labels == c) for c in np.unique(labels)]
+    if len(grupos) < 2:
+        return -1.0, (-1.0, -1.0), np.full(repeticoes, -1.0)
+
+    from sklearn.metrics import silhouette_score
+
+    valores = np.empty(repeticoes)
+    for r in range(repeticoes):
+        # Cada cluster contribui proporcionalmente ao seu tamanho (pelo menos 2 amostras)
+        indices = np.concatenate([
+            rng.choice(g, size=min(len(g), max(2, int(round(tamanho * len(g) / n)))), replace=False)
+            for g in grupos
+        ])
+        valores[r] = silhouette_score(X[indices], labels[indices])
+
+    alfa = (1 - confianca) / 2
+    return float(valores.mean()), (float(np.quantile(valores, alfa)), float(np.quantile(valores, 1 - alfa))), valores
+
+def pontuar(X, labels, k, tamanho_amostra=2000, repeticoes=10):
+    """Todos os índices de um ajuste: os de centroide sobre todas as amostras e a silhouette amostral com IC"""
+    indices = indices_agrupamento(X, labels, k)
+    media, intervalo, replicas = silhouette_estratificada(X, labels, tamanho_amostra, repeticoes)
+    indices.update(silhouette_amostral=media, ic_silhouette=intervalo, replicas_silhouette=replicas)
+    return indices
+
+def escolher_k(resultados, criterio="Silhouette simplificada"):
+    """Melhor k segundo o critério e a estabilidade da escolha (fração das réplicas em que cada k vence)"""
+    chave, melhor_de = CRITERIOS[criterio]
+    melhor = melhor_de(resultados, key=lambda r: r["indices"][chave])
+
+    replicas = np.array([r["indices"]["replicas_silhouette"] for r in resultados])
+    vencedores = np.argmax(replicas, axis=0)
+    estabilidade = {r["k"]: float((vencedores == i).mean()) for i, r in enumerate(resultados)}
+    return melhor, estabilidade
@@ -0,0 +1,111 @@
+import hashlib
+import weakref
+import numpy as np
+import pandas as pd
+import streamlit as st
+from cache_compartilhado import compartilhado
+from qualidade import mascarar_amostras
+from acesso_dados import fatiar_profundidade
+
+def hash_poco(df):
+    """Hash do conteúdo do poço (nomes das colunas + valores), usado como chave de cache"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update("|".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+def referencia_hash(df, valor):
+    # Referência fraca: um id reciclado por outro DataFrame não reaproveita o hash antigo
+    return (weakref.ref(df), valor)
+
+def obter_hash_poco(df, chave="well_hash"):
+    # Reaproveita o hash calculado na importação enquanto o DataFrame da sessão for o mesmo
+    salvo = st.session_state.get(chave)
+    if salvo is not None and salvo[0]() is df:
+        return salvo[1]
+    valor = hash_poco(df)
+    st.session_state[chave] = referencia_hash(df, valor)
+    return valor
+
+def interpolar_por_profundidade(profundidade, valores, limite_gap=None):
+    """Interpola nulos linearmente em função da profundidade (não da posição da linha).
+
+    Lacunas cuja distância entre as amostras válidas vizinhas excede `limite_gap`
+    permanecem nulas, assim como as extremidades sem vizinho dos dois lados.
+    """
+    prof = np.asarray(profundidade, dtype=float)
+    y = np.array(valores, dtype=float)
+    unidimensional = y.ndim == 1
+    if unidimensional:
+        y = y[:, None]
+
+    n = len(prof)
+    if n == 0:
+        return y[:, 0] if unidimensional else y
+
+    # Garantir profundidade crescente (arquivos LAS podem vir em ordem decrescente)
+    ordem = None
+    if np.any(np.diff(prof) < 0):
+        ordem = np.argsort(prof, kind="stable")
+        prof = prof[ordem]
+        y = y[ordem]
+
+    validos = ~np.isnan(y)
+    linhas = np.arange(n)[:, None]
+
+    # Índice da amostra válida anterior e da seguinte, para todas as curvas de uma vez
+    anterior = np.maximum.accumulate(np.where(validos, linhas, -1), axis=0)
+    seguinte = np.minimum.accumulate(np.where(validos, linhas, n)[::-1], axis=0)[::-1]
+
+    preencher = ~validos & (anterior >= 0) & (seguinte < n)
+    ant = np.clip(anterior, 0, n - 1)
+    seg = np.clip(seguinte, 0, n - 1)
+    colunas = np.arange(y.shape[1])[None, :]
+
+    d0 = prof[ant]
+    d1 = prof[seg]
+    gap = d1 - d0
+    if limite_gap is not None:
+        preencher &= gap <= limite_gap
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        peso = np.where(gap > 0, (prof[:, None] - d0) / gap, 0.0)
+        interp = y[ant, colunas] + (y[seg, colunas] - y[ant, colunas]) * peso
+
+    y = np.where(preencher, interp, y)
+
+    if ordem is not None:
+        restaurado = np.empty_like(y)
+        restaurado[ordem] = y
+        y = restaurado
+
+    return y[:, 0] if unidimensional else y
+
+@compartilhado("tratar_dados_ausentes")
+def tratar_dados_ausentes(_df, chave_poco, depth_col, curvas, faixa, metodo, limite_gap=None,
+                          _qc=None, mascarar_qc=False):
+    """Aplica o tratamento de nulos apenas às curvas e ao intervalo selecionados.
+
+    `chave_poco` identifica o poço no cache; o DataFrame em si não é hasheado a cada rerun.
+    Com `mascarar_qc`, as amostras sinalizadas na varredura de qualidade viram nulos antes do tratamento.
+    """
+    curvas = list(curvas)
+    colunas = ([depth_col] if depth_col else []) + curvas
+
+    df = fatiar_profundidade(_df[colunas], depth_col, faixa)
+
+    if mascarar_qc and _qc is not None:
+        df = mascarar_amostras(df, _qc, curvas)
+
+    if metodo == "Remover":
+        return df.dropna(subset=curvas).reset_index(drop=True)
+
+    if metodo == "Interpolar":
+        if depth_col:
+            preenchido = interpolar_por_profundidade(df[depth_col].to_numpy(), df[curvas].to_numpy(dtype=float), limite_gap)
+        else:
+            preenchido = df[curvas].interpolate(method="linear", limit_area="inside").to_numpy()
+        df = df.assign(**dict(zip(curvas, preenchido.T)))
+        return df.reset_index(drop=True)
+
+    return df.reset_index(drop=True)
@@ -0,0 +1,166 @@
+import warnings
+import numpy as np
+import pandas as pd
+import streamlit as st
+from cache_compartilhado import compartilhado
+
+# Bits das flags de controle de qualidade (uma matriz uint8 amostra x curva)
+NULO = 1
+SENTINELA = 2
+PICO = 4
+PLANO = 8
+SATURADO = 16
+LACUNA = 32
+
+NOMES_FLAGS = {
+    NULO: "Nulo",
+    SENTINELA: "Sentinela NULL",
+    PICO: "Pico",
+    PLANO: "Curva plana",
+    SATURADO: "Valor travado",
+    LACUNA: "Lacuna de profundidade",
+}
+
+# Flags que invalidam a amostra (nulos já são tratados separadamente pelas páginas)
+FLAGS_MASCARA = SENTINELA | PICO | PLANO | SATURADO
+
+SENTINELAS_PADRAO = (-999.25, -999.0, -9999.0, -99999.0)
+
+def _mediana3(w):
+    # Mediana de 3 pontos vizinhos, sem ordenação: max(min(a, b), min(max(a, b), c))
+    a, b, c = w[:-2], w[1:-1], w[2:]
+    med = np.full_like(w, np.nan)
+    med[1:-1] = np.maximum(np.minimum(a, b), np.minimum(np.maximum(a, b), c))
+    return med
+
+def _comprimento_sequencias(iguais_anterior):
+    # Comprimento da sequência de valores repetidos a que cada amostra pertence, todas as curvas de uma vez
+    n, p = iguais_anterior.shape
+    quebras = ~iguais_anterior.ravel(order="F")
+    ids = np.cumsum(quebras) - 1
+    return np.bincount(ids)[ids].reshape((n, p), order="F")
+
+def escanear_qualidade(df, depth_col=None, sentinelas=SENTINELAS_PADRAO, limiar_pico=8.0,
+                       min_plano=15, fracao_saturado=0.01, fator_lacuna=3.0):
+    """Varredura vetorizada de qualidade de todas as curvas numéricas do poço.
+
+    Retorna um dict com `flags` (uint8, amostras x curvas, bits NULO/SENTINELA/...),
+    `curvas`, `resumo` (contagens por curva) e `intervalos` (trechos contínuos sinalizados).
+    """
+    curvas = [c for c in df.select_dtypes(include="number").columns if c != depth_col]
+    v = df[curvas].to_numpy(dtype=float)
+    n, p = v.shape
+    flags = np.zeros((n, p), dtype=np.uint8)
+    if n == 0 or p == 0:
+        return {"flags": flags, "curvas": curvas, "resumo": pd.DataFrame(), "intervalos": pd.DataFrame()}
+
+    nulos = np.isnan(v)
+    sentinela = np.zeros_like(nulos)
+    for valor in sentinelas:
+        sentinela |= np.isclose(v, valor, rtol=0, atol=1e-4)
+    flags[nulos] |= NULO
+    flags[sentinela] |= SENTINELA
+
+    w = np.where(sentinela, np.nan, v)
+
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        # Picos: desvio em relação à mediana de 3 pontos, escalado pelo MAD das diferenças
+        diferencas = np.diff(w, axis=0)
+        mad = np.nanmedian(np.abs(diferencas - np.nanmedian(diferencas, axis=0)), axis=0) * 1.4826
+        mad[~(mad > 0)] = np.nan
+        residuo = np.abs(w - _mediana3(w))
+        flags[residuo > limiar_pico * mad] |= PICO
+
+        # Curva plana: sequências de valores idênticos com pelo menos `min_plano` amostras
+        iguais = np.vstack([np.zeros((1, p), dtype=bool), w[1:] == w[:-1]])
+        flags[(_comprimento_sequencias(iguais) >= min_plano) & ~np.isnan(w)] |= PLANO
+
+        # Valor travado: extremos da curva que se repetem numa fração relevante das amostras
+        for limite in (np.nanmin(w, axis=0), np.nanmax(w, axis=0)):
+            no_limite = w == limite
+            frequente = no_limite.sum(axis=0) >= max(2, fracao_saturado * n)
+            flags[no_limite & frequente] |= SATURADO
+
+    # Lacunas de profundidade: passo muito maior que o passo mediano
+    if depth_col and n > 2:
+        passos = np.abs(np.diff(df[depth_col].to_numpy(dtype=float)))
+        passo_tipico = np.nanmedian(passos)
+        if passo_tipico > 0:
+            salto = np.flatnonzero(passos > fator_lacuna * passo_tipico)
+            flags[salto] |= LACUNA
+            flags[salto + 1] |= LACUNA
+
+    return {
+        "flags": flags,
+        "curvas": curvas,
+        "resumo": resumo_qualidade(flags, curvas),
+        "intervalos": intervalos_qualidade(flags, curvas, df[depth_col].to_numpy() if depth_col else None),
+    }
+
+def resumo_qualidade(flags, curvas):
+    n = len(flags)
+    resumo = {nome: [(flags[:, j] & bit).astype(bool).sum() for j in range(len(curvas))]
+              for bit, nome in NOMES_FLAGS.items()}
+    tabela = pd.DataFrame(resumo, index=curvas)
+    tabela["% sinalizado"] = ((flags & FLAGS_MASCARA).astype(bool).sum(axis=0) / max(n, 1) * 100).round(2)
+    tabela.index.name = "Curva"
+    return tabela
+
+def intervalos_qualidade(flags, curvas, profundidade=None):
+    """Trechos contínuos sinalizados por curva e tipo de flag"""
+    n, p = flags.shape
+    prof = np.arange(n) if profundidade is None else np.asarray(profundidade)
+    linhas = []
+    for bit, nome in NOMES_FLAGS.items():
+        ativo = ((flags & bit) > 0).astype(np.int8)
+        borda = np.diff(np.vstack([np.zeros((1, p), np.int8), ativo, np.zeros((1, p), np.int8)]), axis=0)
+        inicio_l, inicio_c = np.nonzero(borda == 1)
+        fim_l, fim_c = np.nonzero(borda == -1)
+        # nonzero percorre em ordem de linha; reordenar por curva para parear início e fim
+        oi = np.lexsort((inicio_l, inicio_c))
+        of = np.lexsort((fim_l, fim_c))
+        inicio_l, inicio_c, fim_l = inicio_l[oi], inicio_c[oi], fim_l[of]
+        if len(inicio_l):
+            linhas.append(pd.DataFrame({
+                "Curva": np.asarray(curvas, dtype=object)[inicio_c],
+                "Flag": nome,
+                "Topo": prof[inicio_l],
+                "Base": prof[fim_l - 1],
+                "Amostras": fim_l - inicio_l,
+            }))
+    if not linhas:
+        return pd.DataFrame(columns=["Curva", "Flag", "Topo", "Base", "Amostras"])
+    return pd.concat(linhas, ignore_index=True)
+
+@compartilhado("escanear_qualidade")
+def escanear_qualidade_cache(_df, chave_poco, depth_col):
+    return escanear_qualidade(_df, depth_col)
+
+def obter_qualidade(df, chave_poco, depth_col):
+    # Resultado da varredura feita na importação; recalcula (em cache) se o poço mudou
+    qc = st.session_state.get("qc")
+    if qc is None or qc.get("chave") != chave_poco:
+        qc = dict(escanear_qualidade_cache(df, chave_poco, depth_col), chave=chave_poco)
+        st.session_state["qc"] = qc
+    return qc
+
+def mascara_qualidade(qc, curvas, linhas, bits=FLAGS_MASCARA):
+    """Máscara booleana (linhas x curvas) das amostras sinalizadas; `linhas` são posições no poço original"""
+    indice = {c: j for j, c in enumerate(qc["curvas"])}
+    linhas = np.asarray(linhas)
+    mascara = np.zeros((len(linhas), len(curvas)), dtype=bool)
+    for k, curva in enumerate(curvas):
+        j = indice.get(curva)
+        if j is not None:
+            mascara[:, k] = (qc["flags"][linhas, j] & bits).astype(bool)
+    return mascara
+
+def mascarar_amostras(df, qc, curvas, bits=FLAGS_MASCARA):
+    """Substitui por NaN as amostras sinalizadas; o índice de `df` deve ser a posição no poço original"""
+    curvas = list(curvas)
+    mascara = mascara_qualidade(qc, curvas, df.index.to_numpy(), bits)
+    if not mascara.any():
+        return df
+    # Só as curvas mascaradas ganham memória nova; as demais colunas seguem compartilhadas
+    return df.assign(**{c: df[c].mask(mascara[:, k]) for k, c in enumerate(curvas)})
@@ -0,0 +1,254 @@
+import hashlib
+import numpy as np
+import pandas as pd
+
+# Reamostragem de curvas para uma grade de profundidade comum, todas as curvas numa só passada
+# vetorizada e em blocos da grade (memória limitada em poços muito longos). Nulos não contaminam
+# as amostras vizinhas: cada valor é ponderado só pelas amostras válidas.
+METODOS = {
+    "Linear": "linear",
+    "Mais próximo": "proximo",
+    "Média em bloco (anti-aliasing)": "media",
+}
+TAMANHO_BLOCO = 200_000
+
+def passo_amostragem(profundidade):
+    """Passo típico (mediana das diferenças não nulas, em módulo) de uma curva de profundidade;
+    vale também para perfis registrados de baixo para cima"""
+    diferencas = np.abs(np.diff(np.asarray(profundidade, dtype=float)))
+    diferencas = diferencas[np.isfinite(diferencas) & (diferencas > 0)]
+    return float(np.median(diferencas)) if len(diferencas) else float("nan")
+
+def grade_profundidade(topo, base, passo):
+    """Grade regular de `topo` a `base` (inclusive, com tolerância de arredondamento)"""
+    if not np.isfinite(passo):
+        raise ValueError("Passo de profundidade indefinido: a curva de profundidade não tem duas amostras distintas")
+    if passo <= 0 or base < topo:
+        return np.empty(0)
+    n = int(np.floor((base - topo) / passo + 1e-6)) + 1
+    return topo + passo * np.arange(n)
+
+def _ordenar(prof, valores):
+    # Profundidade crescente e sem nulos; perfis registrados de baixo para cima são invertidos
+    validos = np.isfinite(prof)
+    if not validos.all():
+        prof, valores = prof[validos], valores[validos]
+    if len(prof) > 1 and not (np.diff(prof) >= 0).all():
+        if (np.diff(prof) <= 0).all():
+            prof, valores = prof[::-1], valores[::-1]
+        else:
+            ordem = np.argsort(prof, kind="stable")
+            prof, valores = prof[ordem], valores[ordem]
+    return prof, valores
+
+def _linear(prof, valores, grade, peso_minimo, max_lacuna, proximo=False):
+    # Vizinhos acima e abaixo de cada ponto da grade; pesos zerados onde a amostra é nula
+    n = len(prof)
+    saida = np.full((len(grade), valores.shape[1]), np.nan)
+    if n == 0:
+        return saida
+    if n == 1:
+        iguais = grade == prof[0]
+        saida[iguais] = valores[0]
+        return saida
+
+    acima = np.clip(np.searchsorted(prof, grade, side="right") - 1, 0, n - 2)
+    abaixo = acima + 1
+    distancia = prof[abaixo] - prof[acima]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = np.where(distancia > 0, (grade - prof[acima]) / distancia, 0.0)
+    dentro = (w >= 0) & (w <= 1)
+    if max_lacuna is not None:
+        dentro &= distancia <= max_lacuna
+    if proximo:
+        w = (w > 0.5).astype(float)
+
+    y0, y1 = valores[acima], valores[abaixo]
+    v0, v1 = ~np.isnan(y0), ~np.isnan(y1)
+    p0 = (1 - w)[:, None] * v0
+    p1 = w[:, None] * v1
+    soma = p0 + p1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        resultado = (p0 * np.where(v0, y0, 0) + p1 * np.where(v1, y1, 0)) / soma
+    # Com um vizinho nulo, só vale o valor se o vizinho válido pesar pelo menos `peso_minimo`
+    aceito = dentro[:, None] & (soma >= peso_minimo - 1e-12) & (soma > 0)
+    saida[aceito] = resultado[aceito]
+    return saida
+
+def _limites_celulas(grade):
+    # Bordas das células: pontos médios entre nós da grade, meia célula além das extremidades
+    if len(grade) == 1:
+        return np.array([-np.inf, np.inf])
+    meio = (grade[1:] + grade[:-1]) / 2
+    return np.concatenate([[grade[0] - (grade[1] - grade[0]) / 2], meio, [grade[-1] + (grade[-1] - grade[-2]) / 2]])
+
+def _media(prof, valores, grade, peso_minimo, max_lacuna):
+    """Média das amostras válidas de cada célula; células sem amostras (grade mais fina que o
+    registro) recebem a interpolação linear"""
+    saida = _linear(prof, valores, grade, peso_minimo, max_lacuna)
+    bordas = _limites_celulas(grade)
+    inicio, fim = np.searchsorted(prof, [bordas[0], bordas[-1]], side="left")
+    if fim <= inicio:
+        return saida
+    celula = np.searchsorted(bordas, prof[inicio:fim], side="right") - 1
+    bloco = valores[inicio:fim]
+    validos = ~np.isnan(bloco)
+
+    # Amostras ordenadas por profundidade: cada célula é um trecho contíguo, somado com reduceat
+    ocupadas, comecos = np.unique(celula, return_index=True)
+    soma = np.add.reduceat(np.where(validos, bloco, 0.0), comecos, axis=0)
+    contagem = np.add.reduceat(validos.astype(np.int64), comecos, axis=0)
+    total = np.diff(np.append(comecos, len(celula)))[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        media = np.where(contagem / total >= peso_minimo - 1e-12, soma / contagem, np.nan)
+    saida[ocupadas] = media
+    return saida
+
+def reamostrar_matriz(profundidade, valores, grade, metodo="linear", peso_minimo=0.5, max_lacuna=None,
+                      tamanho_bloco=TAMANHO_BLOCO):
+    """Reamostra as colunas de `valores` (n x c) medidas em `profundidade` para a `grade`.
+
+    - linear: interpolação entre as amostras vizinhas;
+    - proximo: valor da amostra mais próxima (rótulos, fácies, flags);
+    - media: média das amostras dentro de cada célula da grade (anti-aliasing ao decimar).
+
+    Nulos entram com peso zero: o resultado só é aceito se as amostras válidas somarem pelo
+    menos `peso_minimo` do peso (0.5 = o vizinho válido é o mais próximo; 1.0 = qualquer nulo
+    anula). Pontos fora do intervalo registrado, ou entre amostras mais distantes que
+    `max_lacuna`, ficam nulos. A grade é processada em blocos de `tamanho_bloco` pontos.
+    """
+    if metodo not in METODOS.values():
+        raise ValueError(f"Método de reamostragem desconhecido: {metodo}")
+    valores = np.asarray(valores)
+    unidimensional = valores.ndim == 1
+    valores = valores.reshape(len(valores), -1).astype(float, copy=False)
+    prof, valores = _ordenar(np.asarray(profundidade, dtype=float), valores)
+    grade = np.asarray(grade, dtype=float)
+
+    saida = np.empty((len(grade), valores.shape[1]))
+    bordas = _limites_celulas(grade) if metodo == "media" and len(grade) else None
+    for inicio in range(0, len(grade), tamanho_bloco):
+        fim = min(inicio + tamanho_bloco, len(grade))
+        trecho = grade[inicio:fim]
+        # Só as amostras que alcançam o trecho (com um vizinho de cada lado)
+        if bordas is not None:
+            limites = (min(bordas[inicio], trecho[0]), max(bordas[fim], trecho[-1]))
+        else:
+            limites = (trecho[0], trecho[-1])
+        a = max(np.searchsorted(prof, limites[0], side="left") - 1, 0)
+        b = min(np.searchsorted(prof, limites[1], side="right") + 1, len(prof))
+        if metodo == "media":
+            saida[inicio:fim] = _media(prof[a:b], valores[a:b], trecho, peso_minimo, max_lacuna)
+        else:
+            saida[inicio:fim] = _linear(prof[a:b], valores[a:b], trecho, peso_minimo, max_lacuna,
+                                        proximo=metodo == "proximo")
+    return saida[:, 0] if unidimensional else saida
+
+def reamostrar(df, depth_col, grade=None, passo=None, curvas=None, metodo="linear", peso_minimo=0.5,
+               max_lacuna=None, tamanho_bloco=TAMANHO_BLOCO):
+    """DataFrame com a profundidade na `grade` (ou numa grade regular de `passo`) e as curvas reamostradas.
+
+    Curvas inteiras ou booleanas (fácies, flags) usam sempre o mais próximo e voltam como
+    inteiros anuláveis; as demais usam `metodo`. Sem `grade` nem `passo`, usa o passo do próprio poço.
+    """
+    prof = df[depth_col].to_numpy(dtype=float)
+    if grade is None:
+        passo = passo or passo_amostragem(prof)
+        finitos = prof[np.isfinite(prof)]
+        grade = grade_profundidade(finitos.min(), finitos.max(), passo) if len(finitos) else np.empty(0)
+    grade = np.asarray(grade, dtype=float)
+
+    if curvas is None:
+        curvas = [c for c in df.select_dtypes(include=["number", "bool"]).columns if c != depth_col]
+    discretas = [c for c in curvas if pd.api.types.is_integer_dtype(df[c]) or pd.api.types.is_bool_dtype(df[c])]
+    continuas = [c for c in curvas if c not in discretas]
+
+    colunas = {depth_col: grade}
+    if continuas:
+        matriz = np.column_stack([df[c].to_numpy(dtype=float, na_value=np.nan) for c in continuas])
+        resultado = reamostrar_matriz(prof, matriz, grade, metodo, peso_minimo, max_lacuna, tamanho_bloco)
+        del matriz
+        for j, c in enumerate(continuas):
+            # float32 continua float32 depois da reamostragem
+            colunas[c] = resultado[:, j].astype(df[c].dtype if df[c].dtype == np.float32 else np.float64, copy=False)
+    if discretas:
+        matriz = np.column_stack([df[c].to_numpy(dtype=float, na_value=np.nan) for c in discretas])
+        resultado = reamostrar_matriz(prof, matriz, grade, "proximo", 1.0, max_lacuna, tamanho_bloco)
+        for j, c in enumerate(discretas):
+            tipo = df[c].dtype
+            destino = tipo if isinstance(tipo, pd.api.extensions.ExtensionDtype) else \
+                "boolean" if pd.api.types.is_bool_dtype(tipo) else \
+                f"{'UInt' if tipo.kind == 'u' else 'Int'}{8 * tipo.itemsize}"
+            colunas[c] = pd.Series(resultado[:, j]).astype(destino).array
+    return pd.DataFrame(colunas, columns=[depth_col] + list(curvas), copy=False)
+
+def alinhar_pocos(pocos, passo=None, curvas=None, metodo="linear", intervalo="uniao", peso_minimo=0.5,
+                  max_lacuna=None):
+    """Vários poços numa mesma grade de profundidade.
+
+    `pocos` é um dict nome -> (DataFrame, coluna de profundidade). A grade tem nós em múltiplos
+    de `passo` (o menor passo entre os poços, se omitido), cobrindo a união ou a interseção
+    ('intersecao') dos intervalos. Retorna (grade, dict nome -> DataFrame reamostrado).
+    """
+    if not pocos:
+        return np.empty(0), {}
+    faixas, passos = [], []
+    for df, depth_col in pocos.values():
+        prof = df[depth_col].to_numpy(dtype=float)
+        prof = prof[np.isfinite(prof)]
+        faixas.append((prof.min(), prof.max()) if len(prof) else (np.nan, np.nan))
+        passos.append(passo_amostragem(prof))
+    passo = passo or float(np.nanmin(passos))
+    topos, bases = zip(*faixas)
+    # Nós em múltiplos do passo: a mesma profundidade cai no mesmo nó em qualquer poço
+    if intervalo == "intersecao":
+        topo = np.ceil(np.nanmax(topos) / passo - 1e-6) * passo
+        base = np.nanmin(bases)
+    else:
+        topo = np.floor(np.nanmin(topos) / passo + 1e-6) * passo
+        base = np.ceil(np.nanmax(bases) / passo - 1e-6) * passo
+    grade = grade_profundidade(topo, base, passo)
+
+    alinhados = {}
+    for nome, (df, depth_col) in pocos.items():
+        selecao = None if curvas is None else [c for c in curvas if c in df.columns]
+        alinhados[nome] = reamostrar(df, depth_col, grade, curvas=selecao, metodo=metodo,
+                                     peso_minimo=peso_minimo, max_lacuna=max_lacuna)
+    return grade, alinhados
+
+def chave_reamostragem(chave_poco, passo, metodo):
+    """Hash do poço reamostrado, derivado do hash do original sem reler os dados"""
+    return hashlib.blake2b(repr((chave_poco, float(passo), metodo)).encode(), digest_size=16).hexdigest()
+
+def controle_reamostragem(df, depth_col, chave_poco, prefixo):
+    """Opção de reamostragem na sidebar das páginas de análise.
+
+    Retorna (df, chave_poco): o original, ou o poço reamostrado (compartilhado entre as sessões
+    pelo cache do servidor) e o hash derivado, para as chaves de cache da página.
+    """
+    import streamlit as st
+    from cache_compartilhado import CACHE
+
+    if not depth_col:
+        return df, chave_poco
+    ativo = st.checkbox("Reamostrar em grade regular", key=f"{prefixo}_reamostrar",
+                        help="Interpola todas as curvas para um passo de profundidade comum")
+    if not ativo:
+        return df, chave_poco
+
+    passo_original = passo_amostragem(df[depth_col].to_numpy())
+    passo_padrao = passo_original if np.isfinite(passo_original) else 0.1524
+    col1, col2 = st.columns(2)
+    with col1:
+        passo = st.number_input("Passo (m)", min_value=0.001, value=float(round(passo_padrao, 4)), step=0.05,
+                                format="%.4f", key=f"{prefixo}_passo")
+    with col2:
+        rotulo = st.selectbox("Método", ["Automático"] + list(METODOS), key=f"{prefixo}_metodo",
+                              help="Automático: média em bloco ao aumentar o passo, linear ao diminuir")
+    metodo = METODOS.get(rotulo) or ("media" if passo > passo_padrao * 1.01 else "linear")
+
+    chave = chave_reamostragem(chave_poco, passo, metodo)
+    reamostrado = CACHE.obter_ou_calcular(('reamostragem', chave),
+                                          lambda: reamostrar(df, depth_col, passo=passo, metodo=metodo))
+    st.caption(f"{len(df):,} → {len(reamostrado):,} amostras (passo original {passo_original:.4f} m)")
+    return reamostrado, chave
@@ -0,0 +1,132 @@
+import io
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+# Arquivos estáticos servidos pelo próprio Streamlit (server.enableStaticServing em .streamlit/config.toml)
+# em app/static/<nome>. O navegador guarda em cache e nada disso volta a trafegar a cada rerun.
+# Para regerar a partir das imagens originais: python recursos.py
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+DIRETORIO = os.path.join(RAIZ, "static")
+URL = "app/static"
+
+ORIGEM_FUNDO = os.path.join(RAIZ, "Imagem", "02.jpg")
+ORIGEM_LOGO = os.path.join(RAIZ, "Imagem", "WhatsApp Image 2024-09-29 at 02.22.00.jpeg")
+
+FUNDO = "fundo.jpg"
+LOGO = "logo.jpg"
+ICONE = "icone.png"
+PAIRPLOT_DEMO = "pairplot_demo.png"
+
+# Amostras por litologia no exemplo da Home
+AMOSTRAS_DEMO = 100
+CORES_DEMO = {'Arenito': '#FFD700', 'Folhelho': '#8B4513', 'Calcário': '#87CEEB'}
+
+def caminho(nome):
+    return os.path.join(DIRETORIO, nome)
+
+def url(nome):
+    return f"{URL}/{nome}"
+
+def _salvar_imagem(imagem, nome, **opcoes):
+    os.makedirs(DIRETORIO, exist_ok=True)
+    temporario = caminho(nome) + ".tmp"
+    imagem.save(temporario, format=opcoes.pop("format"), **opcoes)
+    os.replace(temporario, caminho(nome))
+
+def preparar_fundo(largura=1280):
+    # Recomprimida só se a original for maior que a largura alvo; senão é copiada como está
+    imagem = Image.open(ORIGEM_FUNDO).convert("RGB")
+    if imagem.width <= largura:
+        os.makedirs(DIRETORIO, exist_ok=True)
+        shutil.copyfile(ORIGEM_FUNDO, caminho(FUNDO))
+        return
+    imagem.thumbnail((largura, largura))
+    _salvar_imagem(imagem, FUNDO, format="JPEG", quality=80, optimize=True, progressive=True)
+
+def preparar_logo(largura=320, lado_icone=64):
+    # A logo original tem 1024 px; a sidebar mostra ~300 px e o ícone da aba, 32-64 px
+    imagem = Image.open(ORIGEM_LOGO).convert("RGB")
+    logo = imagem.copy()
+    logo.thumbnail((largura, largura), Image.LANCZOS)
+    _salvar_imagem(logo, LOGO, format="JPEG", quality=85, optimize=True)
+    icone = imagem.resize((lado_icone, lado_icone), Image.LANCZOS)
+    _salvar_imagem(icone, ICONE, format="PNG", optimize=True)
+
+def dados_demo():
+    """Dados sintéticos (semente fixa) de três litologias usados no exemplo da Home"""
+    np.random.seed(42)
+    n_samples = AMOSTRAS_DEMO
+
+    # Arenito
+    arenito = pd.DataFrame({
+        'GR': np.random.normal(45, 10, n_samples),
+        'Densidade': np.random.normal(2.35, 0.08, n_samples),
+        'Neutrão': np.random.normal(0.22, 0.05, n_samples),
+        'Resistividade': np.random.normal(25, 8, n_samples),
+        'Litologia': 'Arenito'
+    })
+
+    # Folhelho
+    folhelho = pd.DataFrame({
+        'GR': np.random.normal(95, 15, n_samples),
+        'Densidade': np.random.normal(2.55, 0.07, n_samples),
+        'Neutrão': np.random.normal(0.35, 0.06, n_samples),
+        'Resistividade': np.random.normal(8, 3, n_samples),
+        'Litologia': 'Folhelho'
+    })
+
+    # Calcário
+    calcario = pd.DataFrame({
+        'GR': np.random.normal(30, 8, n_samples),
+        'Densidade': np.random.normal(2.71, 0.06, n_samples),
+        'Neutrão': np.random.normal(0.08, 0.03, n_samples),
+        'Resistividade': np.random.normal(45, 12, n_samples),
+        'Litologia': 'Calcário'
+    })
+
+    return pd.concat([arenito, folhelho, calcario], ignore_index=True)
+
+def renderizar_pairplot_demo(dpi=100):
+    # PNG com paleta de 256 cores: ~1/8 do tamanho do PNG RGBA que o st.pyplot gerava a cada visita
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.set_style("whitegrid")
+    pairplot_fig = sns.pairplot(dados_demo(), hue='Litologia',
+                                palette=CORES_DEMO,
+                                diag_kind='kde',
+                                plot_kws={'alpha': 0.6, 's': 30, 'edgecolor': 'black', 'linewidth': 0.5},
+                                diag_kws={'alpha': 0.7, 'linewidth': 2})
+    pairplot_fig.figure.suptitle('Análise Multivariada de Litologias', y=1.01, fontsize=16, fontweight='bold')
+    buffer = io.BytesIO()
+    pairplot_fig.figure.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+    plt.close(pairplot_fig.figure)
+    imagem = Image.open(buffer).convert("RGB").quantize(256, method=Image.Quantize.MEDIANCUT)
+    _salvar_imagem(imagem, PAIRPLOT_DEMO, format="PNG", optimize=True)
+
+ETAPAS = {
+    FUNDO: preparar_fundo,
+    LOGO: preparar_logo,
+    ICONE: preparar_logo,
+    PAIRPLOT_DEMO: renderizar_pairplot_demo,
+}
+
+def gerar_recursos(forcar=False):
+    """Gera os arquivos ausentes (ou todos, com `forcar`); retorna os nomes gerados"""
+    gerados, executadas = [], set()
+    for nome, etapa in ETAPAS.items():
+        if forcar or not os.path.exists(caminho(nome)):
+            if etapa not in executadas:
+                etapa()
+                executadas.add(etapa)
+            gerados.append(nome)
+    return gerados
+
+if __name__ == "__main__":
+    for nome in gerar_recursos(forcar=True):
+        print(f"{caminho(nome)}: {os.path.getsize(caminho(nome)) / 1024:.1f} KB")
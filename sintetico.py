@@ -0,0 +1,125 @@
+import sys
+import numpy as np
+import pandas as pd
+from cabecalho_las import CabecalhoLAS, ItemCabecalho, SecaoCabecalho
+
+# Respostas médias por fácies: GR (API), RHOB (g/cc), NPHI (v/v), log10(ILD), SP (mV), DT (us/ft)
+FACIES = {
+    'Arenito':          (45.0, 2.35, 0.22, 1.40, -60.0, 85.0),
+    'Folhelho':         (105.0, 2.55, 0.36, 0.60, -5.0, 110.0),
+    'Calcário':         (30.0, 2.68, 0.08, 1.90, -30.0, 55.0),
+    'Arenito argiloso': (75.0, 2.45, 0.28, 1.00, -35.0, 95.0),
+    'Dolomito':         (25.0, 2.80, 0.05, 2.20, -25.0, 48.0),
+}
+# Desvio do ruído de cada curva (na mesma escala das médias acima)
+DESVIOS = (10.0, 0.05, 0.03, 0.15, 8.0, 6.0)
+CURVAS = [
+    ('GR', 'API', 'Gamma Ray'),
+    ('RHOB', 'G/CC', 'Bulk Density'),
+    ('NPHI', 'V/V', 'Neutron Porosity'),
+    ('ILD', 'OHMM', 'Deep Induction Resistivity'),
+    ('SP', 'MV', 'Spontaneous Potential'),
+    ('DT', 'US/F', 'Sonic Transit Time'),
+]
+
+def _camadas(n_amostras, espessura_media, n_facies, rng):
+    # Sequência de camadas com espessuras exponenciais; cada camada recebe uma fácies
+    n_camadas = max(1, int(np.ceil(n_amostras / espessura_media * 1.5)) + 1)
+    espessuras = np.maximum(1, rng.exponential(espessura_media, n_camadas).astype(np.int64))
+    limites = np.cumsum(espessuras)
+    facies_camada = rng.integers(0, n_facies, n_camadas)
+    camada = np.searchsorted(limites, np.arange(n_amostras), side="right")
+    return facies_camada[np.minimum(camada, n_camadas - 1)]
+
+def _suavizar(ruido, janela):
+    # Média móvel (soma cumulativa): ruído correlacionado em profundidade, como num perfil real
+    if janela <= 1:
+        return ruido
+    acumulado = np.cumsum(np.concatenate([np.zeros(janela), ruido]))
+    return (acumulado[janela:] - acumulado[:-janela]) / np.sqrt(janela)
+
+def gerar_poco(n_amostras=100_000, n_curvas=6, fracao_nulos=0.01, n_zonas=5, n_facies=4,
+               topo=1000.0, passo=0.1524, espessura_camada=200, dtype=np.float64, semente=0):
+    """Poço sintético determinístico (mesma semente, mesmos dados).
+
+    Gera `n_curvas` curvas (as seis primeiras são GR, RHOB, NPHI, ILD, SP e DT; as demais,
+    combinações delas) a partir de camadas de `n_facies` fácies, com ruído correlacionado,
+    falhas (nulos em trechos contíguos) em `fracao_nulos` das amostras de cada curva e `n_zonas`
+    zonas. Retorna um dict com 'dados' (DataFrame), 'facies' (rótulo verdadeiro por amostra),
+    'nomes_facies', 'zonas' (topo, base, GR limpo, GR argila) e 'cabecalho' (CabecalhoLAS).
+    """
+    rng = np.random.default_rng(semente)
+    n_facies = max(1, min(n_facies, len(FACIES)))
+    nomes_facies = list(FACIES)[:n_facies]
+    medias = np.array([FACIES[f] for f in nomes_facies])
+
+    facies = _camadas(n_amostras, espessura_camada, n_facies, rng).astype(np.int16)
+    dados = {'DEPTH': topo + passo * np.arange(n_amostras)}
+    base = []
+    for j, (mnem, _, _) in enumerate(CURVAS[:max(n_curvas, 1)]):
+        valores = medias[facies, j] + DESVIOS[j] * _suavizar(rng.standard_normal(n_amostras), 5)
+        if mnem == 'ILD':
+            valores = 10.0 ** valores
+        elif mnem in ('GR', 'NPHI'):
+            valores = np.clip(valores, 0.0, None)
+        base.append(valores)
+        dados[mnem] = valores.astype(dtype, copy=False)
+    for j in range(len(CURVAS), n_curvas):
+        pesos = rng.normal(size=len(base)) / len(base)
+        combinacao = rng.standard_normal(n_amostras)
+        for peso, valores in zip(pesos, base):
+            combinacao += peso * valores
+        dados[f"CURVA{j + 1:02d}"] = combinacao.astype(dtype, copy=False)
+    df = pd.DataFrame(dados, copy=False)
+
+    # Falhas de registro: trechos de 1 a 50 amostras (25,5 em média) em curvas sorteadas
+    curvas = [c for c in df.columns if c != 'DEPTH']
+    if fracao_nulos > 0 and curvas:
+        n_falhas = int(n_amostras * fracao_nulos * len(curvas) / 25.5) + 1
+        inicios = rng.integers(0, n_amostras, n_falhas)
+        comprimentos = rng.integers(1, 51, n_falhas)
+        alvo = rng.integers(0, len(curvas), n_falhas)
+        for j, curva in enumerate(curvas):
+            sel = alvo == j
+            if not sel.any():
+                continue
+            # Marca início/fim de cada falha e acumula: amostras com contagem > 0 ficam nulas
+            marcas = np.zeros(n_amostras + 1, dtype=np.int32)
+            np.add.at(marcas, inicios[sel], 1)
+            np.add.at(marcas, np.minimum(inicios[sel] + comprimentos[sel], n_amostras), -1)
+            valores = df[curva].to_numpy(copy=True)
+            valores[np.cumsum(marcas[:-1]) > 0] = np.nan
+            df[curva] = valores
+
+    prof = dados['DEPTH']
+    fim = prof[-1] if n_amostras else topo
+    limites = np.linspace(topo, fim, max(n_zonas, 1) + 1)
+    zonas = [(float(limites[i]), float(limites[i + 1]), 15.0 + 5 * i, 120.0 + 5 * i) for i in range(max(n_zonas, 1))]
+
+    cabecalho = CabecalhoLAS(
+        version=SecaoCabecalho([ItemCabecalho('VERS', '', '2.0', 'CWLS LOG ASCII STANDARD - VERSION 2.0'),
+                                ItemCabecalho('WRAP', '', 'NO', 'One line per depth step')]),
+        well=SecaoCabecalho([ItemCabecalho('WELL', '', f'SINTETICO-{semente}', 'WELL'),
+                             ItemCabecalho('COMP', '', 'PYGEOPLOT', 'COMPANY'),
+                             ItemCabecalho('FLD', '', 'SINTETICO', 'FIELD')]),
+        curves=SecaoCabecalho([ItemCabecalho('DEPTH', 'M', '', 'Depth')]
+                              + [ItemCabecalho(m, u, '', d) for m, u, d in CURVAS[:n_curvas]]
+                              + [ItemCabecalho(c, '', '', 'Curva sintética') for c in df.columns[len(CURVAS) + 1:]]),
+        params=SecaoCabecalho([ItemCabecalho('RMF', 'OHMM', 0.08, 'Mud filtrate resistivity')]),
+    )
+    return {'dados': df, 'facies': facies, 'nomes_facies': nomes_facies, 'zonas': zonas, 'cabecalho': cabecalho}
+
+def gerar_las(destino=None, **opcoes):
+    """Poço sintético gravado em LAS 2.0 (bytes, se `destino` não for informado)"""
+    from escrita_las import escrever_las
+
+    poco = gerar_poco(**opcoes)
+    return escrever_las(poco['dados'], destino, cabecalho=poco['cabecalho'])
+
+if __name__ == "__main__":
+    # Uso: python sintetico.py n_amostras saida.las [n_curvas]
+    if len(sys.argv) < 3:
+        print("Uso: python sintetico.py n_amostras saida.las [n_curvas]")
+        sys.exit(1)
+    gerar_las(sys.argv[2], n_amostras=int(float(sys.argv[1])),
+              n_curvas=int(sys.argv[3]) if len(sys.argv) > 3 else 6)
@@ -0,0 +1,203 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import streamlit as st
+import instrumentacao
+
+# Estados de uma tarefa em segundo plano
+EXECUTANDO = "executando"
+CONCLUIDA = "concluída"
+CANCELADA = "cancelada"
+ERRO = "erro"
+
+MAX_TAREFAS = 32
+
+# pyplot não é thread-safe: toda figura matplotlib gerada fora da thread do script passa por aqui
+TRAVA_PYPLOT = threading.Lock()
+
+class Cancelada(Exception):
+    pass
+
+class Tarefa:
+    """Cálculo em execução num pool local, identificado por uma chave estável.
+
+    A função recebe a tarefa como primeiro argumento e chama `tarefa.atualizar(fração, mensagem)`
+    para reportar progresso; a mesma chamada interrompe o cálculo (Cancelada) se houver cancelamento.
+    """
+
+    def __init__(self, chave, rotulo):
+        self.chave = chave
+        self.rotulo = rotulo
+        self.progresso = 0.0
+        self.mensagem = ""
+        self.inicio = time.time()
+        self.fim = None
+        self.futuro = None
+        self._cancelar = threading.Event()
+
+    def atualizar(self, fracao, mensagem=None):
+        if self._cancelar.is_set():
+            raise Cancelada(self.rotulo)
+        self.progresso = min(max(float(fracao), 0.0), 1.0)
+        if mensagem is not None:
+            self.mensagem = mensagem
+
+    def cancelar(self):
+        self._cancelar.set()
+        if self.futuro.cancel():
+            self.fim = time.time()
+
+    @property
+    def estado(self):
+        if not self.futuro.done():
+            return EXECUTANDO
+        if self.futuro.cancelled() or isinstance(self.futuro.exception(), Cancelada):
+            return CANCELADA
+        return ERRO if self.futuro.exception() is not None else CONCLUIDA
+
+    @property
+    def decorrido(self):
+        return (self.fim or time.time()) - self.inicio
+
+    def resultado(self):
+        return self.futuro.result()
+
+class GerenciadorTarefas:
+    """Pool de threads compartilhado por todas as sessões.
+
+    Pedidos com a mesma chave enquanto a tarefa roda (ou depois de concluída) recebem a
+    mesma tarefa; tarefas canceladas ou com erro são substituídas no próximo pedido.
+    """
+
+    def __init__(self, max_workers=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or min(4, (os.cpu_count() or 1) + 1),
+                                            thread_name_prefix="tarefa")
+        self._tarefas = {}
+        self._trava = threading.Lock()
+
+    def submeter(self, chave, funcao, *args, rotulo="Calculando", **kwargs):
+        with self._trava:
+            tarefa = self._tarefas.get(chave)
+            if tarefa is not None and tarefa.estado in (EXECUTANDO, CONCLUIDA):
+                return tarefa
+
+            tarefa = Tarefa(chave, rotulo)
+            # Os eventos da tarefa vão para o registro de desempenho da sessão que a submeteu
+            registro = instrumentacao.registro_atual()
+
+            def executar():
+                try:
+                    with instrumentacao.ativar(registro), instrumentacao.medir(f"tarefa: {rotulo}", "tarefa"):
+                        return funcao(tarefa, *args, **kwargs)
+                finally:
+                    tarefa.fim = time.time()
+                    if not tarefa._cancelar.is_set():
+                        tarefa.progresso = 1.0
+
+            tarefa.futuro = self._executor.submit(executar)
+            self._tarefas[chave] = tarefa
+            self._descartar_antigas()
+            return tarefa
+
+    def obter(self, chave):
+        with self._trava:
+            return self._tarefas.get(chave)
+
+    def tarefas(self):
+        with self._trava:
+            return list(self._tarefas.values())
+
+    def _descartar_antigas(self):
+        # Mantém no máximo MAX_TAREFAS, descartando primeiro as terminadas há mais tempo
+        terminadas = sorted((t for t in self._tarefas.values() if t.fim is not None), key=lambda t: t.fim)
+        for tarefa in terminadas[:max(0, len(self._tarefas) - MAX_TAREFAS)]:
+            del self._tarefas[tarefa.chave]
+
+@st.cache_resource
+def obter_gerenciador():
+    return GerenciadorTarefas()
+
+def submeter(chave, funcao, *args, rotulo="Calculando", **kwargs):
+    return obter_gerenciador().submeter(chave, funcao, *args, rotulo=rotulo, **kwargs)
+
+def acompanhar(tarefa, intervalo=0.5, espera=0.3):
+    """Painel de progresso com botão de cancelar; devolve o resultado quando a tarefa termina.
+
+    Enquanto a tarefa roda, devolve None e o painel (um fragmento) se atualiza a cada
+    `intervalo` segundos, disparando um rerun da página ao terminar. Tarefas rápidas
+    (ou já concluídas) são aguardadas por até `espera` segundos para evitar o painel.
+    """
+    try:
+        tarefa.futuro.result(timeout=espera)
+    except Exception:
+        pass
+
+    estado = tarefa.estado
+    if estado == CONCLUIDA:
+        return tarefa.resultado()
+    if estado == CANCELADA:
+        st.warning(f"⏹️ {tarefa.rotulo}: cancelado.")
+        return None
+    if estado == ERRO:
+        st.error(f"❌ {tarefa.rotulo}: {tarefa.futuro.exception()}")
+        return None
+
+    @st.fragment(run_every=intervalo)
+    def painel():
+        if tarefa.estado != EXECUTANDO:
+            st.rerun()
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            texto = f"⏳ {tarefa.rotulo}" + (f" — {tarefa.mensagem}" if tarefa.mensagem else "")
+            st.progress(tarefa.progresso, text=f"{texto} ({tarefa.decorrido:.0f} s)")
+        with col2:
+            if st.button("Cancelar", key=f"cancelar_{abs(hash(tarefa.chave))}"):
+                tarefa.cancelar()
+                st.rerun()
+
+    painel()
+    return None
+
+def executar_em_paralelo(funcao, itens, progresso=None, max_workers=None):
+    """Aplica `funcao` a cada item num pool de threads, reportando a fração concluída.
+
+    A ordem do resultado é a dos itens. Se `progresso` levantar exceção (cancelamento),
+    os itens ainda não iniciados são descartados.
+    """
+    itens = list(itens)
+    workers = max_workers or max(1, min(len(itens), os.cpu_count() or 1))
+    funcao = instrumentacao.propagar(funcao)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futuros = {executor.submit(funcao, item): item for item in itens}
+        try:
+            for feitos, futuro in enumerate(as_completed(futuros), 1):
+                futuro.result()
+                if progresso is not None:
+                    progresso(feitos / len(itens), f"{feitos}/{len(itens)}")
+        except BaseException:
+            for futuro in futuros:
+                futuro.cancel()
+            raise
+        return [futuro.result() for futuro in futuros]
+
+def pairplot_png(tarefa, df, titulo, **kwargs):
+    """Renderiza um pairplot do seaborn em PNG fora da thread do script"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    tarefa.atualizar(0.0, "gerando gráficos")
+    buffer = io.BytesIO()
+    with TRAVA_PYPLOT:
+        sns.set_style("whitegrid")
+        with instrumentacao.medir("sns.pairplot", "figura", amostras=len(df), colunas=df.shape[1]):
+            grade = sns.pairplot(df, **kwargs)
+        try:
+            grade.figure.suptitle(titulo, y=1.01, fontweight='bold')
+            tarefa.atualizar(0.8, "exportando imagem")
+            with instrumentacao.medir("serializacao.png", "figura"):
+                grade.figure.savefig(buffer, format="png", bbox_inches="tight", dpi=100)
+        finally:
+            plt.close(grade.figure)
+    return buffer.getvalue()
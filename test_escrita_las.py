@@ -0,0 +1,40 @@
+import io
+import lasio
+import numpy as np
+import pandas as pd
+from escrita_las import escrever_las, formatar_ascii
+
+def _reler(conteudo):
+    # Sem as correções de leitura do lasio (números colados por hífen): o ~A tem de estar correto
+    return lasio.read(io.StringIO(conteudo.decode("utf-8")), read_policy=()).df().reset_index()
+
+def test_negativo_que_ganha_digito_ao_arredondar():
+    # -9999.99996 vira -10000.0000: a coluna precisa de espaço para o dígito a mais e o sinal
+    matriz = np.array([[1.0, -9999.99996], [2.0, 5.0]])
+    linhas = formatar_ascii(matriz, casas=4).decode().splitlines()
+    assert linhas[0].split() == ["1.0000", "-10000.0000"]
+    assert len({len(linha) for linha in linhas}) == 1
+
+def test_ida_e_volta_com_lasio():
+    df = pd.DataFrame({
+        'DEPTH': [1000.0, 1000.5, 1001.0, 1001.5, 1002.0, 1002.5],
+        'GR': [-9999.99996, 9999.99996, -0.00004, 0.0, np.nan, 123.45678],
+        'SP': [-9999.99996, -99.999996, 0.5, np.nan, -1.0, 7.0],
+        'RES': [1e-4, -1e9, 2.5e12, -3.75e14, 1e15, -1e16],
+        'FACIES': pd.array([1, -12, 100000, None, 3, 0], dtype="Int32"),
+    })
+    lido = _reler(escrever_las(df, depth_col="DEPTH"))
+
+    assert list(lido.columns) == list(df.columns)
+    for curva in ['DEPTH', 'GR', 'SP', 'RES']:
+        esperado = np.round(df[curva].to_numpy(dtype=float), 4)
+        np.testing.assert_allclose(lido[curva].to_numpy(), esperado, rtol=1e-12, equal_nan=True)
+    np.testing.assert_array_equal(lido['FACIES'].to_numpy(),
+                                  df['FACIES'].to_numpy(dtype=float, na_value=np.nan))
+
+def test_blocos_ficam_alinhados():
+    # Larguras pelos extremos do poço inteiro: blocos pequenos saem com as mesmas colunas
+    prof = np.arange(0, 50, 0.5)
+    df = pd.DataFrame({'DEPTH': prof, 'GR': np.where(prof > 40, -99999.99999, prof)})
+    conteudo = escrever_las(df, depth_col="DEPTH", tamanho_bloco=7)
+    np.testing.assert_allclose(_reler(conteudo)['GR'].to_numpy(), np.round(df['GR'].to_numpy(), 4))
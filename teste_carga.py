@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import numpy as np
+import psutil
+
+# Teste de carga: N sessões simuladas percorrem o fluxo de um analista (importar -> visualizar ->
+# estatísticas -> agrupar -> petrofísica) no mesmo processo, como num servidor Streamlit: caches,
+# tarefas em segundo plano e GIL são compartilhados. Cada sessão é um AppTest rodando app1.py.
+# Uso: python teste_carga.py --sessoes 10 [--amostras 100000] [--mesmo-poco] [--saida carga.json]
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(DIRETORIO, "app1.py")
+
+# Envolve o app1.py para medir o tempo de CPU da thread do script em cada rerun
+SCRIPT = f'''
+import sys, time
+import streamlit as st
+sys.path.insert(0, {DIRETORIO!r})
+_inicio = time.thread_time()
+try:
+    with open({APP!r}, encoding="utf-8") as _arquivo:
+        exec(compile(_arquivo.read(), {APP!r}, "exec"), {{"__name__": "__main__"}})
+finally:
+    st.session_state["_cpu_rerun"] = time.thread_time() - _inicio
+'''
+
+def compartilhar_runtime():
+    """Um único Runtime simulado para todas as sessões, como no servidor.
+
+    O AppTest cria um Runtime falso a cada run e o remove (Runtime._instance = None) ao terminar:
+    com sessões simultâneas, o fim de um run deixaria o run de outra sessão sem Runtime.
+    Aqui todas enxergam o mesmo, que também compartilha o armazenamento do st.cache_data.
+    """
+    from unittest.mock import MagicMock
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.components.v2.component_manager import BidiComponentManager
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    runtime.bidi_component_registry = BidiComponentManager()
+    runtime.bidi_component_registry.discover_and_register_components(start_file_watching=False)
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    return runtime
+
+class Sessao:
+    """Uma sessão simulada; registra latência e CPU de cada rerun, por etapa do fluxo"""
+
+    def __init__(self, numero, las, pausa=0.0, timeout=300):
+        from streamlit.testing.v1 import AppTest
+
+        self.numero = numero
+        self.las = las
+        self.pausa = pausa
+        self.timeout = timeout
+        self.app = AppTest.from_string(SCRIPT, default_timeout=timeout)
+        self.reruns = []  # (etapa, latência s, CPU s)
+        self.erros = []
+
+    def rerun(self, etapa, acao=None):
+        inicio = time.perf_counter()
+        (acao or self.app).run()
+        latencia = time.perf_counter() - inicio
+        self.reruns.append((etapa, latencia, self.app.session_state.get("_cpu_rerun", 0.0)))
+        self.erros.extend(f"{etapa}: {e.message}" for e in self.app.exception)
+
+    def abrir(self, pagina):
+        self.app.query_params["pagina"] = pagina
+        self.rerun(pagina)
+
+    def esperar(self, etapa, condicao, intervalo=0.5):
+        # Como o painel de progresso no navegador: reruns periódicos até a tarefa terminar,
+        # contados à parte para não diluir a latência das ações do usuário
+        limite = time.perf_counter() + self.timeout
+        while not condicao() and time.perf_counter() < limite:
+            time.sleep(intervalo)
+            self.rerun(f"{etapa} (espera)")
+        if not condicao():
+            self.erros.append(f"{etapa}: tempo esgotado")
+
+    def fluxo(self):
+        app = self.app
+        self.rerun("home")
+        time.sleep(self.pausa)
+
+        self.abrir("importacao")
+        self.rerun("importacao", app.sidebar.file_uploader[0].upload(f"poco_{self.numero}.las", self.las))
+        time.sleep(self.pausa)
+
+        self.abrir("Plotagem")
+        time.sleep(self.pausa)
+
+        self.abrir("estatistica")
+        self.rerun("estatistica", app.sidebar.multiselect[0].set_value(["GR", "RHOB", "NPHI"]))
+        time.sleep(self.pausa)
+
+        self.abrir("litofaceis")
+        self.rerun("litofaceis", app.sidebar.multiselect[0].set_value(["GR", "RHOB", "NPHI"]))
+        self.esperar("litofaceis", lambda: "kmeans_anterior" in app.session_state)
+        time.sleep(self.pausa)
+
+        self.abrir("calculopetrofisico")
+        self.rerun("calculopetrofisico", app.button[0].click())
+        self.esperar("calculopetrofisico", lambda: "petro_data" in app.session_state)
+
+    def tamanho_estado(self):
+        from cache_compartilhado import tamanho_objeto
+        return tamanho_objeto(self.app.session_state.to_dict())
+
+    def executar(self):
+        try:
+            self.fluxo()
+        except Exception as e:
+            self.erros.append(f"{type(e).__name__}: {e}")
+
+class Monitor(threading.Thread):
+    """Amostra CPU e RSS do processo enquanto o teste roda"""
+
+    def __init__(self, intervalo=0.2):
+        super().__init__(daemon=True)
+        self.processo = psutil.Process()
+        self.intervalo = intervalo
+        self.rss = []
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.is_set():
+            self.rss.append(self.processo.memory_info().rss)
+            self._parar.wait(self.intervalo)
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+def percentis(valores, ps=(50, 90, 95, 99)):
+    valores = np.asarray(valores, dtype=float)
+    if len(valores) == 0:
+        return {f"p{p}": float("nan") for p in ps} | {"max": float("nan")}
+    return {f"p{p}": float(np.percentile(valores, p)) for p in ps} | {"max": float(valores.max())}
+
+def aquecer(timeout=300):
+    # Uma sessão com um poço pequeno antes das medições: imports das páginas e recursos
+    # estáticos não entram na memória por sessão nem nas latências
+    import sintetico
+
+    sessao = Sessao(-1, sintetico.gerar_las(n_amostras=2000, semente=12345), timeout=timeout)
+    sessao.executar()
+    return sessao.erros
+
+def executar(n_sessoes=10, n_amostras=100_000, mesmo_poco=False, intervalo_entrada=0.5, pausa=1.0, timeout=300):
+    """Roda as sessões em paralelo e devolve o relatório (latências, CPU e memória)"""
+    import sintetico
+
+    # Arquivos gerados antes do teste: a geração não entra nas medições
+    arquivos = [sintetico.gerar_las(n_amostras=n_amostras, semente=0 if mesmo_poco else i) for i in range(n_sessoes)]
+    compartilhar_runtime()
+    erros_aquecimento = aquecer(timeout)
+
+    processo = psutil.Process()
+    rss_inicial = processo.memory_info().rss
+    cpu_inicial = processo.cpu_times()
+    monitor = Monitor()
+    monitor.start()
+    inicio = time.perf_counter()
+
+    sessoes = [Sessao(i, arquivos[i], pausa, timeout) for i in range(n_sessoes)]
+    threads = []
+    for sessao in sessoes:
+        thread = threading.Thread(target=sessao.executar, name=f"sessao-{sessao.numero}")
+        thread.start()
+        threads.append(thread)
+        time.sleep(intervalo_entrada)
+    for thread in threads:
+        thread.join()
+
+    duracao = time.perf_counter() - inicio
+    monitor.parar()
+    cpu_final = processo.cpu_times()
+    cpu_processo = (cpu_final.user + cpu_final.system) - (cpu_inicial.user + cpu_inicial.system)
+    rss_pico = max(monitor.rss + [processo.memory_info().rss])
+
+    todas = [r for s in sessoes for r in s.reruns]
+    etapas = {}
+    for etapa, latencia, _ in todas:
+        etapas.setdefault(etapa, []).append(latencia)
+
+    por_sessao = []
+    for s in sessoes:
+        latencias = [latencia for _, latencia, _ in s.reruns]
+        por_sessao.append({
+            'sessao': s.numero,
+            'reruns': len(s.reruns),
+            'tempo_total_s': float(sum(latencias)),
+            'cpu_script_s': float(sum(cpu for _, _, cpu in s.reruns)),
+            'estado_mb': s.tamanho_estado() / 2**20,
+            'latencia': percentis(latencias),
+            'erros': s.erros,
+        })
+    cpu_scripts = sum(s['cpu_script_s'] for s in por_sessao)
+
+    return {
+        'sessoes': n_sessoes,
+        'amostras': n_amostras,
+        'mesmo_poco': mesmo_poco,
+        'nucleos': psutil.cpu_count(),
+        'duracao_s': duracao,
+        'latencia': percentis([latencia for _, latencia, _ in todas]),
+        'latencia_por_etapa': {etapa: percentis(v) for etapa, v in etapas.items()},
+        'cpu_processo_s': cpu_processo,
+        'cpu_uso_medio': cpu_processo / duracao,
+        # CPU fora das threads de script: tarefas em segundo plano, GC e o próprio AppTest (leitura das páginas geradas)
+        'cpu_segundo_plano_s': max(cpu_processo - cpu_scripts, 0.0),
+        'rss_inicial_mb': rss_inicial / 2**20,
+        'rss_pico_mb': rss_pico / 2**20,
+        'rss_por_sessao_mb': (rss_pico - rss_inicial) / 2**20 / n_sessoes,
+        'erros_aquecimento': erros_aquecimento,
+        'por_sessao': por_sessao,
+    }
+
+def imprimir(relatorio):
+    r = relatorio
+    print(f"{r['sessoes']} sessões, {r['amostras']:,} amostras/poço, {r['nucleos']} núcleo(s), {r['duracao_s']:.1f} s")
+    lat = r['latencia']
+    print(f"Latência dos reruns: p50 {lat['p50']:.2f} s | p90 {lat['p90']:.2f} s | p95 {lat['p95']:.2f} s | "
+          f"p99 {lat['p99']:.2f} s | máx {lat['max']:.2f} s")
+    print(f"CPU do processo: {r['cpu_processo_s']:.1f} s ({r['cpu_uso_medio']:.0%} de um núcleo em média), "
+          f"{r['cpu_segundo_plano_s']:.1f} s fora das threads de script")
+    print(f"RSS: {r['rss_inicial_mb']:.0f} -> {r['rss_pico_mb']:.0f} MB (pico), "
+          f"{r['rss_por_sessao_mb']:.1f} MB por sessão")
+    if r['erros_aquecimento']:
+        print(f"Erros no aquecimento: {r['erros_aquecimento']}")
+    print(f"\n{'etapa':<30}{'p50':>8}{'p95':>8}{'máx':>8}")
+    for etapa, p in r['latencia_por_etapa'].items():
+        print(f"{etapa:<30}{p['p50']:>7.2f}s{p['p95']:>7.2f}s{p['max']:>7.2f}s")
+    print(f"\n{'sessão':<8}{'reruns':>7}{'total':>9}{'CPU':>9}{'p95':>8}{'estado':>10}")
+    for s in r['por_sessao']:
+        print(f"{s['sessao']:<8}{s['reruns']:>7}{s['tempo_total_s']:>8.1f}s{s['cpu_script_s']:>8.1f}s"
+              f"{s['latencia']['p95']:>7.2f}s{s['estado_mb']:>7.1f} MB" + (f"  erros: {s['erros']}" if s['erros'] else ""))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões simuladas do PYGEOPLOT")
+    parser.add_argument("--sessoes", type=int, default=10)
+    parser.add_argument("--amostras", type=lambda v: int(float(v)), default=100_000)
+    parser.add_argument("--mesmo-poco", action="store_true", help="todas as sessões importam o mesmo arquivo")
+    parser.add_argument("--intervalo-entrada", type=float, default=0.5, help="segundos entre o início de cada sessão")
+    parser.add_argument("--pausa", type=float, default=1.0, help="tempo de leitura entre etapas (s)")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--saida", help="grava o relatório em JSON")
+    args = parser.parse_args()
+
+    os.chdir(DIRETORIO)
+    relatorio = executar(args.sessoes, args.amostras, args.mesmo_poco, args.intervalo_entrada, args.pausa, args.timeout)
+    imprimir(relatorio)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, indent=2)
+    sys.exit(1 if relatorio['erros_aquecimento'] or any(s['erros'] for s in relatorio['por_sessao']) else 0)